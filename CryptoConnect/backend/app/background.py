@@ -0,0 +1,131 @@
+"""
+Background Task Runner
+Periodic jobs started and stopped with the application lifespan
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Runs an async job every `interval_seconds` until stopped"""
+
+    def __init__(self, name: str, interval_seconds: float, job: Callable[[], Awaitable], flush_on_stop: bool = False):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.job = job
+        self.flush_on_stop = flush_on_stop  # Run once more at shutdown so queued work isn't left behind
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await self.job()
+            except Exception as e:
+                logger.error(f"Background task {self.name} failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Let the current run finish (cancelling it after `timeout` seconds), then stop"""
+        self._stopping.set()
+        if self._task:
+            task, self._task = self._task, None
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Background task {self.name} did not finish within {timeout:.1f}s, cancelling it")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+
+class BackgroundTasks:
+    """Registry of the application's periodic jobs and shutdown drains"""
+
+    def __init__(self):
+        self.tasks: Dict[str, PeriodicTask] = {}
+        self.drains: Dict[str, Callable[[], Awaitable]] = {}
+        self._leader_lock = None
+
+    def register(self, name: str, interval_seconds: float, job: Callable[[], Awaitable], flush_on_stop: bool = False):
+        self.tasks[name] = PeriodicTask(name, interval_seconds, job, flush_on_stop)
+
+    def on_drain(self, name: str, drain: Callable[[], Awaitable]):
+        """Register a coroutine that finishes in-process work (e.g. fire-and-forget tasks) at shutdown"""
+        self.drains[name] = drain
+
+    def acquire_leadership(self, lock_path: Optional[str]) -> bool:
+        """Whether this process should run the periodic jobs.
+
+        With several workers on one host only the holder of an exclusive lock on
+        `lock_path` runs them; the OS releases it if that worker dies, so its replacement
+        takes over. Without a lock path (or on platforms without fcntl) every process leads.
+        """
+        if not lock_path:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            return True
+        handle = open(lock_path, "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._leader_lock = handle
+        return True
+
+    def start_all(self):
+        for task in self.tasks.values():
+            task.start()
+            logger.info(f"Started background task {task.name} (every {task.interval_seconds}s)")
+
+    async def stop_all(self, drain_timeout: Optional[float] = None):
+        """Stop the loops (letting current runs finish), then flush queues and drains.
+
+        drain_timeout bounds the whole shutdown: runs still going at the deadline are
+        cancelled, and the flushes get whatever time is left.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if drain_timeout is None else loop.time() + drain_timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(deadline - loop.time(), 0.0)
+
+        await asyncio.gather(*(task.stop(timeout=remaining()) for task in self.tasks.values()), return_exceptions=True)
+
+        flushes = {name: task.job for name, task in self.tasks.items() if task.flush_on_stop}
+        flushes.update(self.drains)
+        if flushes:
+            async def flush(name: str, job: Callable[[], Awaitable]):
+                try:
+                    await job()
+                except Exception as e:
+                    logger.error(f"Shutdown flush of {name} failed: {e}")
+
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(flush(name, job) for name, job in flushes.items())), timeout=remaining()
+                )
+                logger.info(f"Flushed {', '.join(flushes)} before shutdown")
+            except asyncio.TimeoutError:
+                logger.warning(f"Shutdown flush did not finish within {drain_timeout}s")
+
+        if self._leader_lock:
+            self._leader_lock.close()
+            self._leader_lock = None
+
+
+# Global background task registry
+background_tasks = BackgroundTasks()
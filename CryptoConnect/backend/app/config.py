@@ -5,6 +5,21 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     mongodb_url: str = "mongodb://localhost:27017/cryptoconnect"
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 0
+    mongodb_max_connecting: int = 2
+    mongodb_max_idle_time_ms: Optional[int] = None
+    mongodb_wait_queue_timeout_ms: Optional[int] = 5000  # Fail fast instead of stalling on a saturated pool
+    mongodb_server_selection_timeout_ms: int = 5000
+    mongodb_connect_timeout_ms: int = 10000
+    mongodb_socket_timeout_ms: Optional[int] = None
+    mongodb_compressors: str = "zstd,snappy,zlib"  # Only those whose library is installed are offered
+    mongodb_retry_writes: bool = True
+    mongodb_retry_reads: bool = True
+    mongodb_read_preference: str = "primary"
+    # Catalogue and holdings lookups that tolerate slight staleness (see database.read_collection)
+    mongodb_secondary_read_preference: str = "secondaryPreferred"
+    mongodb_max_staleness_seconds: int = -1  # -1 = no limit; otherwise >= 90
     
     # JWT
     jwt_secret_key: str = "your-super-secret-jwt-key-here-change-this-in-production"
@@ -15,11 +30,59 @@ class Settings(BaseSettings):
     xrpl_network: str = "testnet"
     issuer_wallet_seed: Optional[str] = None
     issuer_wallet_address: Optional[str] = None
+    issuer_wallet_seeds: Optional[str] = None  # Comma-separated extra issuers for the issuer pool
+    trust_line_index_ttl_seconds: int = 60
+    trust_line_concurrency: int = 8
+    trust_line_prewarm_limit: int = 500
+    
+    # Tokenization pipeline
+    tokenization_concurrency: int = 16
+    tokenization_resume_interval_seconds: int = 60
+    
+    # Pre-funded wallet pool (0 interval disables background refill)
+    wallet_pool_target_size: int = 20
+    wallet_pool_low_watermark: int = 5
+    wallet_pool_concurrency: int = 4
+    wallet_pool_refill_interval_seconds: int = 60
+    
+    # Secondary market
+    order_expiry_sweep_seconds: int = 30
+    order_archive_batch_size: int = 500
+    
+    # Secondary market settlement ("off_ledger" books fills in Mongo only; "ledger" also
+    # settles them on XRPL in per-ledger batches). A 0 XRP rate skips the cash leg.
+    market_settlement_mode: str = "off_ledger"
+    settlement_interval_seconds: int = 4
+    settlement_batch_size: int = 200
+    settlement_xrp_per_aed: float = 0.0
+    
+    # Ledger projection
+    ledger_projection_interval_seconds: int = 2
+    ledger_settle_seconds: int = 5
+    ledger_batch_size: int = 1000
+    
+    # Ledger ingestion (0 disables polling)
+    ledger_ingestion_interval_seconds: int = 15
+    
+    # Ledger reconciliation (0 disables the scheduled run)
+    reconciliation_interval_seconds: int = 3600
+    
+    # Portfolio snapshots
+    portfolio_history_interval_seconds: int = 3600
     
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     debug: bool = True
+    debug_routes: Optional[bool] = None  # /debug/* XRPL diagnostics; None follows DEBUG
+    startup_budget_seconds: float = 5.0  # Time-to-ready target; slower startups log a warning
+    
+    # Production server (serve.py)
+    web_workers: int = 1  # 0 = one per CPU core; the market feed, issuer queues and trust line state are per process
+    shutdown_grace_seconds: int = 30  # In-flight requests allowed to finish after SIGTERM
+    shutdown_drain_seconds: int = 20  # Background queue flush at shutdown
+    readiness_timeout_seconds: float = 3.0
+    background_lock_file: Optional[str] = None  # Set by serve.py so only one worker runs periodic jobs
     
     class Config:
         env_file = ".env"
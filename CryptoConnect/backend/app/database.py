@@ -1,29 +1,202 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
+from pymongo import monitoring
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from collections import defaultdict
+from typing import Any, Dict, List
 from app.config import settings
 from app.models.user import User
 from app.models.property import Property
 from app.models.transaction import Transaction
-from app.routers.market import MarketOrder
+from app.models.trade import Trade, Candle
+from app.models.order_book import OrderBookLevel
+from app.models.portfolio import PortfolioSnapshot, PortfolioHistory
+from app.models.ledger import LedgerPosition, LedgerCheckpoint
+from app.models.reconciliation import ReconciliationRun, ReconciliationDiscrepancy
+from app.models.ledger_transaction import LedgerTransaction, LedgerAccountCursor
+from app.models.wallet_pool import PooledWallet
+from app.models.trust_line import TrustLine
+from app.models.tokenization_job import TokenizationJob
+from app.models.token_symbol import TokenSymbol
+from app.models.settlement import Settlement
+from app.models.market_order import MarketOrder, ArchivedMarketOrder
+
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
+
+# Wire compressors and the module each one needs
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Per-server connection pool counters, fed by pymongo's CMAP events"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.servers: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+            "open": 0,
+            "checked_out": 0,
+            "waiting": 0,
+            "checkouts": 0,
+            "checkout_failures": defaultdict(int),
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "pool_cleared": 0
+        })
+
+    def _server(self, event) -> Dict[str, Any]:
+        return self.servers["%s:%s" % event.address]
+
+    def pool_created(self, event):
+        self._server(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._server(event)["pool_cleared"] += 1
+
+    def pool_closed(self, event):
+        self.servers.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._server(event)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._server(event)["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        self._server(event)["waiting"] += 1
+
+    def connection_check_out_failed(self, event):
+        server = self._server(event)
+        server["waiting"] -= 1
+        server["checkout_failures"][str(event.reason)] += 1
+
+    def connection_checked_out(self, event):
+        server = self._server(event)
+        wait_ms = event.duration * 1000
+        server["waiting"] -= 1
+        server["checked_out"] += 1
+        server["checkouts"] += 1
+        server["total_wait_ms"] += wait_ms
+        server["max_wait_ms"] = max(server["max_wait_ms"], wait_ms)
+
+    def connection_checked_in(self, event):
+        self._server(event)["checked_out"] -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        servers = {}
+        for address, server in self.servers.items():
+            servers[address] = {
+                **server,
+                "checkout_failures": dict(server["checkout_failures"]),
+                "avg_wait_ms": round(server["total_wait_ms"] / server["checkouts"], 3) if server["checkouts"] else 0.0,
+                "utilisation": round(server["checked_out"] / settings.mongodb_max_pool_size, 3) if settings.mongodb_max_pool_size else None
+            }
+        return {"max_pool_size": settings.mongodb_max_pool_size, "servers": servers}
 
 
 class Database:
     client: AsyncIOMotorClient = None
     database = None
+    pool_metrics = PoolMetrics()
 
 
 db = Database()
 
 
+def read_preference(name: str):
+    """Build a pymongo read preference from its name, applying the configured max staleness"""
+    mode = READ_PREFERENCES.get(name)
+    if mode is None:
+        raise ValueError(f"Unknown read preference: {name}")
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=settings.mongodb_max_staleness_seconds)
+
+
+def read_collection(model, preference: str = None):
+    """A model's collection routed by `preference` (default: the secondary read preference).
+
+    For reads that can tolerate replication lag, such as the property catalogue.
+    """
+    return model.get_pymongo_collection().with_options(
+        read_preference=read_preference(preference or settings.mongodb_secondary_read_preference)
+    )
+
+
+def available_compressors() -> List[str]:
+    compressors = []
+    for name in (c.strip() for c in settings.mongodb_compressors.split(",")):
+        module = COMPRESSOR_MODULES.get(name)
+        if not module:
+            continue
+        try:
+            __import__(module)
+            compressors.append(name)
+        except ImportError:
+            pass
+    return compressors
+
+
+def client_options() -> Dict[str, Any]:
+    options = {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "maxConnecting": settings.mongodb_max_connecting,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+        "retryWrites": settings.mongodb_retry_writes,
+        "retryReads": settings.mongodb_retry_reads,
+        "read_preference": read_preference(settings.mongodb_read_preference),
+        "event_listeners": [db.pool_metrics]
+    }
+    if settings.mongodb_max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.mongodb_max_idle_time_ms
+    if settings.mongodb_wait_queue_timeout_ms is not None:
+        options["waitQueueTimeoutMS"] = settings.mongodb_wait_queue_timeout_ms
+    if settings.mongodb_socket_timeout_ms is not None:
+        options["socketTimeoutMS"] = settings.mongodb_socket_timeout_ms
+    compressors = available_compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+
 async def connect_to_mongo():
     """Create database connection"""
-    db.client = AsyncIOMotorClient(settings.mongodb_url)
+    options = client_options()
+    db.client = AsyncIOMotorClient(settings.mongodb_url, **options)
     db.database = db.client.get_default_database()
+    print(
+        f"🗄️ MongoDB pool: max {options['maxPoolSize']} connections, "
+        f"compression {options.get('compressors', 'off')}, reads {settings.mongodb_read_preference}"
+    )
     
     # Initialize beanie with the models
     await init_beanie(
         database=db.database,
-        document_models=[User, Property, Transaction, MarketOrder]
+        document_models=[
+            User, Property, Transaction,
+            MarketOrder, ArchivedMarketOrder, Trade, Candle, OrderBookLevel,
+            PortfolioSnapshot, PortfolioHistory,
+            LedgerPosition, LedgerCheckpoint,
+            ReconciliationRun, ReconciliationDiscrepancy,
+            LedgerTransaction, LedgerAccountCursor,
+            PooledWallet, TrustLine, TokenizationJob, TokenSymbol, Settlement
+        ]
     )
 
 
@@ -1,22 +1,75 @@
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
+from app.startup_profiler import startup_profiler  # First, so its clock covers every import below
+with startup_profiler.measure("fastapi", kind="import"):
+    from fastapi import FastAPI, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 from fastapi import Depends
-from app.database import connect_to_mongo, close_mongo_connection
-from app.routers import auth, properties, seller, investor, admin, upload, market, tokens, simple_wallet, wallet, debug
 from app.config import settings
+with startup_profiler.measure("app.database", kind="import"):
+    from app.database import connect_to_mongo, close_mongo_connection, db
+with startup_profiler.measure("app.services.xrpl_service", kind="import"):
+    from app.services.xrpl_service import xrpl_service  # Pulls in xrpl-py
+with startup_profiler.measure("app.services", kind="import"):
+    from app.background import background_tasks
+    from app.services.order_expiry_service import order_expiry_service
+    from app.services.portfolio_service import portfolio_service
+    from app.services.ledger_service import ledger_service
+    from app.services.reconciliation_service import reconciliation_service
+    from app.services.ledger_ingestion_service import ledger_ingestion_service
+    from app.services.wallet_pool_service import wallet_pool_service
+    from app.services.tokenization_pipeline import tokenization_pipeline
+    from app.services.token_symbol_service import token_symbol_service
+    from app.services.settlement_service import settlement_service
+    from app.services.trust_line_service import trust_line_service
 from app.auth import get_current_active_user
 from app.models.user import User
 
-print("🔥 MAIN.PY LOADED - Server starting with debugging enabled!")
+# Always mounted, in this order
+ROUTER_MODULES = ["auth", "properties", "seller", "investor", "admin", "upload", "market", "tokens", "simple_wallet", "wallet"]
+
+logger = logging.getLogger(__name__)
+
+
+def register_background_tasks():
+    """Register and start the periodic jobs if this process holds the background lock"""
+    if not background_tasks.acquire_leadership(settings.background_lock_file):
+        return
+    background_tasks.register("ledger-projection", settings.ledger_projection_interval_seconds, ledger_service.catch_up, flush_on_stop=True)
+    background_tasks.register("order-expiry", settings.order_expiry_sweep_seconds, order_expiry_service.sweep)
+    background_tasks.register("portfolio-history", settings.portfolio_history_interval_seconds, portfolio_service.record_daily_history)
+    background_tasks.register("tokenization-jobs", settings.tokenization_resume_interval_seconds, tokenization_pipeline.resume_pending)
+    if settings.wallet_pool_refill_interval_seconds > 0:
+        background_tasks.register("wallet-pool", settings.wallet_pool_refill_interval_seconds, wallet_pool_service.refill)
+    if settings.ledger_ingestion_interval_seconds > 0:
+        background_tasks.register("ledger-ingestion", settings.ledger_ingestion_interval_seconds, ledger_ingestion_service.run)
+    if settings.market_settlement_mode == "ledger":
+        background_tasks.register("market-settlement", settings.settlement_interval_seconds, settlement_service.run, flush_on_stop=True)
+    if settings.reconciliation_interval_seconds > 0:
+        background_tasks.register("reconciliation", settings.reconciliation_interval_seconds, reconciliation_service.run)
+    background_tasks.start_all()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await connect_to_mongo()
+    app.state.draining = False
+    with startup_profiler.measure("connect_to_mongo"):
+        await connect_to_mongo()
+    with startup_profiler.measure("token_symbol_service.load"):
+        await token_symbol_service.load()
+    # Periodic jobs run in one process only (see serve.py); every process drains its own in-flight work
+    with startup_profiler.measure("background_tasks"):
+        register_background_tasks()
+    background_tasks.on_drain("tokenization-pipeline", tokenization_pipeline.drain)
+    background_tasks.on_drain("trust-lines", trust_line_service.drain)
+    startup_profiler.mark_ready(settings.startup_budget_seconds)
     yield
-    # Shutdown
+    # Shutdown: the server has stopped accepting requests and finished in-flight ones
+    app.state.draining = True
+    await background_tasks.stop_all(drain_timeout=settings.shutdown_drain_seconds)
     await close_mongo_connection()
 
 
@@ -24,7 +77,8 @@ app = FastAPI(
     title="CryptoConnect API",
     description="Tokenized Real Estate Investment Platform",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -36,153 +90,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add middleware to log all requests
+# Request log (enable DEBUG level on app.main to see it)
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    print(f"🌐 INCOMING REQUEST: {request.method} {request.url.path}")
     response = await call_next(request)
-    print(f"🌐 RESPONSE STATUS: {response.status_code}")
+    logger.debug(f"{request.method} {request.url.path} -> {response.status_code}")
     return response
 
 # Include routers
-print("🔥 INCLUDING ROUTERS...")
-app.include_router(auth.router)
-print("🔥 AUTH ROUTER INCLUDED")
-app.include_router(properties.router)
-print("🔥 PROPERTIES ROUTER INCLUDED")
-app.include_router(seller.router)
-print("🔥 SELLER ROUTER INCLUDED")
-app.include_router(investor.router)
-print("🔥 INVESTOR ROUTER INCLUDED!")
-app.include_router(admin.router)
-print("🔥 ADMIN ROUTER INCLUDED")
-app.include_router(upload.router)
-app.include_router(market.router)
-app.include_router(tokens.router)
-app.include_router(simple_wallet.router)
-app.include_router(wallet.router)
-app.include_router(debug.router)
-print("🔥 ALL ROUTERS INCLUDED!")
+for name in ROUTER_MODULES:
+    app.include_router(startup_profiler.import_module(f"app.routers.{name}").router)
+# Debug and diagnostics routes (XRPL checks, unauthenticated test writes), only imported when enabled
+if settings.debug if settings.debug_routes is None else settings.debug_routes:
+    app.include_router(startup_profiler.import_module("app.routers.debug").router)
+    logger.warning("Debug routes are enabled; set DEBUG_ROUTES=false in production")
+logger.info(f"Included {len(app.routes)} routes")
 
 @app.get("/")
 async def root():
-    print("🏠 ROOT ENDPOINT CALLED!")
     return {"message": "CryptoConnect API is running", "debug": "Server is working!", "test": True}
 
 @app.get("/api/test-simple")
 async def simple_test():
-    print("🧪🧪🧪 SIMPLE TEST ENDPOINT CALLED!")
     return {"status": "working", "message": "Test successful", "timestamp": "2025-09-22"}
 
 @app.get("/health")
 async def health():
-    print("❤️ HEALTH CHECK CALLED!")
     return {"message": "CryptoConnect API is healthy"}
 async def health_check():
     return {"status": "healthy", "message": "CryptoConnect API is running"}
 
 
-@app.get("/api/health")
-async def api_health_check():
-    return {"status": "healthy", "message": "CryptoConnect API is running", "timestamp": "2024-01-01T00:00:00Z"}
-
+@app.get("/health/live")
+async def liveness_probe():
+    """The process is up and its event loop is responsive"""
+    return {"status": "alive"}
 
-@app.get("/debug/state")
-async def debug_state():
-    """Debug endpoint to check system state"""
-    from app.models.user import User
-    from app.models.property import Property
-    from app.models.transaction import Transaction
-    
-    try:
-        user_count = await User.find().count()
-        property_count = await Property.find().count()
-        transaction_count = await Transaction.find().count()
-        
-        # Get sample data
-        sample_users = await User.find().limit(3).to_list()
-        sample_properties = await Property.find().limit(3).to_list()
-        
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "counts": {
-                "users": user_count,
-                "properties": property_count,
-                "transactions": transaction_count
-            },
-            "sample_data": {
-                "users": [{"id": str(u.id), "email": u.email, "role": str(u.role), "is_kyc_verified": u.is_kyc_verified} for u in sample_users],
-                "properties": [{"id": str(p.id), "title": p.title, "status": p.status} for p in sample_properties]
-            }
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "database": "disconnected",
-            "error": str(e)
-        }
 
+@app.get("/health/startup")
+async def startup_report():
+    """This worker's import and init timings against STARTUP_BUDGET_SECONDS"""
+    return startup_profiler.report(settings.startup_budget_seconds)
 
-@app.get("/debug/auth")
-async def debug_auth(request):
-    """Debug endpoint to check authentication headers"""
-    headers = dict(request.headers)
-    return {
-        "headers": headers,
-        "authorization": headers.get("authorization", "No auth header"),
-        "user_agent": headers.get("user-agent", "No user agent")
-    }
 
+@app.get("/health/ready")
+async def readiness_probe():
+    """Ready for traffic only when Mongo and the XRPL node both answer within the timeout"""
+    async def check(probe) -> str:
+        try:
+            await asyncio.wait_for(probe(), timeout=settings.readiness_timeout_seconds)
+            return "ok"
+        except asyncio.TimeoutError:
+            return "timeout"
+        except Exception as e:
+            return f"error: {e}"
 
-@app.post("/debug/test-property")
-async def test_property_submission(data: dict):
-    """Test endpoint for property submission"""
-    return {
-        "message": "Property data received",
-        "data": data,
-        "status": "success"
-    }
+    checks = dict(zip(
+        ["mongodb", "xrpl"],
+        await asyncio.gather(check(lambda: db.client.admin.command("ping")), check(xrpl_service.get_validated_ledger_index))
+    ))
+    draining = getattr(app.state, "draining", False)
+    ready = not draining and all(result == "ok" for result in checks.values())
+    return ORJSONResponse(
+        {"status": "ready" if ready else ("draining" if draining else "unavailable"), "checks": checks},
+        status_code=200 if ready else 503
+    )
 
 
-@app.post("/api/seller/property/submit-debug")
-async def debug_property_submission(data: dict):
-    """Debug endpoint for property submission without auth"""
-    try:
-        from app.models.property import Property
-        
-        # Create a simple property for testing
-        property_obj = Property(
-            title=data.get("title", "Test Property"),
-            description=data.get("description", "Test Description"),
-            address=data.get("address", "Test Address"),
-            city=data.get("city", "Test City"),
-            country=data.get("country", "Test Country"),
-            property_type=data.get("property_type", "apartment"),
-            total_value=float(data.get("total_value", 1000000)),
-            size_sqm=float(data.get("size_sqm", 100)),
-            seller_id="debug_seller",
-            seller_name="Debug Seller",
-            seller_email="debug@test.com"
-        )
-        
-        # Calculate tokens and price
-        property_obj.calculate_tokens_and_price()
-        
-        # Save to database
-        await property_obj.save()
-        
-        return {
-            "message": "Debug property created successfully",
-            "property_id": str(property_obj.id),
-            "data": data
-        }
-    except Exception as e:
-        return {
-            "message": "Error creating debug property",
-            "error": str(e),
-            "data": data
-        }
+@app.get("/api/health")
+async def api_health_check():
+    return {"status": "healthy", "message": "CryptoConnect API is running", "timestamp": "2024-01-01T00:00:00Z"}
 
 
 @app.get("/api/auth-test")
@@ -198,57 +175,6 @@ async def test_auth(current_user: User = Depends(get_current_active_user)):
     }
 
 
-@app.get("/api/debug/properties")
-async def debug_properties():
-    """Debug endpoint to check all properties in database"""
-    try:
-        from app.models.property import Property
-        properties = await Property.find().to_list()
-        
-        return {
-            "total_properties": len(properties),
-            "properties": [
-                {
-                    "id": str(prop.id),
-                    "title": prop.title,
-                    "seller_id": prop.seller_id,
-                    "seller_name": prop.seller_name,
-                    "status": prop.status,
-                    "created_at": prop.created_at.isoformat()
-                }
-                for prop in properties
-            ]
-        }
-    except Exception as e:
-        return {"error": str(e)}
-
-
-@app.get("/api/debug/user-properties/{user_id}")
-async def debug_user_properties(user_id: str):
-    """Debug endpoint to check properties for a specific user"""
-    try:
-        from app.models.property import Property
-        properties = await Property.find(Property.seller_id == user_id).to_list()
-        
-        return {
-            "user_id": user_id,
-            "total_properties": len(properties),
-            "properties": [
-                {
-                    "id": str(prop.id),
-                    "title": prop.title,
-                    "seller_id": prop.seller_id,
-                    "seller_name": prop.seller_name,
-                    "status": prop.status,
-                    "created_at": prop.created_at.isoformat()
-                }
-                for prop in properties
-            ]
-        }
-    except Exception as e:
-        return {"error": str(e)}
-
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
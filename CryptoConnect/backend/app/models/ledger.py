@@ -0,0 +1,38 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from typing import Optional
+from datetime import datetime
+
+
+class LedgerPosition(Document):
+    """Projected balance of one user in one property, folded from the transactions log"""
+    user_id: str
+    property_id: str
+    tokens: int = 0
+    cost_basis: float = 0.0  # Average-cost basis of the tokens still held
+    income_received: float = 0.0  # Rental distributions paid on this holding
+    last_event_id: Optional[str] = None  # Newest transaction applied; replays at or below it are skipped
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "ledger_positions"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("property_id", ASCENDING)], unique=True, name="position_by_user_property"),
+            # Holders of a property, largest first
+            IndexModel([("property_id", ASCENDING), ("tokens", DESCENDING)], name="holders_by_property")
+        ]
+
+
+class LedgerCheckpoint(Document):
+    """High-water mark of a projection over the transactions collection"""
+    name: str
+    last_event_id: Optional[str] = None
+    events_applied: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "ledger_checkpoints"
+        indexes = [
+            IndexModel([("name", ASCENDING)], unique=True)
+        ]
@@ -0,0 +1,55 @@
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+
+class LedgerAmount(BaseModel):
+    currency: str  # "XRP" for native amounts
+    value: str
+    issuer: Optional[str] = None
+
+
+class LedgerMemo(BaseModel):
+    memo_type: Optional[str] = None
+    memo_format: Optional[str] = None
+    memo_data: Optional[str] = None
+
+
+class LedgerTransaction(Document):
+    """A validated XRPL transaction touching our issuer or a user wallet, mirrored locally"""
+    hash: str
+    ledger_index: int
+    date: Optional[datetime] = None
+    transaction_type: str
+    account: str
+    destination: Optional[str] = None
+    accounts: List[str] = []  # Every tracked-relevant address on the transaction, for per-account history
+    amount: Optional[LedgerAmount] = None
+    delivered_amount: Optional[LedgerAmount] = None
+    fee_drops: Optional[str] = None
+    result: Optional[str] = None  # TransactionResult, e.g. tesSUCCESS
+    memos: List[LedgerMemo] = []
+    raw: Dict[str, Any] = {}
+    ingested_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "ledger_transactions"
+        indexes = [
+            IndexModel([("hash", ASCENDING)], unique=True),
+            IndexModel([("accounts", ASCENDING), ("ledger_index", DESCENDING)], name="history_by_account")
+        ]
+
+
+class LedgerAccountCursor(Document):
+    """Highest fully ingested ledger for one tracked address"""
+    address: str
+    last_ledger_index: int = 0
+    last_polled_at: Optional[datetime] = None
+
+    class Settings:
+        collection = "ledger_account_cursors"
+        indexes = [
+            IndexModel([("address", ASCENDING)], unique=True)
+        ]
@@ -0,0 +1,78 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+
+class OrderType(str, Enum):
+    BUY = "buy"
+    SELL = "sell"
+
+
+class OrderStatus(str, Enum):
+    ACTIVE = "active"
+    FILLED = "filled"
+    CANCELLED = "cancelled"
+    PARTIAL = "partial"
+    EXPIRED = "expired"
+
+
+class TimeInForce(str, Enum):
+    GTC = "gtc"  # Good till cancelled
+    IOC = "ioc"  # Immediate or cancel: fill what crosses now, drop the rest
+    FOK = "fok"  # Fill or kill: fill completely now or not at all
+    GTD = "gtd"  # Good till date: rests until expires_at
+
+
+# Orders still resting in the book and eligible for matching
+OPEN_STATUSES = [OrderStatus.ACTIVE, OrderStatus.PARTIAL]
+
+class MarketOrder(Document):
+    user_id: str
+    property_id: str
+    order_type: OrderType
+    tokens: int
+    price_per_token: float
+    total_amount: float
+    tokens_filled: int = 0
+    status: OrderStatus = OrderStatus.ACTIVE
+    time_in_force: TimeInForce = TimeInForce.GTC
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: Optional[datetime] = None
+    
+    class Settings:
+        collection = "market_orders"
+        indexes = [
+            "user_id",
+            "property_id",
+            "order_type",
+            "status",
+            "price_per_token",
+            # Matching: opposite side of one property's book, walked by price
+            IndexModel(
+                [("property_id", ASCENDING), ("order_type", ASCENDING), ("status", ASCENDING), ("price_per_token", ASCENDING)],
+                name="book_by_price"
+            ),
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="orders_by_user"),
+            # Expiry sweeper: only GTD orders carry a date
+            IndexModel(
+                [("status", ASCENDING), ("expires_at", ASCENDING)],
+                name="gtd_expiry",
+                partialFilterExpression={"expires_at": {"$type": "date"}}
+            )
+        ]
+
+
+class ArchivedMarketOrder(MarketOrder):
+    """Filled, cancelled and expired orders, moved out of the hot market_orders collection"""
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        collection = "market_orders_archive"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="archive_by_user"),
+            "property_id"
+        ]
@@ -0,0 +1,37 @@
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING
+from typing import List, Optional
+from datetime import datetime
+
+
+class OrderBookLevel(Document):
+    """Aggregated resting quantity at one price on one side of a property's book"""
+    property_id: str
+    side: str  # "buy" (bids) or "sell" (asks), matches OrderType values
+    price_per_token: float
+    quantity: int = 0  # Sum of tokens - tokens_filled over resting orders
+    order_count: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "order_book_levels"
+        indexes = [
+            IndexModel(
+                [("property_id", ASCENDING), ("side", ASCENDING), ("price_per_token", ASCENDING)],
+                unique=True
+            )
+        ]
+
+
+class DepthLevel(BaseModel):
+    price_per_token: float
+    quantity: int
+    order_count: int
+
+
+class DepthResponse(BaseModel):
+    property_id: str
+    tick_size: Optional[float] = None
+    bids: List[DepthLevel]
+    asks: List[DepthLevel]
@@ -0,0 +1,85 @@
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING
+from typing import Dict, List, Optional
+from datetime import datetime
+
+
+class PortfolioPosition(BaseModel):
+    """One property held by a user, with the property figures it was valued at"""
+    property_id: str
+    property_title: str = ""
+    tokens: int = 0
+    cost_basis: float = 0.0
+    token_price: float = 0.0
+    total_tokens: int = 0
+    monthly_rent: float = 0.0
+
+    @property
+    def current_value(self) -> float:
+        return self.tokens * self.token_price
+
+    @property
+    def monthly_income(self) -> float:
+        if self.total_tokens <= 0:
+            return 0.0
+        return self.tokens / self.total_tokens * self.monthly_rent
+
+
+class PortfolioSnapshot(Document):
+    """Running portfolio totals per user, kept up to date on every trade, investment, distribution or price change"""
+    user_id: str
+    positions: Dict[str, PortfolioPosition] = {}  # Keyed by property_id
+
+    # Additive totals over all positions
+    total_investment: float = 0.0
+    current_value: float = 0.0
+    monthly_income: float = 0.0
+    income_received: float = 0.0  # Rental distributions paid out so far
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "portfolio_snapshots"
+        indexes = [
+            IndexModel([("user_id", ASCENDING)], unique=True)
+        ]
+
+
+class PortfolioHistory(Document):
+    """Daily copy of a user's portfolio totals for charting"""
+    user_id: str
+    date: datetime  # Midnight UTC
+    total_investment: float = 0.0
+    current_value: float = 0.0
+    monthly_income: float = 0.0
+    income_received: float = 0.0
+    properties_count: int = 0
+    recorded_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "portfolio_history"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("date", ASCENDING)], unique=True)
+        ]
+
+
+class PortfolioHistoryPoint(BaseModel):
+    date: datetime
+    total_investment: float
+    current_value: float
+    monthly_income: float
+    income_received: float
+    properties_count: int
+
+
+class PortfolioSummaryResponse(BaseModel):
+    total_investment: float
+    total_current_value: float
+    total_monthly_income: float
+    annual_income: float
+    portfolio_yield: float
+    income_received: float
+    properties_count: int
+    updated_at: Optional[datetime] = None
+    recent_transactions: List[dict] = []
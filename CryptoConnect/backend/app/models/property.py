@@ -1,5 +1,6 @@
 from beanie import Document
 from pydantic import BaseModel
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -38,7 +39,8 @@ class Property(Document):
     total_tokens: int = 0  # Calculated as size_sqm * 10,000
     token_price: float = 0.0  # Calculated as total_value / total_tokens
     tokens_sold: int = 0
-    token_symbol: Optional[str] = None  # XRPL token symbol
+    token_symbol: Optional[str] = None  # XRPL currency code (40-hex for allocator-issued symbols)
+    token_display_symbol: Optional[str] = None  # Readable form of token_symbol
     
     # Property details
     bedrooms: Optional[int] = None
@@ -81,7 +83,10 @@ class Property(Document):
             "seller_id",
             "status",
             "property_type",
-            "city"
+            "city",
+            IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="catalogue_by_status"),
+            IndexModel([("seller_id", ASCENDING), ("created_at", DESCENDING)], name="by_seller"),
+            IndexModel([("token_symbol", ASCENDING), ("xrpl_issuer_address", ASCENDING)], name="by_token")
         ]
     
     def calculate_tokens_and_price(self):
@@ -129,6 +134,36 @@ class PropertyResponse(BaseModel):
     status: PropertyStatus
     images: List[str] = []
     created_at: datetime
+    tokenization_job_id: Optional[str] = None  # Tracking handle when tokenization was queued
+
+    @classmethod
+    def from_document(cls, prop: Property, **extra: Any) -> "PropertyResponse":
+        """Listing/detail view of a Property; `extra` fills route-specific fields such as tokenization_job_id"""
+        return cls.model_construct(
+            id=str(prop.id),
+            title=prop.title,
+            description=prop.description,
+            address=prop.address,
+            city=prop.city,
+            country=prop.country,
+            property_type=prop.property_type,
+            total_value=prop.total_value,
+            size_sqm=prop.size_sqm,
+            total_tokens=prop.total_tokens,
+            token_price=prop.token_price,
+            tokens_sold=prop.tokens_sold,
+            bedrooms=prop.bedrooms,
+            bathrooms=prop.bathrooms,
+            parking_spaces=prop.parking_spaces,
+            year_built=prop.year_built,
+            monthly_rent=prop.monthly_rent,
+            annual_yield=prop.annual_yield,
+            seller_name=prop.seller_name,
+            status=prop.status,
+            images=prop.images,
+            created_at=prop.created_at,
+            **extra
+        )
 
 
 class PropertyUpdateAdmin(BaseModel):
@@ -0,0 +1,66 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+
+
+class ReconciliationStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class DiscrepancyKind(str, Enum):
+    MISMATCH = "mismatch"  # Both sides hold the token but the amounts differ
+    MISSING_ON_LEDGER = "missing_on_ledger"  # DB says the user holds tokens, no ledger balance found
+    MISSING_IN_DB = "missing_in_db"  # Ledger balance for a known user the DB thinks holds nothing
+    UNKNOWN_HOLDER = "unknown_holder"  # Ledger balance held by an address no user owns
+    NO_WALLET = "no_wallet"  # DB holding for a user without an XRPL wallet
+
+
+class ReconciliationRun(Document):
+    """One pass comparing projected DB holdings with issuer trust-line balances"""
+    status: ReconciliationStatus = ReconciliationStatus.RUNNING
+    issuer_addresses: List[str] = []
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    # Metrics
+    ledger_pages: int = 0
+    trust_lines_scanned: int = 0
+    db_positions_checked: int = 0
+    matched: int = 0
+    discrepancy_count: int = 0
+    total_abs_difference: float = 0.0
+    duration_seconds: float = 0.0
+    error: Optional[str] = None
+
+    class Settings:
+        collection = "reconciliation_runs"
+        indexes = [
+            IndexModel([("started_at", DESCENDING)])
+        ]
+
+
+class ReconciliationDiscrepancy(Document):
+    """A single (token, holder) pair whose DB and ledger balances disagree"""
+    run_id: str
+    kind: DiscrepancyKind
+    issuer_address: str
+    token_symbol: str
+    holder_address: Optional[str] = None
+    property_id: Optional[str] = None
+    user_id: Optional[str] = None
+    db_tokens: float = 0.0
+    ledger_tokens: float = 0.0
+    difference: float = 0.0  # ledger - db
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "reconciliation_discrepancies"
+        indexes = [
+            IndexModel([("run_id", ASCENDING), ("kind", ASCENDING)]),
+            IndexModel([("property_id", ASCENDING), ("created_at", DESCENDING)])
+        ]
@@ -0,0 +1,59 @@
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING
+from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+
+
+class SettlementStatus(str, Enum):
+    PENDING = "pending"  # Matched off-ledger, waiting for the next settlement batch
+    SUBMITTED = "submitted"  # Legs submitted, waiting to appear in a validated ledger
+    SETTLED = "settled"
+    FAILED = "failed"
+
+
+class SettlementLegKind(str, Enum):
+    TOKEN = "token"  # Seller -> buyer, property tokens
+    XRP = "xrp"  # Buyer -> seller, cash leg (only when a settlement rate is configured)
+
+
+class SettlementLeg(BaseModel):
+    kind: SettlementLegKind
+    from_address: str
+    to_address: str
+    currency: str
+    issuer: Optional[str] = None
+    value: str  # Token amount, or drops for the XRP leg
+    tx_hash: Optional[str] = None
+    sequence: Optional[int] = None
+    last_ledger_sequence: Optional[int] = None
+    engine_result: Optional[str] = None  # Provisional result at submit time
+    result: Optional[str] = None  # Final result from the validated ledger
+
+
+class Settlement(Document):
+    """On-ledger settlement of one secondary market fill"""
+    property_id: str
+    buyer_id: str
+    seller_id: str
+    buy_order_id: str
+    sell_order_id: str
+    buyer_transaction_id: Optional[str] = None
+    seller_transaction_id: Optional[str] = None
+    tokens: int
+    price_per_token: float
+    status: SettlementStatus = SettlementStatus.PENDING
+    legs: List[SettlementLeg] = []
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    submitted_at: Optional[datetime] = None
+    settled_at: Optional[datetime] = None
+
+    class Settings:
+        collection = "settlements"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="settlement_queue"),
+            IndexModel([("property_id", ASCENDING), ("created_at", ASCENDING)])
+        ]
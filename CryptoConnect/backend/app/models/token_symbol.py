@@ -0,0 +1,21 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from typing import Optional
+from datetime import datetime
+
+
+class TokenSymbol(Document):
+    """A currency code reserved for exactly one property"""
+    currency_code: str  # What goes on the ledger: 40 hex chars (160-bit), or a legacy 3-char code
+    display_symbol: str  # Human-readable form, e.g. "CC3F9A1B2C4D"
+    property_id: str
+    legacy: bool = False  # Imported from a pre-allocator 3-char md5 symbol
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "token_symbols"
+        indexes = [
+            IndexModel([("currency_code", ASCENDING)], unique=True),
+            IndexModel([("property_id", ASCENDING)], unique=True)
+        ]
@@ -0,0 +1,49 @@
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+
+
+class TokenizationJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class TokenizationOutcome(str, Enum):
+    TOKENIZED = "tokenized"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+class TokenizationResult(BaseModel):
+    property_id: str
+    outcome: TokenizationOutcome
+    token_symbol: Optional[str] = None
+    error: Optional[str] = None
+
+
+class TokenizationJob(Document):
+    """A batch of properties pushed through the tokenization pipeline"""
+    property_ids: List[str]
+    requested_by: Optional[str] = None  # user_id
+    require_approved: bool = True
+    status: TokenizationJobStatus = TokenizationJobStatus.QUEUED
+    results: List[TokenizationResult] = []
+    tokenized: int = 0
+    skipped: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        collection = "tokenization_jobs"
+        indexes = [
+            IndexModel([("created_at", DESCENDING)]),
+            IndexModel([("property_ids", ASCENDING)])
+        ]
@@ -0,0 +1,65 @@
+from beanie import Document
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from datetime import datetime
+from enum import Enum
+
+
+class CandleInterval(str, Enum):
+    ONE_MINUTE = "1m"
+    ONE_HOUR = "1h"
+    ONE_DAY = "1d"
+
+
+class Trade(Document):
+    """A single secondary market fill, written once per executed trade"""
+    property_id: str
+    buy_order_id: str
+    sell_order_id: str
+    buyer_id: str
+    seller_id: str
+    tokens: int
+    price_per_token: float
+    total_amount: float
+    executed_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "trades"
+        indexes = [
+            IndexModel([("property_id", ASCENDING), ("executed_at", DESCENDING)])
+        ]
+
+
+class Candle(Document):
+    """Precomputed OHLCV bucket for one property and interval"""
+    property_id: str
+    interval: CandleInterval
+    bucket_start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int = 0  # Tokens traded
+    quote_volume: float = 0.0  # AED traded
+    trade_count: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "trade_candles"
+        indexes = [
+            IndexModel(
+                [("property_id", ASCENDING), ("interval", ASCENDING), ("bucket_start", ASCENDING)],
+                unique=True
+            )
+        ]
+
+
+class CandleResponse(BaseModel):
+    bucket_start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+    quote_volume: float
+    trade_count: int
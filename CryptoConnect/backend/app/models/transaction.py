@@ -1,5 +1,6 @@
 from beanie import Document
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from typing import Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -45,7 +46,7 @@ class Transaction(Document):
     notes: Optional[str] = None
     
     # Timestamps
-    created_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
     
     class Settings:
@@ -55,7 +56,20 @@ class Transaction(Document):
             "property_id",
             "transaction_type",
             "status",
-            "xrpl_tx_hash"
+            "xrpl_tx_hash",
+            # Token balance: user + property + type, completed rows only
+            IndexModel(
+                [("user_id", ASCENDING), ("property_id", ASCENDING), ("transaction_type", ASCENDING)],
+                name="balance_by_user_property",
+                partialFilterExpression={"status": "completed"}
+            ),
+            # Holders of a property (rental distribution)
+            IndexModel(
+                [("property_id", ASCENDING), ("transaction_type", ASCENDING), ("status", ASCENDING)],
+                name="property_type_status"
+            ),
+            # Transaction history, newest first, keyset-paginated on (created_at, _id)
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="history_by_user_keyset")
         ]
 
 
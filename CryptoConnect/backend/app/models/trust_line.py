@@ -0,0 +1,32 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+
+class TrustLineStatus(str, Enum):
+    ESTABLISHED = "established"
+    FAILED = "failed"
+
+
+class TrustLine(Document):
+    """A (wallet, currency, issuer) trust line we have set (or seen) on the ledger"""
+    wallet_address: str
+    currency: str
+    issuer_address: str
+    status: TrustLineStatus = TrustLineStatus.ESTABLISHED
+    tx_hash: Optional[str] = None  # None when discovered on the ledger rather than submitted by us
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "trust_lines"
+        indexes = [
+            IndexModel(
+                [("wallet_address", ASCENDING), ("currency", ASCENDING), ("issuer_address", ASCENDING)],
+                unique=True, name="line_by_wallet_currency"
+            )
+        ]
@@ -90,6 +90,25 @@ class UserResponse(BaseModel):
     kyc_status: Optional[KYCStatus] = None
     phone: Optional[str] = None
 
+    @classmethod
+    def from_document(cls, user: User) -> "UserResponse":
+        """Public profile of a User in the frontend's camelCase shape, without credentials or wallet seed"""
+        return cls.model_construct(
+            id=str(user.id),
+            email=user.email,
+            username=user.username,
+            firstName=user.first_name,
+            lastName=user.last_name,
+            walletAddress=user.xrpl_wallet_address,
+            isKYCVerified=user.is_kyc_verified,
+            userType=user.role.value,
+            createdAt=user.created_at,
+            role=user.role,
+            is_active=user.is_active,
+            kyc_status=user.kyc_status,
+            phone=user.phone
+        )
+
 
 class KYCSubmission(BaseModel):
     first_name: str
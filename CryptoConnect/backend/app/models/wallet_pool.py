@@ -0,0 +1,31 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+
+class PooledWalletStatus(str, Enum):
+    AVAILABLE = "available"
+    CLAIMED = "claimed"
+
+
+class PooledWallet(Document):
+    """A pre-generated (and on testnet pre-funded) XRPL wallet waiting to be handed to a user"""
+    address: str
+    seed: str
+    public_key: str
+    funded: bool = False
+    status: PooledWalletStatus = PooledWalletStatus.AVAILABLE
+    claimed_by: Optional[str] = None  # user_id
+    claimed_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        collection = "wallet_pool"
+        indexes = [
+            IndexModel([("address", ASCENDING)], unique=True),
+            # Oldest available wallet first
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="claim_order")
+        ]
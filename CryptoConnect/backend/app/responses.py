@@ -0,0 +1,38 @@
+"""
+Response Encoding
+orjson-backed responses shared by the routers. The app uses ORJSONResponse as its default
+response class; `trusted` goes further and skips response_model validation for data we
+built ourselves (from_document projections, raw listing rows).
+"""
+from typing import Any
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+import orjson
+
+
+def _default(value: Any) -> Any:
+    """Types orjson doesn't encode natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class TrustedJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also encodes Pydantic models and ObjectIds directly"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def trusted(content: Any, status_code: int = 200) -> TrustedJSONResponse:
+    """Return `content` as-is, bypassing FastAPI's response_model re-validation.
+
+    Only for data shaped by our own code; the route's response_model still documents it.
+    The from_document projections pair with this: they build responses with
+    model_construct, since a stored document was validated when it was written and
+    validating it again on the way out only costs time.
+    """
+    return TrustedJSONResponse(content, status_code=status_code)
@@ -1,10 +1,26 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Body
+from typing import List, Optional
 from bson import ObjectId
-from app.models.property import Property, PropertyResponse, PropertyUpdateAdmin
+from app.models.property import Property, PropertyResponse, PropertyUpdateAdmin, PropertyStatus
 from app.models.user import User
+from app.responses import trusted
 from app.auth import get_current_admin
 from app.services.tokenization_service import tokenization_service
+from app.services.property_listing_service import property_listing_service
+from app.services.tokenization_pipeline import tokenization_pipeline
+from app.models.tokenization_job import TokenizationJob
+from app.services.order_book_service import order_book_service
+from app.services.portfolio_service import portfolio_service
+from app.services.analytics_service import analytics_service
+from app.services.ledger_service import ledger_service
+from app.services.reconciliation_service import reconciliation_service
+from app.services.ledger_ingestion_service import ledger_ingestion_service
+from app.services.wallet_pool_service import wallet_pool_service
+from app.services.trust_line_service import trust_line_service
+from app.services.settlement_service import settlement_service
+from app.models.settlement import Settlement, SettlementStatus
+from app.database import db
+from app.models.reconciliation import DiscrepancyKind
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -12,37 +28,8 @@ router = APIRouter(prefix="/api/admin", tags=["admin"])
 @router.get("/properties/pending", response_model=List[PropertyResponse])
 async def get_pending_properties(current_user: User = Depends(get_current_admin)):
     """Get all properties pending review"""
-    properties = await Property.find(
-        Property.status == "pending_review"
-    ).to_list()
-    
-    return [
-        PropertyResponse(
-            id=str(prop.id),
-            title=prop.title,
-            description=prop.description,
-            address=prop.address,
-            city=prop.city,
-            country=prop.country,
-            property_type=prop.property_type,
-            total_value=prop.total_value,
-            size_sqm=prop.size_sqm,
-            total_tokens=prop.total_tokens,
-            token_price=prop.token_price,
-            tokens_sold=prop.tokens_sold,
-            bedrooms=prop.bedrooms,
-            bathrooms=prop.bathrooms,
-            parking_spaces=prop.parking_spaces,
-            year_built=prop.year_built,
-            monthly_rent=prop.monthly_rent,
-            annual_yield=prop.annual_yield,
-            seller_name=prop.seller_name,
-            status=prop.status,
-            images=prop.images,
-            created_at=prop.created_at
-        )
-        for prop in properties
-    ]
+    rows = await property_listing_service.list_rows({"status": PropertyStatus.PENDING_REVIEW.value})
+    return trusted(rows)
 
 
 @router.put("/properties/{property_id}/status")
@@ -113,6 +100,74 @@ async def tokenize_property(
     }
 
 
+@router.post("/properties/tokenize-batch", status_code=status.HTTP_202_ACCEPTED)
+async def tokenize_properties_batch(
+    property_ids: List[str] = Body(..., embed=True),
+    current_user: User = Depends(get_current_admin)
+):
+    """Queue a batch of approved properties for tokenization; poll the returned job"""
+    if not property_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No property IDs given"
+        )
+    
+    job = await tokenization_pipeline.submit(property_ids, requested_by=str(current_user.id))
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "properties": len(job.property_ids),
+        "status_url": f"/api/admin/tokenization-jobs/{job.id}"
+    }
+
+
+@router.get("/tokenization-jobs", response_model=List[TokenizationJob])
+async def list_tokenization_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_admin)
+):
+    """Most recent tokenization jobs"""
+    return await TokenizationJob.find().sort(-TokenizationJob.created_at).limit(limit).to_list()
+
+
+@router.get("/tokenization-jobs/{job_id}", response_model=TokenizationJob)
+async def get_tokenization_job(
+    job_id: str,
+    current_user: User = Depends(get_current_admin)
+):
+    """Progress and per-property outcomes of one tokenization job"""
+    job = await tokenization_pipeline.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tokenization job not found"
+        )
+    return job
+
+
+@router.post("/properties/{property_id}/trust-lines")
+async def pre_establish_trust_lines(
+    property_id: str,
+    user_ids: Optional[List[str]] = Query(None),
+    current_user: User = Depends(get_current_admin)
+):
+    """Open the property's trust line for likely buyers (or the given users) in parallel"""
+    property_obj = await Property.get(property_id)
+    if not property_obj:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+    
+    if not property_obj.xrpl_token_created:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Property not tokenized yet"
+        )
+    
+    return await trust_line_service.pre_establish(property_obj, user_ids)
+
+
 @router.post("/properties/{property_id}/distribute-income")
 async def distribute_rental_income(
     property_id: str,
@@ -150,6 +205,144 @@ async def distribute_rental_income(
     return {"message": "Rental income distributed successfully"}
 
 
+@router.post("/market/rebuild-depth")
+async def rebuild_order_book_depth(
+    property_id: str = None,
+    current_user: User = Depends(get_current_admin)
+):
+    """Recompute aggregated order book levels from resting orders"""
+    levels = await order_book_service.rebuild(property_id)
+    return {"message": "Order book depth rebuilt", "levels": levels}
+
+
+@router.post("/ledger/rebuild")
+async def rebuild_ledger_projection(current_user: User = Depends(get_current_admin)):
+    """Replay the whole transactions log into fresh ledger positions"""
+    events = await ledger_service.rebuild()
+    return {"message": "Ledger projection rebuilt", "events": events}
+
+
+@router.post("/ledger/catch-up")
+async def catch_up_ledger_projection(current_user: User = Depends(get_current_admin)):
+    """Apply any events past the projection checkpoint now"""
+    events = await ledger_service.catch_up()
+    return {"message": "Ledger projection caught up", "events": events}
+
+
+@router.get("/wallet-pool")
+async def get_wallet_pool_stats(current_user: User = Depends(get_current_admin)):
+    """Available vs claimed pre-funded wallets"""
+    return await wallet_pool_service.stats()
+
+
+@router.post("/wallet-pool/refill")
+async def refill_wallet_pool(current_user: User = Depends(get_current_admin)):
+    """Top the wallet pool up to its target size now"""
+    created = await wallet_pool_service.refill(force=True)
+    return {"message": "Wallet pool refilled", "created": created, **await wallet_pool_service.stats()}
+
+
+@router.post("/wallet-pool/backfill")
+async def backfill_user_wallets(current_user: User = Depends(get_current_admin)):
+    """Provision a wallet for every existing user that has none"""
+    return await wallet_pool_service.backfill()
+
+
+@router.post("/ledger-ingestion/run")
+async def run_ledger_ingestion(current_user: User = Depends(get_current_admin)):
+    """Poll every tracked account for new validated transactions now"""
+    stored = await ledger_ingestion_service.run()
+    return {"message": "Ledger ingestion pass complete", "transactions": stored}
+
+
+@router.get("/settlements", response_model=List[Settlement])
+async def list_settlements(
+    status_filter: Optional[SettlementStatus] = Query(None, alias="status"),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_admin)
+):
+    """On-ledger settlements of secondary market fills, newest first"""
+    return await settlement_service.list_settlements(status_filter, limit)
+
+
+@router.post("/settlements/run")
+async def run_settlement(current_user: User = Depends(get_current_admin)):
+    """Confirm submitted settlements and submit the next batch now"""
+    counts = await settlement_service.run()
+    return {"message": "Settlement round complete", **counts}
+
+
+@router.get("/database/pool")
+async def get_database_pool_metrics(current_user: User = Depends(get_current_admin)):
+    """Connection pool utilisation per server: open, checked out, waiting, checkout waits and failures"""
+    return db.pool_metrics.snapshot()
+
+
+@router.post("/reconciliation/run")
+async def run_reconciliation(current_user: User = Depends(get_current_admin)):
+    """Compare DB holdings with issuer trust lines now"""
+    run = await reconciliation_service.run()
+    if run is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A reconciliation run is already in progress"
+        )
+    return run
+
+
+@router.get("/reconciliation/runs")
+async def get_reconciliation_runs(
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(get_current_admin)
+):
+    """Recent reconciliation runs with their metrics, newest first"""
+    return await reconciliation_service.latest_runs(limit)
+
+
+@router.get("/reconciliation/runs/{run_id}/discrepancies")
+async def get_reconciliation_discrepancies(
+    run_id: str,
+    kind: DiscrepancyKind = None,
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: User = Depends(get_current_admin)
+):
+    """Discrepancy report for one run"""
+    return await reconciliation_service.get_discrepancies(run_id, kind, limit)
+
+
+@router.post("/portfolio/rebuild")
+async def rebuild_portfolio_snapshots(
+    user_id: str = None,
+    current_user: User = Depends(get_current_admin)
+):
+    """Recompute portfolio snapshots from transactions (one user, or everyone)"""
+    if user_id:
+        await portfolio_service.rebuild_user(user_id)
+        return {"message": "Portfolio snapshot rebuilt", "users": 1}
+    users = await portfolio_service.rebuild_all()
+    return {"message": "Portfolio snapshots rebuilt", "users": users}
+
+
+@router.get("/analytics/platform")
+async def get_platform_analytics(
+    mark: str = Query("token_price", pattern="^(token_price|last_trade)$"),
+    top: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_admin)
+):
+    """Platform-wide ownership, exposure, XIRR distribution and cash flows"""
+    return await analytics_service.platform_report(mark=mark, top=top)
+
+
+@router.get("/analytics/investors/{user_id}")
+async def get_investor_analytics_admin(
+    user_id: str,
+    mark: str = Query("token_price", pattern="^(token_price|last_trade)$"),
+    current_user: User = Depends(get_current_admin)
+):
+    """One investor's analytics report"""
+    return await analytics_service.investor_report(user_id, mark=mark)
+
+
 @router.get("/dashboard")
 async def get_admin_dashboard(current_user: User = Depends(get_current_admin)):
     """Get admin dashboard statistics"""
@@ -183,41 +376,8 @@ async def get_admin_dashboard(current_user: User = Depends(get_current_admin)):
 async def get_all_properties(current_user: User = Depends(get_current_admin)):
     """Get all properties for admin review"""
     try:
-        properties = await Property.find().to_list()
-        
-        property_list = []
-        for prop in properties:
-            # Convert property to dict with safe field access
-            prop_dict = {
-                "id": str(prop.id),
-                "title": getattr(prop, 'title', ''),
-                "description": getattr(prop, 'description', ''),
-                "address": getattr(prop, 'address', ''),
-                "city": getattr(prop, 'city', ''),
-                "country": getattr(prop, 'country', ''),
-                "property_type": str(getattr(prop, 'property_type', 'apartment')),
-                "total_value": getattr(prop, 'total_value', 0),
-                "size_sqm": getattr(prop, 'size_sqm', 0),
-                "total_tokens": getattr(prop, 'total_tokens', 0),
-                "token_price": getattr(prop, 'token_price', 0),
-                "tokens_sold": getattr(prop, 'tokens_sold', 0),
-                "bedrooms": getattr(prop, 'bedrooms', None),
-                "bathrooms": getattr(prop, 'bathrooms', None),
-                "parking_spaces": getattr(prop, 'parking_spaces', None),
-                "year_built": getattr(prop, 'year_built', None),
-                "monthly_rent": getattr(prop, 'monthly_rent', None),
-                "annual_yield": getattr(prop, 'annual_yield', None),
-                "status": getattr(prop, 'status', 'pending_review'),
-                "images": getattr(prop, 'images', []),
-                "created_at": prop.created_at.isoformat() if hasattr(prop, 'created_at') and prop.created_at else None,
-                "seller_name": getattr(prop, 'seller_name', 'Unknown Seller'),
-                "seller_id": getattr(prop, 'seller_id', None),
-                "seller_email": getattr(prop, 'seller_email', None)
-            }
-            
-            property_list.append(prop_dict)
-        
-        return property_list
+        rows = await property_listing_service.list_rows(include_seller=True)
+        return trusted(rows)
     except Exception as e:
         import traceback
         print(f"Error in get_all_properties: {str(e)}")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from app.models.user import User, UserCreate, UserLogin, UserResponse, KYCSubmission, UserRole
+from app.responses import trusted
 from app.auth import (
     verify_password, 
     get_password_hash, 
@@ -9,7 +10,7 @@ from app.auth import (
     get_current_active_user
 )
 from app.config import settings
-# from app.services.wallet_service import wallet_service
+from app.services.wallet_pool_service import wallet_pool_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -57,26 +58,15 @@ async def register_user(user_data: UserCreate):
         last_name=last_name
     )
     
-    # XRP wallet assignment temporarily disabled
-    # Will be assigned manually using the database script
-    
     await user.save()
     
-    return UserResponse(
-        id=str(user.id),
-        email=user.email,
-        username=user.username,
-        firstName=user.first_name,
-        lastName=user.last_name,
-        walletAddress=user.xrpl_wallet_address,
-        isKYCVerified=user.is_kyc_verified,
-        userType=user.role.value,
-        createdAt=user.created_at,
-        role=user.role,
-        is_active=user.is_active,
-        kyc_status=user.kyc_status,
-        phone=user.phone
-    )
+    # Claim a pre-funded wallet; if the pool is dry the first investment provisions one
+    try:
+        await wallet_pool_service.ensure_wallet(user, create_if_empty=False)
+    except Exception as e:
+        logger.error(f"Wallet claim failed for {user.username}: {e}")
+    
+    return UserResponse.from_document(user)
 
 
 @router.post("/login")
@@ -118,38 +108,14 @@ async def login_user(user_data: UserLogin):
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": UserResponse(
-            id=str(user.id),
-            email=user.email,
-            username=user.username,
-            firstName=user.first_name,
-            lastName=user.last_name,
-            walletAddress=user.xrpl_wallet_address,
-            isKYCVerified=user.is_kyc_verified,
-            userType=user.role.value,
-            createdAt=user.created_at,
-            role=user.role,
-            is_active=user.is_active,
-            kyc_status=user.kyc_status,
-            phone=user.phone
-        )
+        "user": UserResponse.from_document(user)
     }
 
 
 @router.get("/user", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
     """Get current user information with role"""
-    return UserResponse(
-        id=str(current_user.id),
-        email=current_user.email,
-        username=current_user.username,
-        firstName=current_user.first_name,
-        lastName=current_user.last_name,
-        walletAddress=current_user.xrpl_wallet_address,
-        isKYCVerified=current_user.is_kyc_verified,
-        userType=current_user.role.value,
-        createdAt=current_user.created_at.isoformat()
-    )
+    return trusted(UserResponse.from_document(current_user))
 
 
 @router.get("/user/role")
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+from bson import ObjectId
 from app.models.transaction import Transaction, TransactionResponse, UserHolding, IncomeStatement, TransactionType, TransactionStatus
 from app.models.property import Property
 from app.models.user import User
+from app.models.portfolio import PortfolioSummaryResponse, PortfolioHistoryPoint
+from app.responses import trusted
 from app.auth import get_current_verified_user, get_current_active_user, get_current_user, get_current_investor
 from app.services.xrpl_service import xrpl_service
+from app.services.transaction_history_service import transaction_history_service
+from app.services.portfolio_service import portfolio_service
+from app.services.ledger_service import ledger_service
+from app.services.analytics_service import analytics_service
+from app.database import read_collection
 
 router = APIRouter(prefix="/api/investor", tags=["investor"])
 
@@ -13,230 +23,56 @@ router = APIRouter(prefix="/api/investor", tags=["investor"])
 async def get_user_holdings(current_user: User = Depends(get_current_investor)):
     """Get current user's token holdings - INVESTOR ACCESS ONLY"""
     try:
-        print("🚀🚀🚀 HOLDINGS ENDPOINT CALLED!")
-        print(f"👤 User: {current_user.email} (ID: {current_user.id})")
-        
         user_id_str = str(current_user.id)
-        print(f"🔍 Searching for transactions with user_id: {user_id_str}")
-        
-        # Use Beanie query methods instead of direct MongoDB collection access
-        all_transactions_cursor = Transaction.find(Transaction.user_id == user_id_str)
-        all_transactions = await all_transactions_cursor.to_list()
-        
-        print(f"📊 Found {len(all_transactions)} total transactions for user")
-        
-        # Find completed purchase transactions using correct enum values
-        # Find purchase transactions using Beanie queries
-        purchase_transactions_1 = await Transaction.find(
-            Transaction.user_id == user_id_str,
-            Transaction.transaction_type == "token_purchase",
-            Transaction.status == "completed"
-        ).to_list()
-        
-        purchase_transactions_2 = await Transaction.find(
-            Transaction.user_id == user_id_str,
-            Transaction.transaction_type == TransactionType.TOKEN_PURCHASE,
-            Transaction.status == TransactionStatus.COMPLETED
-        ).to_list()
-        
-        # Combine all purchase transactions
-        purchase_transactions = purchase_transactions_1 + purchase_transactions_2
-        
-        print(f"� Found {len(all_transactions)} total transactions for user")
-        
-        # Convert to dict format for easier processing and filter for purchases
-        purchase_transactions = []
-        for tx in all_transactions:
-            tx_dict = tx.dict() if hasattr(tx, 'dict') else tx
-            
-            # Handle both enum objects and string values
-            tx_type = tx_dict.get("transaction_type", "")
-            if hasattr(tx_type, 'value'):  # It's an enum
-                tx_type = tx_type.value
-            tx_type = str(tx_type).lower()
-            
-            tx_status = tx_dict.get("status", "")
-            if hasattr(tx_status, 'value'):  # It's an enum  
-                tx_status = tx_status.value
-            tx_status = str(tx_status).lower()
-            
-            # Check for purchase transactions with completed status
-            if ("purchase" in tx_type) and ("complete" in tx_status):
-                purchase_transactions.append(tx_dict)
-                print(f"   ✅ Found purchase: {tx_type} - {tx_status}")
-            else:
-                print(f"   ❌ Skipped: {tx_type} - {tx_status}")
-        
-        print(f"�📊 Found {len(purchase_transactions)} completed purchase transactions")
-        
-        # If no transactions found, try broader search with string patterns
-        if len(purchase_transactions) == 0:
-            purchase_transactions_3 = await Transaction.find(
-                Transaction.user_id == user_id_str,
-                Transaction.transaction_type == "TOKEN_PURCHASE",
-                Transaction.status == "COMPLETED"
-            ).to_list()
-            
-            purchase_transactions_4 = await Transaction.find(
-                Transaction.user_id == user_id_str,
-                Transaction.transaction_type == "TOKEN_PURCHASE", 
-                Transaction.status == "completed"
-            ).to_list()
-            
-            purchase_transactions = purchase_transactions_3 + purchase_transactions_4
-            print(f"📊 Regex search found {len(purchase_transactions)} transactions")
-        
-        # Show sample transaction for debugging
-        if all_transactions:
-            sample_tx = all_transactions[0]
-            print(f"📝 Sample transaction: type='{sample_tx.get('transaction_type')}', status='{sample_tx.get('status')}'")
-        
-        # Calculate holdings from actual transactions
-        holdings = []
-        if purchase_transactions:
-            # Group transactions by property
-            property_holdings = {}
-            
-            for tx in purchase_transactions:
-                property_id = tx.get("property_id")
-                tokens = tx.get("tokens", 0)
-                amount = tx.get("amount", 0.0)
-                
-                if property_id not in property_holdings:
-                    property_holdings[property_id] = {
-                        "tokens": 0,
-                        "total_investment": 0.0,
-                        "transactions": []
-                    }
-                
-                property_holdings[property_id]["tokens"] += tokens
-                property_holdings[property_id]["total_investment"] += amount
-                property_holdings[property_id]["transactions"].append(tx)
-                
-                print(f"   + Property {property_id}: {tokens} tokens, ${amount}")
-            
-            # Convert to response format
-            for property_id, holding in property_holdings.items():
-                try:
-                    # Get property details
-                    property_obj = await Property.get(property_id)
-                    if property_obj:
-                        current_value = holding["tokens"] * property_obj.token_price
-                        holding_item = {
-                            "property_id": property_id,
-                            "property_title": property_obj.title,
-                            "tokens": holding["tokens"],
-                            "total_investment": holding["total_investment"],
-                            "current_value": current_value,
-                            "property_status": str(property_obj.status)
-                        }
-                        holdings.append(holding_item)
-                        print(f"   ✅ Added holding: {property_obj.title} - {holding['tokens']} tokens")
-                except Exception as e:
-                    print(f"   ❌ Error getting property {property_id}: {e}")
-                    continue
         
-        # Fallback: Return hardcoded data if user has transactions but no holdings calculated  
-        if len(all_transactions) > 0 and len(holdings) == 0:
-            print("⚠️ Fallback: Using hardcoded data since transactions exist but no holdings calculated")
-            holdings = [{
-                "property_id": "68ce70f2ca6f1a985cc1f469",
-                "property_title": "Alex Property",
-                "tokens": 100,
-                "total_investment": 219.466,
-                "current_value": 100.0,
-                "property_status": "active"
-            }]
+        # Balances and cost basis from the ledger projection
+        positions = await ledger_service.get_user_positions(user_id_str)
+        held = {pid: position for pid, position in positions.items() if position["tokens"] > 0}
+        print(f"📊 {current_user.email} holds {len(held)} properties")
         
-        print(f"🎯 Final holdings response: {holdings}")
-        return holdings
-        
-    except Exception as e:
-        print(f"❌ ERROR in holdings endpoint: {e}")
-        import traceback
-        traceback.print_exc()
-        return []
-    try:
-        user_id_str = str(current_user.id)
-
-        # --- RAW DATABASE QUERY --- #
-        transaction_collection = Transaction.get_motor_collection()
-
-        purchase_filter = {
-            "user_id": user_id_str,
-            "transaction_type": {"$in": ["token_purchase", "secondary_market_buy"]},
-            "status": "completed"
-        }
-        sale_filter = {
-            "user_id": user_id_str,
-            "transaction_type": {"$in": ["token_sale", "secondary_market_sell"]},
-            "status": "completed"
-        }
-
-        purchase_cursor = transaction_collection.find(purchase_filter)
-        sale_cursor = transaction_collection.find(sale_filter)
-
-        purchase_transactions_raw = await purchase_cursor.to_list(length=None)
-        sale_transactions_raw = await sale_cursor.to_list(length=None)
-
-        purchase_transactions = [Transaction.parse_obj(raw_tx) for raw_tx in purchase_transactions_raw]
-        sale_transactions = [Transaction.parse_obj(raw_tx) for raw_tx in sale_transactions_raw]
-        # --- END OF RAW QUERY --- #
-
-        property_holdings = {}
-
-        for tx in purchase_transactions:
-            if tx.property_id not in property_holdings:
-                property_holdings[tx.property_id] = {"tokens": 0, "total_investment": 0.0}
-            property_holdings[tx.property_id]["tokens"] += tx.tokens
-            property_holdings[tx.property_id]["total_investment"] += tx.amount
-
-        for tx in sale_transactions:
-            if tx.property_id in property_holdings:
-                property_holdings[tx.property_id]["tokens"] -= tx.tokens
-                if property_holdings[tx.property_id]["tokens"] > 0:
-                    reduction_ratio = tx.tokens / (property_holdings[tx.property_id]["tokens"] + tx.tokens)
-                    property_holdings[tx.property_id]["total_investment"] *= (1 - reduction_ratio)
+        valid_ids = [ObjectId(pid) for pid in held if ObjectId.is_valid(pid)]
+        property_docs = await read_collection(Property).find({"_id": {"$in": valid_ids}}).to_list(length=None) if valid_ids else []
+        properties = {str(doc["_id"]): Property.model_validate(doc) for doc in property_docs}
 
         holdings = []
-        for property_id, holding in property_holdings.items():
-            if holding["tokens"] > 0:
-                property_obj = await Property.get(property_id)
-                if not property_obj:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Data integrity error: Property with ID '{property_id}' not found, but a transaction for it exists."
-                    )
+        for property_id, position in held.items():
+            property_obj = properties.get(property_id)
+            if not property_obj:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Data integrity error: Property with ID '{property_id}' not found, but a transaction for it exists."
+                )
 
-                holding_data = {
-                    "id": f"{property_id}_{user_id_str}",
-                    "property_id": property_id,
-                    "property_title": property_obj.title,
-                    "tokens": holding["tokens"],
-                    "tokenAmount": holding["tokens"],
-                    "token_amount": holding["tokens"],
-                    "total_investment": holding["total_investment"],
-                    "totalInvested": holding["total_investment"],
-                    "current_value": holding["tokens"] * property_obj.token_price,
-                    "property_status": property_obj.status,
-                    "averagePurchasePrice": holding["total_investment"] / holding["tokens"] if holding["tokens"] > 0 else 0,
-                    "average_purchase_price": holding["total_investment"] / holding["tokens"] if holding["tokens"] > 0 else 0,
-                    "property": {
-                        "id": str(property_obj.id),
-                        "title": property_obj.title,
-                        "name": property_obj.title,
-                        "address": property_obj.address,
-                        "city": property_obj.city,
-                        "country": property_obj.country,
-                        "tokenPrice": property_obj.token_price,
-                        "token_price": property_obj.token_price,
-                        "totalTokens": property_obj.total_tokens,
-                        "total_tokens": property_obj.total_tokens,
-                        "tokens_sold": property_obj.tokens_sold,
-                        "status": property_obj.status
-                    }
+            tokens = position["tokens"]
+            total_investment = position["cost_basis"]
+            holdings.append({
+                "id": f"{property_id}_{user_id_str}",
+                "property_id": property_id,
+                "property_title": property_obj.title,
+                "tokens": tokens,
+                "tokenAmount": tokens,
+                "token_amount": tokens,
+                "total_investment": total_investment,
+                "totalInvested": total_investment,
+                "current_value": tokens * property_obj.token_price,
+                "property_status": property_obj.status,
+                "averagePurchasePrice": total_investment / tokens,
+                "average_purchase_price": total_investment / tokens,
+                "property": {
+                    "id": str(property_obj.id),
+                    "title": property_obj.title,
+                    "name": property_obj.title,
+                    "address": property_obj.address,
+                    "city": property_obj.city,
+                    "country": property_obj.country,
+                    "tokenPrice": property_obj.token_price,
+                    "token_price": property_obj.token_price,
+                    "totalTokens": property_obj.total_tokens,
+                    "total_tokens": property_obj.total_tokens,
+                    "tokens_sold": property_obj.tokens_sold,
+                    "status": property_obj.status
                 }
-                holdings.append(holding_data)
+            })
 
         return holdings
     except Exception as e:
@@ -247,35 +83,73 @@ async def get_user_holdings(current_user: User = Depends(get_current_investor)):
             detail=f"An unexpected error occurred in get_user_holdings: {str(e)}"
         )
 
+
 @router.get("/transactions")
 async def get_user_transactions(current_user: User = Depends(get_current_investor)):
     """Get user's transaction history - INVESTOR ACCESS ONLY"""
     try:
-        transactions = await Transaction.find(
-            Transaction.user_id == str(current_user.id)
-        ).sort(-Transaction.created_at).to_list()
-        
-        result = []
-        for tx in transactions:
-            result.append({
-                "id": str(tx.id),
-                "transaction_type": tx.transaction_type,
-                "status": tx.status,
-                "user_id": tx.user_id,
-                "property_id": tx.property_id,
-                "amount": tx.amount,
-                "tokens": tx.tokens,
-                "token_price": tx.token_price,
-                "xrpl_tx_hash": tx.xrpl_tx_hash,
-                "created_at": tx.created_at.isoformat() if tx.created_at else None,
-                "completed_at": tx.completed_at.isoformat() if tx.completed_at else None
-            })
-        
-        return result
+        # Full list kept for the existing portfolio/income pages; large histories should use /transactions/page
+        return trusted([row async for row in transaction_history_service.iter_rows(str(current_user.id))])
     except Exception as e:
         return []  # Return empty list if any error occurs
 
 
+@router.get("/transactions/page")
+async def get_user_transactions_page(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    transaction_type: Optional[List[TransactionType]] = Query(None),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_investor)
+):
+    """Keyset-paginated transaction history, newest first - INVESTOR ACCESS ONLY"""
+    try:
+        return await transaction_history_service.get_page(
+            str(current_user.id),
+            limit=limit,
+            cursor=cursor,
+            transaction_types=[t.value for t in transaction_type] if transaction_type else None,
+            start=start,
+            end=end
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/transactions/export")
+async def export_user_transactions(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    transaction_type: Optional[List[TransactionType]] = Query(None),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_investor)
+):
+    """Stream the full transaction history as CSV or NDJSON - INVESTOR ACCESS ONLY"""
+    rows = transaction_history_service.iter_rows(
+        str(current_user.id),
+        transaction_types=[t.value for t in transaction_type] if transaction_type else None,
+        start=start,
+        end=end
+    )
+    if format == "ndjson":
+        body = transaction_history_service.export_ndjson(rows)
+        media_type = "application/x-ndjson"
+    else:
+        body = transaction_history_service.export_csv(rows)
+        media_type = "text/csv"
+
+    filename = f"transactions-{datetime.utcnow().strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/income-statements")
 async def get_income_statements(current_user: User = Depends(get_current_investor)):
     """Get user's rental income statements - INVESTOR ACCESS ONLY"""
@@ -311,30 +185,27 @@ async def get_income_statements(current_user: User = Depends(get_current_investo
         return []  # Return empty list if any error occurs
 
 
-@router.get("/portfolio-summary")
+@router.get("/portfolio-summary", response_model=PortfolioSummaryResponse)
 async def get_portfolio_summary(current_user: User = Depends(get_current_investor)):
     """Get comprehensive portfolio summary - INVESTOR ACCESS ONLY"""
-    # Get holdings
-    holdings = await get_user_holdings(current_user)
-    
-    # Calculate totals
-    total_investment = sum(holding.total_investment for holding in holdings)
-    total_current_value = sum(holding.current_value for holding in holdings)
-    total_monthly_income = sum(holding.monthly_rental_income for holding in holdings)
+    snapshot = await portfolio_service.get_snapshot(str(current_user.id))
     
     # Get recent transactions
     recent_transactions = await Transaction.find(
         Transaction.user_id == str(current_user.id)
     ).sort(-Transaction.created_at).limit(5).to_list()
     
-    return {
-        "total_investment": total_investment,
-        "total_current_value": total_current_value,
-        "total_monthly_income": total_monthly_income,
-        "annual_income": total_monthly_income * 12,
-        "portfolio_yield": (total_monthly_income * 12 / total_investment * 100) if total_investment > 0 else 0,
-        "properties_count": len(holdings),
-        "recent_transactions": [
+    annual_income = snapshot.monthly_income * 12
+    return PortfolioSummaryResponse(
+        total_investment=snapshot.total_investment,
+        total_current_value=snapshot.current_value,
+        total_monthly_income=snapshot.monthly_income,
+        annual_income=annual_income,
+        portfolio_yield=(annual_income / snapshot.total_investment * 100) if snapshot.total_investment > 0 else 0,
+        income_received=snapshot.income_received,
+        properties_count=len(snapshot.positions),
+        updated_at=snapshot.updated_at,
+        recent_transactions=[
             {
                 "id": str(tx.id),
                 "type": tx.transaction_type,
@@ -344,31 +215,53 @@ async def get_portfolio_summary(current_user: User = Depends(get_current_investo
             }
             for tx in recent_transactions
         ]
-    }
+    )
+
+
+@router.get("/portfolio-history", response_model=List[PortfolioHistoryPoint])
+async def get_portfolio_history(
+    days: int = Query(90, ge=1, le=3650),
+    current_user: User = Depends(get_current_investor)
+):
+    """Daily portfolio totals for charting - INVESTOR ACCESS ONLY"""
+    history = await portfolio_service.get_history(str(current_user.id), days)
+    return [
+        PortfolioHistoryPoint(
+            date=point.date,
+            total_investment=point.total_investment,
+            current_value=point.current_value,
+            monthly_income=point.monthly_income,
+            income_received=point.income_received,
+            properties_count=point.properties_count
+        )
+        for point in history
+    ]
+
+
+@router.get("/analytics")
+async def get_investor_analytics(
+    mark: str = Query("token_price", pattern="^(token_price|last_trade)$"),
+    months_ahead: int = Query(12, ge=1, le=120),
+    current_user: User = Depends(get_current_investor)
+):
+    """Ownership, realized yield, XIRR, exposure and cash-flow schedule - INVESTOR ACCESS ONLY"""
+    return await analytics_service.investor_report(str(current_user.id), mark=mark, months_ahead=months_ahead)
+
 
 @router.get("/debug-all-transactions")
-async def debug_all_transactions(current_user: User = Depends(get_current_investor)):
-    """Debug: Return all transactions for the current user, raw from DB - INVESTOR ACCESS ONLY"""
+async def debug_all_transactions(
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_investor)
+):
+    """Debug: Return the current user's most recent transactions, raw from DB - INVESTOR ACCESS ONLY"""
     user_id_str = str(current_user.id)
-    print(f"🐞 DEBUG: Fetching all transactions for user_id: {user_id_str}")
-    txs = await Transaction.find(Transaction.user_id == user_id_str).to_list()
-    print(f"🐞 Found {len(txs)} transactions for user {user_id_str}")
-    for tx in txs:
-        print(f"  - {tx.transaction_type} | {tx.status} | {tx.property_id} | tokens: {tx.tokens} | amount: {tx.amount}")
-    # Return as JSON for inspection
+    docs = await Transaction.get_pymongo_collection().find({"user_id": user_id_str}).sort([("created_at", -1), ("_id", -1)]).limit(limit).to_list(length=limit)
     return [
         {
-            "id": str(tx.id),
-            "transaction_type": tx.transaction_type,
-            "status": tx.status,
-            "user_id": tx.user_id,
-            "property_id": tx.property_id,
-            "amount": tx.amount,
-            "tokens": tx.tokens,
-            "token_price": getattr(tx, 'token_price', None),
-            "created_at": tx.created_at.isoformat() if tx.created_at else None,
-            "completed_at": tx.completed_at.isoformat() if tx.completed_at else None,
-            "metadata": tx.metadata
+            **{k: v for k, v in doc.items() if k != "_id"},
+            "id": str(doc["_id"]),
+            "created_at": doc["created_at"].isoformat() if doc.get("created_at") else None,
+            "completed_at": doc["completed_at"].isoformat() if doc.get("completed_at") else None
         }
-        for tx in txs
-    ]
\ No newline at end of file
+        for doc in docs
+    ]
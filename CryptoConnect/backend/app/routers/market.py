@@ -1,49 +1,36 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, WebSocket, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 from app.models.user import User
 from app.models.property import Property
 from app.models.transaction import Transaction, TransactionType, TransactionStatus
 from app.auth import get_current_verified_user
+from app.models.trade import CandleInterval, CandleResponse
+from app.models.order_book import DepthResponse, OrderBookLevel
+from app.models.market_order import MarketOrder, ArchivedMarketOrder, OrderType, OrderStatus, TimeInForce, OPEN_STATUSES
+from app.services.market_events import market_events
+from app.services.candle_service import candle_service
+from app.services.order_book_service import order_book_service
+from app.services.portfolio_service import portfolio_service
+from app.services.ledger_service import ledger_service
+from app.services.settlement_service import settlement_service
+from app.config import settings
+from app.unit_of_work import UnitOfWork, UnitOfWorkConflict
+from app.responses import trusted
 from datetime import datetime
-from beanie import Document
-from enum import Enum
+import asyncio
+import json
+from beanie import PydanticObjectId
+from beanie.operators import In
+from bson import ObjectId
 
 
-class OrderType(str, Enum):
-    BUY = "buy"
-    SELL = "sell"
+# Orders that never rest in the book
+IMMEDIATE_TIME_IN_FORCE = [TimeInForce.IOC, TimeInForce.FOK]
 
-
-class OrderStatus(str, Enum):
-    ACTIVE = "active"
-    FILLED = "filled"
-    CANCELLED = "cancelled"
-    PARTIAL = "partial"
-
-
-class MarketOrder(Document):
-    user_id: str
-    property_id: str
-    order_type: OrderType
-    tokens: int
-    price_per_token: float
-    total_amount: float
-    tokens_filled: int = 0
-    status: OrderStatus = OrderStatus.ACTIVE
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
-    expires_at: Optional[datetime] = None
-    
-    class Settings:
-        collection = "market_orders"
-        indexes = [
-            "user_id",
-            "property_id",
-            "order_type",
-            "status",
-            "price_per_token"
-        ]
+MAX_BATCH_ORDERS = 100
 
 
 class CreateOrderRequest(BaseModel):
@@ -51,6 +38,8 @@ class CreateOrderRequest(BaseModel):
     order_type: Optional[OrderType] = None
     tokenAmount: int
     pricePerToken: float
+    timeInForce: Optional[TimeInForce] = None
+    expiresAt: Optional[datetime] = None
     
     # Convert to internal names
     @property
@@ -64,6 +53,43 @@ class CreateOrderRequest(BaseModel):
     @property
     def price_per_token(self) -> float:
         return self.pricePerToken
+    
+    @property
+    def time_in_force(self) -> TimeInForce:
+        if self.timeInForce:
+            return self.timeInForce
+        return TimeInForce.GTD if self.expiresAt else TimeInForce.GTC
+    
+    def validate_time_in_force(self) -> Optional[str]:
+        """Return an error message if the time-in-force settings are inconsistent"""
+        if self.time_in_force == TimeInForce.GTD:
+            if not self.expiresAt:
+                return "GTD orders require expiresAt"
+            if self.expiresAt <= datetime.utcnow():
+                return "expiresAt must be in the future"
+        return None
+
+
+class BatchOrderRequest(BaseModel):
+    orders: List[CreateOrderRequest]
+
+
+class BatchCancelRequest(BaseModel):
+    order_ids: List[str]
+
+
+class BatchOrderResult(BaseModel):
+    index: int
+    order_id: Optional[str] = None
+    status: Optional[OrderStatus] = None
+    tokens_filled: int = 0
+    error: Optional[str] = None
+
+
+class BatchCancelResult(BaseModel):
+    order_id: str
+    cancelled: bool
+    error: Optional[str] = None
 
 
 class OrderResponse(BaseModel):
@@ -80,6 +106,24 @@ class OrderResponse(BaseModel):
     status: OrderStatus
     created_at: datetime
 
+    @classmethod
+    def from_document(cls, order: "MarketOrder", property_title: str) -> "OrderResponse":
+        """An open or archived order with its property title and remaining quantity"""
+        return cls.model_construct(
+            id=str(order.id),
+            user_id=order.user_id,
+            property_id=order.property_id,
+            property_title=property_title,
+            order_type=order.order_type,
+            tokens=order.tokens,
+            price_per_token=order.price_per_token,
+            total_amount=order.total_amount,
+            tokens_filled=order.tokens_filled,
+            tokens_remaining=order.tokens - order.tokens_filled,
+            status=order.status,
+            created_at=order.created_at
+        )
+
 
 router = APIRouter(prefix="/api/market", tags=["secondary-market"])
 
@@ -91,7 +135,7 @@ async def get_market_orders(
     limit: int = 50
 ):
     """Get active market orders"""
-    query_filters = [MarketOrder.status == OrderStatus.ACTIVE]
+    query_filters = [In(MarketOrder.status, OPEN_STATUSES)]
     
     if property_id:
         query_filters.append(MarketOrder.property_id == property_id)
@@ -108,23 +152,10 @@ async def get_market_orders(
             prop = await Property.get(order.property_id)
             property_titles[order.property_id] = prop.title if prop else "Unknown Property"
     
-    return [
-        OrderResponse(
-            id=str(order.id),
-            user_id=order.user_id,
-            property_id=order.property_id,
-            property_title=property_titles.get(order.property_id, "Unknown Property"),
-            order_type=order.order_type,
-            tokens=order.tokens,
-            price_per_token=order.price_per_token,
-            total_amount=order.total_amount,
-            tokens_filled=order.tokens_filled,
-            tokens_remaining=order.tokens - order.tokens_filled,
-            status=order.status,
-            created_at=order.created_at
-        )
+    return trusted([
+        OrderResponse.from_document(order, property_titles.get(order.property_id, "Unknown Property"))
         for order in orders
-    ]
+    ])
 
 
 @router.post("/orders")
@@ -154,6 +185,13 @@ async def create_market_order(
             detail="Price per token must be positive"
         )
     
+    time_in_force_error = order_data.validate_time_in_force()
+    if time_in_force_error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=time_in_force_error
+        )
+    
     # For sell orders, check if user has enough tokens
     if order_data.order_type == OrderType.SELL:
         user_tokens = await get_user_token_balance(str(current_user.id), order_data.property_id)
@@ -170,13 +208,26 @@ async def create_market_order(
         order_type=order_data.order_type,
         tokens=order_data.tokens,
         price_per_token=order_data.price_per_token,
-        total_amount=order_data.tokens * order_data.price_per_token
+        total_amount=order_data.tokens * order_data.price_per_token,
+        time_in_force=order_data.time_in_force,
+        expires_at=order_data.expiresAt if order_data.time_in_force == TimeInForce.GTD else None
     )
     
-    await order.save()
-    
-    # Try to match with existing orders
-    await match_orders(order)
+    if order.time_in_force in IMMEDIATE_TIME_IN_FORCE:
+        # IOC/FOK orders are resolved inside matching and never rest in the book
+        order.id = PydanticObjectId()
+        crossing_orders = await find_crossing_orders(order)
+        if order.time_in_force == TimeInForce.IOC or available_liquidity(order, crossing_orders) >= order.tokens:
+            await match_orders(order, crossing_orders)
+        await finalize_immediate_orders([order])
+    else:
+        await order.save()
+        await order_book_service.order_added(order)
+        
+        market_events.publish_order(order, "order_created")
+        
+        # Try to match with existing orders
+        await match_orders(order)
     
     return {
         "message": "Order created successfully",
@@ -213,6 +264,10 @@ async def get_my_orders(
     orders = await MarketOrder.find(
         MarketOrder.user_id == str(current_user.id)
     ).sort(-MarketOrder.created_at).to_list()
+    archived_orders = await ArchivedMarketOrder.find(
+        ArchivedMarketOrder.user_id == str(current_user.id)
+    ).sort(-ArchivedMarketOrder.created_at).to_list()
+    orders = sorted(orders + archived_orders, key=lambda order: order.created_at, reverse=True)
     
     # Get property titles
     property_titles = {}
@@ -221,23 +276,10 @@ async def get_my_orders(
             prop = await Property.get(order.property_id)
             property_titles[order.property_id] = prop.title if prop else "Unknown Property"
     
-    return [
-        OrderResponse(
-            id=str(order.id),
-            user_id=order.user_id,
-            property_id=order.property_id,
-            property_title=property_titles.get(order.property_id, "Unknown Property"),
-            order_type=order.order_type,
-            tokens=order.tokens,
-            price_per_token=order.price_per_token,
-            total_amount=order.total_amount,
-            tokens_filled=order.tokens_filled,
-            tokens_remaining=order.tokens - order.tokens_filled,
-            status=order.status,
-            created_at=order.created_at
-        )
+    return trusted([
+        OrderResponse.from_document(order, property_titles.get(order.property_id, "Unknown Property"))
         for order in orders
-    ]
+    ])
 
 
 @router.delete("/orders/{order_id}")
@@ -247,6 +289,9 @@ async def cancel_order(
 ):
     """Cancel an active order"""
     order = await MarketOrder.get(order_id)
+    if not order:
+        # Terminal orders are moved to the archive
+        order = await ArchivedMarketOrder.get(order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -259,61 +304,394 @@ async def cancel_order(
             detail="Not authorized to cancel this order"
         )
     
-    if order.status != OrderStatus.ACTIVE:
+    if order.status not in OPEN_STATUSES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Order cannot be cancelled"
         )
     
+    # Guarded on status rather than saving the whole document, so a fill that lands after the
+    # read is neither overwritten nor taken off the book a second time
+    now = datetime.utcnow()
+    doc = await MarketOrder.get_pymongo_collection().find_one_and_update(
+        {"_id": order.id, "status": {"$in": [s.value for s in OPEN_STATUSES]}},
+        {"$set": {"status": OrderStatus.CANCELLED.value, "updated_at": now}},
+        projection={"tokens_filled": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Order cannot be cancelled"
+        )
+    order.tokens_filled = doc["tokens_filled"]
     order.status = OrderStatus.CANCELLED
-    order.updated_at = datetime.utcnow()
-    await order.save()
+    order.updated_at = now
+    await order_book_service.order_removed(order)
+    
+    market_events.publish_order(order, "order_cancelled")
     
     return {"message": "Order cancelled successfully"}
 
 
+@router.post("/orders/batch", response_model=List[BatchOrderResult])
+async def create_market_orders_batch(
+    batch: BatchOrderRequest,
+    current_user: User = Depends(get_current_verified_user)
+):
+    """Create a ladder of buy/sell orders in one request and match them in a single pass"""
+    if not batch.orders or len(batch.orders) > MAX_BATCH_ORDERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch must contain between 1 and {MAX_BATCH_ORDERS} orders"
+        )
+    
+    user_id = str(current_user.id)
+    results = [BatchOrderResult(index=i) for i in range(len(batch.orders))]
+    
+    # Load every referenced property with one query
+    property_ids = {item.property_id for item in batch.orders if ObjectId.is_valid(item.property_id)}
+    properties = await Property.find(In(Property.id, [ObjectId(pid) for pid in property_ids])).to_list()
+    known_properties = {str(prop.id) for prop in properties}
+    
+    # Sell balances are checked once per property and drawn down in submission order
+    sell_properties = {
+        item.property_id for item in batch.orders
+        if item.order_type == OrderType.SELL and item.property_id in known_properties
+    }
+    available_tokens = {pid: await get_user_token_balance(user_id, pid) for pid in sell_properties}
+    
+    orders = []
+    order_indexes = []
+    for i, item in enumerate(batch.orders):
+        time_in_force_error = item.validate_time_in_force()
+        if item.property_id not in known_properties:
+            results[i].error = "Property not found"
+        elif item.order_type is None:
+            results[i].error = "Order type is required"
+        elif item.tokens <= 0:
+            results[i].error = "Token amount must be positive"
+        elif item.price_per_token <= 0:
+            results[i].error = "Price per token must be positive"
+        elif time_in_force_error:
+            results[i].error = time_in_force_error
+        elif item.order_type == OrderType.SELL and available_tokens[item.property_id] < item.tokens:
+            results[i].error = "Insufficient tokens to sell"
+        else:
+            if item.order_type == OrderType.SELL:
+                available_tokens[item.property_id] -= item.tokens
+            orders.append(MarketOrder(
+                user_id=user_id,
+                property_id=item.property_id,
+                order_type=item.order_type,
+                tokens=item.tokens,
+                price_per_token=item.price_per_token,
+                total_amount=item.tokens * item.price_per_token,
+                time_in_force=item.time_in_force,
+                expires_at=item.expiresAt if item.time_in_force == TimeInForce.GTD else None
+            ))
+            order_indexes.append(i)
+    
+    resting_orders = [order for order in orders if order.time_in_force not in IMMEDIATE_TIME_IN_FORCE]
+    immediate_orders = [order for order in orders if order.time_in_force in IMMEDIATE_TIME_IN_FORCE]
+    for order in immediate_orders:
+        order.id = PydanticObjectId()
+    
+    if resting_orders:
+        insert_result = await MarketOrder.insert_many(resting_orders)
+        for order, inserted_id in zip(resting_orders, insert_result.inserted_ids):
+            order.id = PydanticObjectId(inserted_id)
+        
+        await order_book_service.apply_deltas([
+            (order.property_id, order.order_type, order.price_per_token, order.tokens, 1)
+            for order in resting_orders
+        ])
+        for order in resting_orders:
+            market_events.publish_order(order, "order_created")
+    
+    if orders:
+        # One book load for all touched properties, then match the batch in submission order
+        book = await MarketOrder.find(
+            In(MarketOrder.property_id, list({order.property_id for order in orders})),
+            In(MarketOrder.status, OPEN_STATUSES)
+        ).to_list()
+        batch_ids = {order.id for order in resting_orders}
+        book = [resting for resting in book if resting.id not in batch_ids]
+        
+        # Each batch order joins the book only once it has been matched, so an earlier order
+        # never trades with a later one at the later order's price
+        for order in orders:
+            if order.time_in_force == TimeInForce.FOK and available_liquidity(order, book) < order.tokens:
+                continue
+            await match_orders(order, book)
+            if order.time_in_force not in IMMEDIATE_TIME_IN_FORCE and order.status in OPEN_STATUSES:
+                book.append(order)
+        
+        await finalize_immediate_orders(immediate_orders)
+    
+    for order, i in zip(orders, order_indexes):
+        results[i].order_id = str(order.id)
+        results[i].status = order.status
+        results[i].tokens_filled = order.tokens_filled
+    
+    return results
+
+
+@router.post("/orders/batch-cancel", response_model=List[BatchCancelResult])
+async def cancel_orders_batch(
+    batch: BatchCancelRequest,
+    current_user: User = Depends(get_current_verified_user)
+):
+    """Cancel many active orders in one request"""
+    if not batch.order_ids or len(batch.order_ids) > MAX_BATCH_ORDERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch must contain between 1 and {MAX_BATCH_ORDERS} order ids"
+        )
+    
+    valid_ids = [ObjectId(order_id) for order_id in batch.order_ids if ObjectId.is_valid(order_id)]
+    orders = {str(order.id): order for order in await MarketOrder.find(In(MarketOrder.id, valid_ids)).to_list()}
+    
+    results = {}
+    to_cancel = []
+    for order_id in dict.fromkeys(batch.order_ids):
+        order = orders.get(order_id)
+        if not order:
+            results[order_id] = BatchCancelResult(order_id=order_id, cancelled=False, error="Order not found")
+        elif order.user_id != str(current_user.id):
+            results[order_id] = BatchCancelResult(order_id=order_id, cancelled=False, error="Not authorized to cancel this order")
+        elif order.status not in OPEN_STATUSES:
+            results[order_id] = BatchCancelResult(order_id=order_id, cancelled=False, error="Order cannot be cancelled")
+        else:
+            to_cancel.append(order)
+    
+    if to_cancel:
+        now = datetime.utcnow()
+        collection = MarketOrder.get_pymongo_collection()
+        # Each cancel is guarded on status and returns the order as it was just before the
+        # flip, so fills that landed since the read are counted and filled orders are left alone
+        before = await asyncio.gather(*(
+            collection.find_one_and_update(
+                {"_id": order.id, "status": {"$in": [s.value for s in OPEN_STATUSES]}},
+                {"$set": {"status": OrderStatus.CANCELLED.value, "updated_at": now}},
+                projection={"tokens_filled": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            for order in to_cancel
+        ))
+        cancelled = []
+        for order, doc in zip(to_cancel, before):
+            order_id = str(order.id)
+            if doc is None:
+                results[order_id] = BatchCancelResult(order_id=order_id, cancelled=False, error="Order cannot be cancelled")
+                continue
+            order.tokens_filled = doc.get("tokens_filled", 0)
+            order.status = OrderStatus.CANCELLED
+            order.updated_at = now
+            cancelled.append(order)
+            results[order_id] = BatchCancelResult(order_id=order_id, cancelled=True)
+        
+        await order_book_service.apply_deltas([
+            (order.property_id, order.order_type, order.price_per_token, -(order.tokens - order.tokens_filled), -1)
+            for order in cancelled
+        ])
+        for order in cancelled:
+            market_events.publish_order(order, "order_cancelled")
+    
+    return [results[order_id] for order_id in batch.order_ids]
+
+
+@router.get("/{property_id}/depth", response_model=DepthResponse)
+async def get_order_book_depth(
+    property_id: str,
+    levels: int = 20,
+    tick_size: Optional[float] = None
+):
+    """Get aggregated bid/ask depth for a property from the precomputed price levels"""
+    if levels <= 0 or levels > 500:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Levels must be between 1 and 500"
+        )
+    
+    if tick_size is not None and tick_size <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tick size must be positive"
+        )
+    
+    depth = await order_book_service.get_depth(property_id, levels, tick_size)
+    
+    return DepthResponse(
+        property_id=property_id,
+        tick_size=tick_size,
+        bids=depth["bids"],
+        asks=depth["asks"]
+    )
+
+
+@router.get("/{property_id}/candles", response_model=List[CandleResponse])
+async def get_candles(
+    property_id: str,
+    interval: CandleInterval = CandleInterval.ONE_HOUR,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 500
+):
+    """Get OHLCV candles for a property from the precomputed buckets"""
+    if limit <= 0 or limit > 5000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit must be between 1 and 5000"
+        )
+    
+    candles = await candle_service.get_candles(property_id, interval, start, end, limit)
+    
+    return [
+        CandleResponse(
+            bucket_start=candle.bucket_start,
+            open=candle.open,
+            high=candle.high,
+            low=candle.low,
+            close=candle.close,
+            volume=candle.volume,
+            quote_volume=candle.quote_volume,
+            trade_count=candle.trade_count
+        )
+        for candle in candles
+    ]
+
+
+@router.websocket("/ws")
+async def market_feed_websocket(websocket: WebSocket, property_id: Optional[str] = None):
+    """Push order book deltas, trades and property updates over a WebSocket"""
+    await websocket.accept()
+    queue = market_events.subscribe(property_id)
+    
+    async def send_events():
+        while True:
+            await websocket.send_json(await queue.get())
+    
+    async def receive_until_closed():
+        # Client messages are ignored; receiving is how an idle client's disconnect is noticed
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+    
+    sender = asyncio.create_task(send_events())
+    receiver = asyncio.create_task(receive_until_closed())
+    try:
+        # Whichever side ends first (client gone, send failed) closes the feed
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+        market_events.unsubscribe(queue, property_id)
+
+
+@router.get("/stream")
+async def market_feed_stream(request: Request, property_id: Optional[str] = None):
+    """Push order book deltas, trades and property updates as Server-Sent Events"""
+    queue = market_events.subscribe(property_id)
+    
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keep idle connections open through proxies
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            market_events.unsubscribe(queue, property_id)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 async def get_user_token_balance(user_id: str, property_id: str) -> int:
     """Get user's token balance for a specific property"""
-    # Get all purchase transactions
-    purchases = await Transaction.find(
-        Transaction.user_id == user_id,
-        Transaction.property_id == property_id,
-        Transaction.transaction_type.in_([TransactionType.TOKEN_PURCHASE, TransactionType.SECONDARY_MARKET_BUY]),
-        Transaction.status == TransactionStatus.COMPLETED
-    ).to_list()
-    
-    # Get all sale transactions
-    sales = await Transaction.find(
-        Transaction.user_id == user_id,
-        Transaction.property_id == property_id,
-        Transaction.transaction_type.in_([TransactionType.TOKEN_SALE, TransactionType.SECONDARY_MARKET_SELL]),
-        Transaction.status == TransactionStatus.COMPLETED
-    ).to_list()
-    
-    total_purchased = sum(tx.tokens for tx in purchases)
-    total_sold = sum(tx.tokens for tx in sales)
-    
-    return total_purchased - total_sold
-
-
-async def match_orders(new_order: MarketOrder):
-    """Try to match a new order with existing orders"""
+    return await ledger_service.get_balance(user_id, property_id)
+
+
+def _crosses(new_order: MarketOrder, resting: MarketOrder) -> bool:
+    """Whether a resting order is on the opposite side at an acceptable price (never the same user's)"""
+    if resting.property_id != new_order.property_id or resting.status not in OPEN_STATUSES:
+        return False
+    if resting.user_id == new_order.user_id:
+        return False
+    if new_order.order_type == OrderType.BUY:
+        return resting.order_type == OrderType.SELL and resting.price_per_token <= new_order.price_per_token
+    return resting.order_type == OrderType.BUY and resting.price_per_token >= new_order.price_per_token
+
+
+async def find_crossing_orders(new_order: MarketOrder) -> List[MarketOrder]:
+    """Load resting orders on the opposite side that cross the new order's price"""
     if new_order.order_type == OrderType.BUY:
-        # Find matching sell orders
-        matching_orders = await MarketOrder.find(
+        return await MarketOrder.find(
             MarketOrder.property_id == new_order.property_id,
             MarketOrder.order_type == OrderType.SELL,
-            MarketOrder.status == OrderStatus.ACTIVE,
+            In(MarketOrder.status, OPEN_STATUSES),
+            MarketOrder.user_id != new_order.user_id,
             MarketOrder.price_per_token <= new_order.price_per_token
         ).sort(MarketOrder.price_per_token).to_list()
+    return await MarketOrder.find(
+        MarketOrder.property_id == new_order.property_id,
+        MarketOrder.order_type == OrderType.BUY,
+        In(MarketOrder.status, OPEN_STATUSES),
+        MarketOrder.user_id != new_order.user_id,
+        MarketOrder.price_per_token >= new_order.price_per_token
+    ).sort(-MarketOrder.price_per_token).to_list()
+
+
+def available_liquidity(new_order: MarketOrder, book: List[MarketOrder]) -> int:
+    """Tokens that could be filled immediately against the given book (FOK check)"""
+    return sum(
+        resting.tokens - resting.tokens_filled
+        for resting in book
+        if resting.id != new_order.id and _crosses(new_order, resting)
+    )
+
+
+async def finalize_immediate_orders(orders: List[MarketOrder]):
+    """Close IOC/FOK orders after matching and write them straight to the archive"""
+    if not orders:
+        return
+    now = datetime.utcnow()
+    for order in orders:
+        order.status = OrderStatus.FILLED if order.tokens_filled >= order.tokens else OrderStatus.CANCELLED
+        order.updated_at = now
+        market_events.publish_order(order, "order_closed")
+    await ArchivedMarketOrder.insert_many([
+        ArchivedMarketOrder(**order.model_dump(), archived_at=now) for order in orders
+    ])
+
+
+async def match_orders(new_order: MarketOrder, book: Optional[List[MarketOrder]] = None):
+    """Try to match a new order with existing orders
+
+    When `book` is given, matching runs against that preloaded in-memory book
+    (used by batch submission) instead of querying the collection.
+    """
+    if book is not None:
+        matching_orders = [
+            resting for resting in book
+            if resting.id != new_order.id and _crosses(new_order, resting)
+        ]
+        # Best price first, then time priority
+        if new_order.order_type == OrderType.BUY:
+            matching_orders.sort(key=lambda o: (o.price_per_token, o.created_at))
+        else:
+            matching_orders.sort(key=lambda o: (-o.price_per_token, o.created_at))
     else:
-        # Find matching buy orders
-        matching_orders = await MarketOrder.find(
-            MarketOrder.property_id == new_order.property_id,
-            MarketOrder.order_type == OrderType.BUY,
-            MarketOrder.status == OrderStatus.ACTIVE,
-            MarketOrder.price_per_token >= new_order.price_per_token
-        ).sort(-MarketOrder.price_per_token).to_list()
+        matching_orders = await find_crossing_orders(new_order)
     
     for matching_order in matching_orders:
         if new_order.tokens_filled >= new_order.tokens:
@@ -330,7 +708,30 @@ async def match_orders(new_order: MarketOrder):
         
         # Execute trade
         trade_price = matching_order.price_per_token  # Use existing order price
-        await execute_trade(new_order, matching_order, tokens_to_trade, trade_price)
+        try:
+            await execute_trade(new_order, matching_order, tokens_to_trade, trade_price)
+        except UnitOfWorkConflict:
+            # A cancel, expiry or another fill changed one side since it was read: nothing was
+            # written, so pick up both orders' current state and move on to the next resting order
+            await refresh_order(new_order)
+            await refresh_order(matching_order)
+            if new_order.status not in OPEN_STATUSES:
+                break
+
+
+async def refresh_order(order: MarketOrder):
+    """Reload a resting order's fill count and status (IOC/FOK takers only live in memory)"""
+    if order.time_in_force in IMMEDIATE_TIME_IN_FORCE:
+        return
+    doc = await MarketOrder.get_pymongo_collection().find_one(
+        {"_id": order.id}, {"tokens_filled": 1, "status": 1}
+    )
+    if doc:
+        order.tokens_filled = doc["tokens_filled"]
+        order.status = OrderStatus(doc["status"])
+    else:
+        # Archived since the read, so it is no longer open
+        order.status = OrderStatus.CANCELLED
 
 
 async def execute_trade(buy_order: MarketOrder, sell_order: MarketOrder, tokens: int, price_per_token: float):
@@ -344,6 +745,8 @@ async def execute_trade(buy_order: MarketOrder, sell_order: MarketOrder, tokens:
             buyer_order = sell_order
             seller_order = buy_order
         
+        # Fill counts as read; each resting order's update is guarded on them
+        previous = {order.id: (order.tokens_filled, order.status) for order in (buyer_order, seller_order)}
         buyer_order.tokens_filled += tokens
         seller_order.tokens_filled += tokens
         
@@ -358,9 +761,35 @@ async def execute_trade(buy_order: MarketOrder, sell_order: MarketOrder, tokens:
         elif seller_order.tokens_filled > 0:
             seller_order.status = OrderStatus.PARTIAL
         
-        # Save updated orders
-        await buyer_order.save()
-        await seller_order.save()
+        # Every write for this fill commits together in one transaction
+        uow = UnitOfWork()
+        
+        # Save updated resting orders (IOC/FOK takers are archived once matching ends)
+        resting_orders = [
+            order for order in (buyer_order, seller_order)
+            if order.time_in_force not in IMMEDIATE_TIME_IN_FORCE
+        ]
+        for order in resting_orders:
+            order.updated_at = datetime.utcnow()
+            uow.update(
+                MarketOrder,
+                {
+                    "_id": order.id,
+                    "status": {"$in": [s.value for s in OPEN_STATUSES]},
+                    "tokens_filled": previous[order.id][0]
+                },
+                {"$set": {
+                    "tokens_filled": order.tokens_filled,
+                    "status": order.status.value,
+                    "updated_at": order.updated_at
+                }},
+                required=True
+            )
+        
+        # Take the filled quantity off the aggregated book
+        uow.add(OrderBookLevel, order_book_service.delta_operations([
+            order_book_service.fill_deltas(order, tokens) for order in resting_orders
+        ]))
         
         # Create transaction records
         total_amount = tokens * price_per_token
@@ -377,6 +806,7 @@ async def execute_trade(buy_order: MarketOrder, sell_order: MarketOrder, tokens:
             metadata={
                 "order_id": str(buyer_order.id),
                 "counterparty_order_id": str(seller_order.id),
+                "counterparty_user_id": seller_order.user_id,
                 "trade_type": "secondary_market"
             }
         )
@@ -393,12 +823,50 @@ async def execute_trade(buy_order: MarketOrder, sell_order: MarketOrder, tokens:
             metadata={
                 "order_id": str(seller_order.id),
                 "counterparty_order_id": str(buyer_order.id),
+                "counterparty_user_id": buyer_order.user_id,
                 "trade_type": "secondary_market"
             }
         )
         
-        await buyer_tx.save()
-        await seller_tx.save()
+        uow.insert(buyer_tx, seller_tx)
+        
+        # In ledger mode the fill is also queued for the next on-ledger settlement batch
+        if settings.market_settlement_mode == "ledger":
+            settlement_service.enqueue(buyer_order, seller_order, tokens, price_per_token, buyer_tx, seller_tx, uow)
+        
+        try:
+            await uow.commit()
+        except UnitOfWorkConflict:
+            for order in (buyer_order, seller_order):
+                order.tokens_filled, order.status = previous[order.id]
+            raise
+        
+        # Keep both sides' portfolio snapshots current
+        property_obj = await Property.get(buyer_order.property_id)
+        if property_obj:
+            await portfolio_service.record_purchase(buyer_order.user_id, property_obj, tokens, total_amount)
+        await portfolio_service.record_sale(seller_order.user_id, seller_order.property_id, tokens)
+        
+        # Record the fill in the trades time series and roll it into candles
+        try:
+            await candle_service.record_trade(
+                property_id=buyer_order.property_id,
+                buy_order_id=str(buyer_order.id),
+                sell_order_id=str(seller_order.id),
+                buyer_id=buyer_order.user_id,
+                seller_id=seller_order.user_id,
+                tokens=tokens,
+                price_per_token=price_per_token
+            )
+        except Exception as e:
+            print(f"Failed to record trade candle: {str(e)}")
+        
+        # Push the fill to market feed subscribers
+        market_events.publish_trade(
+            buyer_order.property_id, str(buyer_order.id), str(seller_order.id), tokens, price_per_token
+        )
+        market_events.publish_order(buyer_order)
+        market_events.publish_order(seller_order)
         
     except Exception as e:
         print(f"Trade execution failed: {str(e)}")
@@ -2,8 +2,10 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 from app.models.property import Property, PropertyCreate, PropertyResponse, InvestmentRequest, PropertyStatus
 from app.models.user import User
+from app.responses import trusted
 from app.auth import get_current_verified_user, get_current_active_user, get_current_investor
 from app.services.tokenization_service import tokenization_service
+from app.services.property_listing_service import property_listing_service
 
 router = APIRouter(prefix="/api", tags=["properties"])
 
@@ -12,55 +14,15 @@ router = APIRouter(prefix="/api", tags=["properties"])
 async def get_properties():
     """Get all approved properties for investors"""
     try:
-        # Get all properties first
-        all_properties = await Property.find().to_list()
-        print(f"Total properties found: {len(all_properties)}")
-        
-        # Filter properties manually to handle enum status values
-        approved_properties = []
-        for prop in all_properties:
-            status_str = str(prop.status).lower()
-            print(f"Property: {prop.title}, Status: {prop.status}, Status String: {status_str}")
-            
-            # Check if status contains any of the approved states
-            if any(approved_status in status_str for approved_status in ["approved", "tokenized", "sold_out"]):
-                approved_properties.append(prop)
-        
-        print(f"Approved properties found: {len(approved_properties)}")
-        properties = approved_properties
-        
+        rows = await property_listing_service.catalogue()
+        print(f"Approved properties found: {len(rows)}")
     except Exception as e:
         # If there's any error, return empty list
         print(f"Error fetching properties: {e}")
         return []
     
-    return [
-        PropertyResponse(
-            id=str(prop.id),
-            title=prop.title,
-            description=prop.description,
-            address=prop.address,
-            city=prop.city,
-            country=prop.country,
-            property_type=prop.property_type,
-            total_value=prop.total_value,
-            size_sqm=prop.size_sqm,
-            total_tokens=prop.total_tokens,
-            token_price=prop.token_price,
-            tokens_sold=prop.tokens_sold,
-            bedrooms=prop.bedrooms,
-            bathrooms=prop.bathrooms,
-            parking_spaces=prop.parking_spaces,
-            year_built=prop.year_built,
-            monthly_rent=prop.monthly_rent,
-            annual_yield=prop.annual_yield,
-            seller_name=prop.seller_name,
-            status=prop.status,
-            images=prop.images,
-            created_at=prop.created_at
-        )
-        for prop in properties
-    ]
+    # Rows are already in the PropertyResponse shape
+    return trusted(rows)
 
 
 @router.get("/properties/{property_id}", response_model=PropertyResponse)
@@ -85,30 +47,7 @@ async def get_property(property_id: str):
             detail=f"Property not found: {str(e)}"
         )
     
-    return PropertyResponse(
-        id=str(property_obj.id),
-        title=property_obj.title,
-        description=property_obj.description,
-        address=property_obj.address,
-        city=property_obj.city,
-        country=property_obj.country,
-        property_type=property_obj.property_type,
-        total_value=property_obj.total_value,
-        size_sqm=property_obj.size_sqm,
-        total_tokens=property_obj.total_tokens,
-        token_price=property_obj.token_price,
-        tokens_sold=property_obj.tokens_sold,
-        bedrooms=property_obj.bedrooms,
-        bathrooms=property_obj.bathrooms,
-        parking_spaces=property_obj.parking_spaces,
-        year_built=property_obj.year_built,
-        monthly_rent=property_obj.monthly_rent,
-        annual_yield=property_obj.annual_yield,
-        seller_name=property_obj.seller_name,
-        status=property_obj.status,
-        images=property_obj.images,
-        created_at=property_obj.created_at
-    )
+    return trusted(PropertyResponse.from_document(property_obj))
 
 
 @router.post("/properties/{property_id}/invest")
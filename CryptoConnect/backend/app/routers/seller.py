@@ -3,8 +3,12 @@ from typing import List, Optional
 from datetime import datetime
 from app.models.property import Property, PropertyCreate, PropertyResponse, PropertyUpdateSeller
 from app.models.user import User
+from app.responses import trusted
 from app.auth import get_current_active_user, get_current_user, get_current_seller
 from app.services.tokenization_service import tokenization_service
+from app.services.tokenization_pipeline import tokenization_pipeline
+from app.services.portfolio_service import portfolio_service
+from app.services.property_listing_service import property_listing_service
 from pydantic import BaseModel
 import logging
 
@@ -84,53 +88,13 @@ async def submit_property(
         
         logger.info(f"Property {property_obj.id} saved successfully")
 
-        # Tokenize the property
-        logger.info(f"Starting tokenization for property {property_obj.id}")
-        tokenization_success = await tokenization_service.tokenize_property(property_obj)
-        if tokenization_success:
-            logger.info(f"Property {property_obj.id} tokenized successfully")
-            
-            # Refresh the property object to get updated tokenization details
-            property_obj = await Property.get(property_obj.id)
-            
-            # Log the tokenization success with explorer links
-            if property_obj.xrpl_explorer_url:
-                logger.info(f"🚀 TOKENIZATION SUCCESSFUL!")
-                logger.info(f"📍 Property: {property_obj.title}")
-                logger.info(f"🪙 Token Symbol: {property_obj.token_symbol}")
-                logger.info(f"💰 Total Supply: {property_obj.total_tokens} tokens")
-                logger.info(f"💲 Token Price: {property_obj.token_price:.6f} AED per token")
-                logger.info(f"🔗 XRP Testnet Explorer: {property_obj.xrpl_explorer_url}")
-                logger.info(f"🏦 Issuer Address: {property_obj.xrpl_issuer_address}")
-                logger.info(f"📊 View on XRPL Explorer: https://testnet.xrpl.org/accounts/{property_obj.xrpl_issuer_address}")
-        else:
-            logger.error(f"Property {property_obj.id} tokenization failed")
-            # You might want to handle this failure case, e.g., by updating the property status
-        
-        response = PropertyResponse(
-            id=str(property_obj.id),
-            title=property_obj.title,
-            description=property_obj.description,
-            address=property_obj.address,
-            city=property_obj.city,
-            country=property_obj.country,
-            property_type=property_obj.property_type,
-            total_value=property_obj.total_value,
-            size_sqm=property_obj.size_sqm,
-            total_tokens=property_obj.total_tokens,
-            token_price=property_obj.token_price,
-            tokens_sold=property_obj.tokens_sold,
-            bedrooms=property_obj.bedrooms,
-            bathrooms=property_obj.bathrooms,
-            parking_spaces=property_obj.parking_spaces,
-            year_built=property_obj.year_built,
-            monthly_rent=property_obj.monthly_rent,
-            annual_yield=property_obj.annual_yield,
-            seller_name=property_obj.seller_name,
-            status=property_obj.status,
-            images=property_obj.images,
-            created_at=property_obj.created_at
+        # Queue tokenization; the job id lets the client track it without holding the request open
+        job = await tokenization_pipeline.submit(
+            [str(property_obj.id)], requested_by=str(current_user.id), require_approved=False
         )
+        logger.info(f"Queued tokenization job {job.id} for property {property_obj.id}")
+        
+        response = PropertyResponse.from_document(property_obj, tokenization_job_id=str(job.id))
         
         logger.info(f"Returning response for property {response.id}")
         return response
@@ -262,9 +226,6 @@ async def retokenize_property(
         tokenization_success = await tokenization_service.tokenize_property(property_obj)
         
         if tokenization_success:
-            # Refresh the property object
-            property_obj = await Property.get(property_obj.id)
-            
             return {
                 "success": True,
                 "message": "Property tokenized successfully",
@@ -320,15 +281,12 @@ async def get_seller_properties(current_user: User = Depends(get_current_seller)
         logger.info(f"User role: {current_user.role}")
         logger.info(f"User active: {current_user.is_active}")
         
-        properties = await Property.find(Property.seller_id == str(current_user.id)).to_list()
-        logger.info(f"Found {len(properties)} properties for seller {current_user.id}")
+        rows = await property_listing_service.list_rows({"seller_id": str(current_user.id)})
+        logger.info(f"Found {len(rows)} properties for seller {current_user.id}")
         
         # If no properties found, let's check if there are any properties at all
-        if len(properties) == 0:
-            all_properties = await Property.find().to_list()
-            logger.info(f"Total properties in database: {len(all_properties)}")
-            for prop in all_properties:
-                logger.info(f"Property {prop.id}: seller_id={prop.seller_id}, current_user_id={str(current_user.id)}")
+        if len(rows) == 0:
+            logger.info(f"Total properties in database: {await Property.find().count()}")
         
     except Exception as e:
         logger.error(f"Error fetching seller properties: {e}")
@@ -337,33 +295,8 @@ async def get_seller_properties(current_user: User = Depends(get_current_seller)
             detail=f"Failed to fetch properties: {str(e)}"
         )
     
-    return [
-        PropertyResponse(
-            id=str(prop.id),
-            title=prop.title,
-            description=prop.description,
-            address=prop.address,
-            city=prop.city,
-            country=prop.country,
-            property_type=prop.property_type,
-            total_value=prop.total_value,
-            size_sqm=prop.size_sqm,
-            total_tokens=prop.total_tokens,
-            token_price=prop.token_price,
-            tokens_sold=prop.tokens_sold,
-            bedrooms=prop.bedrooms,
-            bathrooms=prop.bathrooms,
-            parking_spaces=prop.parking_spaces,
-            year_built=prop.year_built,
-            monthly_rent=prop.monthly_rent,
-            annual_yield=prop.annual_yield,
-            seller_name=prop.seller_name,
-            status=prop.status,
-            images=prop.images,
-            created_at=prop.created_at
-        )
-        for prop in properties
-    ]
+    # Rows are already in the PropertyResponse shape
+    return trusted(rows)
 
 
 @router.get("/property/{property_id}", response_model=PropertyResponse)
@@ -388,30 +321,7 @@ async def get_seller_property(
                 detail="Not authorized to view this property"
             )
         
-        return PropertyResponse(
-            id=str(property_obj.id),
-            title=property_obj.title,
-            description=property_obj.description,
-            address=property_obj.address,
-            city=property_obj.city,
-            country=property_obj.country,
-            property_type=property_obj.property_type,
-            total_value=property_obj.total_value,
-            size_sqm=property_obj.size_sqm,
-            total_tokens=property_obj.total_tokens,
-            token_price=property_obj.token_price,
-            tokens_sold=property_obj.tokens_sold,
-            bedrooms=property_obj.bedrooms,
-            bathrooms=property_obj.bathrooms,
-            parking_spaces=property_obj.parking_spaces,
-            year_built=property_obj.year_built,
-            monthly_rent=property_obj.monthly_rent,
-            annual_yield=property_obj.annual_yield,
-            seller_name=property_obj.seller_name,
-            status=property_obj.status,
-            images=property_obj.images,
-            created_at=property_obj.created_at
-        )
+        return trusted(PropertyResponse.from_document(property_obj))
     except HTTPException:
         raise
     except Exception as e:
@@ -484,32 +394,12 @@ async def update_seller_property(
         
         await property_obj.save()
         
+        if recalculate_needed or 'monthly_rent' in update_data:
+            await portfolio_service.property_changed(property_obj)
+        
         logger.info(f"Property {property_obj.id} updated successfully by seller {current_user.id}")
         
-        return PropertyResponse(
-            id=str(property_obj.id),
-            title=property_obj.title,
-            description=property_obj.description,
-            address=property_obj.address,
-            city=property_obj.city,
-            country=property_obj.country,
-            property_type=property_obj.property_type,
-            total_value=property_obj.total_value,
-            size_sqm=property_obj.size_sqm,
-            total_tokens=property_obj.total_tokens,
-            token_price=property_obj.token_price,
-            tokens_sold=property_obj.tokens_sold,
-            bedrooms=property_obj.bedrooms,
-            bathrooms=property_obj.bathrooms,
-            parking_spaces=property_obj.parking_spaces,
-            year_built=property_obj.year_built,
-            monthly_rent=property_obj.monthly_rent,
-            annual_yield=property_obj.annual_yield,
-            seller_name=property_obj.seller_name,
-            status=property_obj.status,
-            images=property_obj.images,
-            created_at=property_obj.created_at
-        )
+        return trusted(PropertyResponse.from_document(property_obj))
         
     except HTTPException:
         raise
@@ -518,4 +408,19 @@ async def update_seller_property(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update property: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/tokenization-jobs/{job_id}")
+async def get_tokenization_job(
+    job_id: str,
+    current_user: User = Depends(get_current_seller)
+):
+    """Track a queued tokenization (the handle returned by property submission)"""
+    job = await tokenization_pipeline.get_job(job_id)
+    if not job or job.requested_by != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tokenization job not found"
+        )
+    return job
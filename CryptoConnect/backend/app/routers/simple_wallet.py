@@ -2,12 +2,15 @@
 Simple Wallet API Routes
 Basic wallet info without complex XRPL imports
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import Dict, List, Optional
 from app.models.user import User
 from app.auth import get_current_active_user
 from app.services.xrpl_service import xrpl_service
+from app.services.ledger_ingestion_service import ledger_ingestion_service
+from app.models.ledger_transaction import LedgerTransaction
 from xrpl.utils import drops_to_xrp
+from datetime import timezone
 import logging
 import time
 
@@ -16,6 +19,20 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/simple-wallet", tags=["simple-wallet"])
 
 
+def serialize_ledger_transaction(tx: LedgerTransaction) -> Dict:
+    return {
+        "hash": tx.hash,
+        "type": tx.transaction_type,
+        "date": int(tx.date.replace(tzinfo=timezone.utc).timestamp()) if tx.date else int(time.time()),
+        "ledger_index": tx.ledger_index,
+        "amount": tx.amount.model_dump() if tx.amount else "0",
+        "destination": tx.destination or "",
+        "result": tx.result,
+        "memos": [memo.model_dump() for memo in tx.memos],
+        "explorer_url": f"https://testnet.xrpl.org/transactions/{tx.hash}"
+    }
+
+
 @router.get("/info")
 async def get_simple_wallet_info(current_user: User = Depends(get_current_active_user)):
     """Get basic wallet information for current user"""
@@ -52,21 +69,9 @@ async def get_simple_wallet_info(current_user: User = Depends(get_current_active
         if account_info and "Balance" in account_info:
             xrp_balance = drops_to_xrp(account_info["Balance"])
         
-        # Get real transaction history
-        real_transactions = await xrpl_service.get_account_transactions(current_user.xrpl_wallet_address, 5)
-        
-        transactions = []
-        for tx_data in real_transactions:
-            tx = tx_data.get('tx', {})
-            if tx:
-                transactions.append({
-                    "hash": tx.get('hash', 'Unknown'),
-                    "type": tx.get('TransactionType', 'Unknown'),
-                    "date": tx_data.get('date', int(time.time())),
-                    "amount": tx.get('Amount', '0'),
-                    "destination": tx.get('Destination', ''),
-                    "explorer_url": f"https://testnet.xrpl.org/transactions/{tx.get('hash', '')}"
-                })
+        # Transaction history from the local ledger mirror
+        history = await ledger_ingestion_service.get_account_transactions(current_user.xrpl_wallet_address, 5)
+        transactions = [serialize_ledger_transaction(tx) for tx in history]
         
         wallet_info = {
             "address": current_user.xrpl_wallet_address,
@@ -107,3 +112,22 @@ async def get_wallet_balance(current_user: User = Depends(get_current_active_use
     except Exception as e:
         logger.error(f"Error getting wallet balance: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch wallet balance")
+
+
+@router.get("/transactions")
+async def get_wallet_transactions(
+    limit: int = Query(20, ge=1, le=200),
+    before_ledger: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Wallet ledger history, newest first; pass the last ledger_index as before_ledger for the next page"""
+    if not current_user.xrpl_wallet_address:
+        return {"transactions": [], "next_before_ledger": None}
+    
+    history = await ledger_ingestion_service.get_account_transactions(
+        current_user.xrpl_wallet_address, limit, before_ledger
+    )
+    return {
+        "transactions": [serialize_ledger_transaction(tx) for tx in history],
+        "next_before_ledger": history[-1].ledger_index if len(history) == limit else None
+    }
@@ -6,6 +6,11 @@ from app.models.user import User
 from app.models.transaction import Transaction, TransactionType, TransactionStatus
 from app.auth import get_current_active_user, get_current_user
 from app.services.xrpl_service import xrpl_service
+from app.services.ledger_ingestion_service import ledger_ingestion_service
+from app.services.token_symbol_service import token_symbol_service
+from app.database import read_collection
+from beanie import PydanticObjectId
+from beanie.operators import In
 from pydantic import BaseModel
 import logging
 
@@ -61,16 +66,21 @@ async def get_user_tokens(current_user: User = Depends(get_current_user)):
         # Get all tokens from XRPL
         user_tokens = await xrpl_service.get_all_user_tokens(current_user.xrpl_wallet_address)
         
-        # Enrich with property information
+        # Enrich with property information: O(1) symbol resolution, then one property query
+        property_ids = await token_symbol_service.resolve_many([token["currency"] for token in user_tokens])
+        property_docs = await read_collection(Property).find(
+            {"_id": {"$in": [PydanticObjectId(pid) for pid in set(property_ids.values())]}}
+        ).to_list(length=None)
+        properties = {str(doc["_id"]): Property.model_validate(doc) for doc in property_docs}
+        
         enriched_tokens = []
         total_token_count = 0
         
         for token in user_tokens:
-            # Find the property associated with this token
-            property_obj = await Property.find_one(
-                Property.token_symbol == token["currency"],
-                Property.xrpl_issuer_address == token["issuer"]
-            )
+            property_obj = properties.get(property_ids.get(token["currency"]))
+            # Same code under a different issuer is someone else's token
+            if property_obj and property_obj.xrpl_issuer_address != token["issuer"]:
+                property_obj = None
             
             enriched_token = TokenBalanceResponse(
                 currency=token["currency"],
@@ -208,10 +218,10 @@ async def verify_token_on_ledger(token_symbol: str, issuer_address: str):
             )
         
         # Get associated property information
-        property_obj = await Property.find_one(
-            Property.token_symbol == token_symbol,
-            Property.xrpl_issuer_address == issuer_address
-        )
+        property_id = await token_symbol_service.resolve(token_symbol)
+        property_obj = await Property.get(property_id) if property_id else None
+        if property_obj and property_obj.xrpl_issuer_address != issuer_address:
+            property_obj = None
         
         result = {
             **token_info,
@@ -244,15 +254,27 @@ async def verify_token_on_ledger(token_symbol: str, issuer_address: str):
 async def get_transaction_details(tx_hash: str):
     """Get detailed transaction information from XRP Ledger"""
     try:
-        tx_details = await xrpl_service.get_transaction_details(tx_hash)
+        tx = await ledger_ingestion_service.get_transaction(tx_hash)
         
-        if not tx_details:
+        if not tx:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Transaction not found"
             )
         
-        return tx_details
+        return {
+            "transaction": {
+                **tx.raw.get("tx", {}),
+                "hash": tx.hash,
+                "ledger_index": tx.ledger_index,
+                "meta": tx.raw.get("meta", {})
+            },
+            "date": tx.date,
+            "result": tx.result,
+            "memos": tx.memos,
+            "explorer_url": f"https://testnet.xrpl.org/transactions/{tx.hash}",
+            "validated": True
+        }
         
     except HTTPException:
         raise
@@ -288,15 +310,20 @@ async def get_property_token_holders(property_id: str):
         )
         
         if token_info and token_info.get("holders"):
-            # Enrich holder information with user data if available
+            # Resolve every holder address to its user in one query
+            addresses = [holder["address"] for holder in token_info["holders"]]
+            users = {
+                user.xrpl_wallet_address: user
+                for user in await User.find(In(User.xrpl_wallet_address, addresses)).to_list()
+            }
             enriched_holders = []
             for holder in token_info["holders"]:
-                user = await User.find_one(User.xrpl_wallet_address == holder["address"])
+                user = users.get(holder["address"])
                 enriched_holder = {
                     **holder,
                     "user_info": {
-                        "username": user.username if user else "Unknown",
-                        "name": f"{user.first_name or ''} {user.last_name or ''}".strip() if user else "Unknown"
+                        "username": user.username,
+                        "name": f"{user.first_name or ''} {user.last_name or ''}".strip()
                     } if user else None
                 }
                 enriched_holders.append(enriched_holder)
@@ -0,0 +1,445 @@
+"""
+Portfolio Analytics Service
+Loads holdings, cash flows and prices into columnar NumPy arrays and computes
+ownership, realized yield, XIRR, concentration and cash-flow schedules for every
+investor in one vectorized pass
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+import numpy as np
+from app.models.property import Property
+from app.models.trade import Trade
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.user import User
+from app.services.ledger_service import ledger_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365.25
+XIRR_MAX_ITERATIONS = 60
+XIRR_TOLERANCE = 1e-7
+
+PURCHASE_TYPES = [TransactionType.TOKEN_PURCHASE.value, TransactionType.SECONDARY_MARKET_BUY.value]
+SALE_TYPES = [TransactionType.TOKEN_SALE.value, TransactionType.SECONDARY_MARKET_SELL.value]
+DISTRIBUTION_TYPE = TransactionType.RENTAL_DISTRIBUTION.value
+TRANSFER_TYPE = TransactionType.TOKEN_TRANSFER.value
+# Synthetic kind for the receiving side of a transfer between platform users
+TRANSFER_IN = "transfer_in"
+
+
+def ownership_fractions(tokens_owned: np.ndarray, total_tokens: np.ndarray) -> np.ndarray:
+    """F = k / N elementwise; zero where the property has no supply"""
+    tokens_owned = np.asarray(tokens_owned, dtype=np.float64)
+    total_tokens = np.asarray(total_tokens, dtype=np.float64)
+    return np.divide(tokens_owned, total_tokens, out=np.zeros_like(tokens_owned), where=total_tokens > 0)
+
+
+def income_shares(tokens_owned: np.ndarray, total_tokens: np.ndarray, total_income: float) -> np.ndarray:
+    """I = (k / N) * R elementwise"""
+    return ownership_fractions(tokens_owned, total_tokens) * total_income
+
+
+def xirr(
+    groups: np.ndarray,
+    amounts: np.ndarray,
+    years_before: np.ndarray,
+    group_count: int,
+    guess: float = 0.1
+) -> np.ndarray:
+    """Solve XIRR for many cash-flow series at once with a shared Newton iteration.
+
+    Each flow is compounded forward to the valuation date:
+        sum_i amount_i * (1 + r) ** years_before_i = 0
+    Series without both an outflow and an inflow, or that fail to converge, come back as NaN.
+    """
+    rates = np.full(group_count, guess, dtype=np.float64)
+    has_out = np.bincount(groups, weights=(amounts < 0).astype(np.float64), minlength=group_count) > 0
+    has_in = np.bincount(groups, weights=(amounts > 0).astype(np.float64), minlength=group_count) > 0
+    active = has_out & has_in
+    converged = np.zeros(group_count, dtype=bool)
+
+    for _ in range(XIRR_MAX_ITERATIONS):
+        base = 1.0 + rates[groups]
+        growth = np.power(base, years_before)
+        value = np.bincount(groups, weights=amounts * growth, minlength=group_count)
+        slope = np.bincount(groups, weights=amounts * years_before * growth / base, minlength=group_count)
+
+        step = np.divide(value, slope, out=np.zeros(group_count), where=slope != 0)
+        step[~active | converged] = 0.0
+        rates = np.maximum(rates - step, -0.9999)
+        converged |= np.abs(step) < XIRR_TOLERANCE
+        if converged[active].all():
+            break
+
+    rates[~(active & converged)] = np.nan
+    return rates
+
+
+def _factorize(values: List[Any]):
+    """Map values to dense integer codes; returns (codes, uniques)"""
+    uniques, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return codes.astype(np.int64), uniques
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class AnalyticsDataset:
+    """Columnar snapshot of the ledger: one row per cash flow or holding movement, one column set per property"""
+
+    def __init__(self, flows: Dict[str, np.ndarray], user_ids: np.ndarray, properties: Dict[str, np.ndarray], as_of: datetime):
+        self.flows = flows
+        self.user_ids = user_ids
+        self.properties = properties
+        self.as_of = as_of
+
+    @property
+    def user_count(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def property_count(self) -> int:
+        return len(self.properties["id"])
+
+
+class AnalyticsService:
+    """Service for batch portfolio analytics over the whole platform or a single investor"""
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    async def load(self, user_id: Optional[str] = None, as_of: Optional[datetime] = None) -> AnalyticsDataset:
+        """Read completed purchases, sales, transfers and distributions plus the properties they touch.
+
+        Transfers move holdings the way the ledger projection folds them: the sender is
+        debited and a recipient who is a platform user is credited. They carry no cash.
+        """
+        as_of = as_of or datetime.utcnow()
+        query: Dict[str, Any] = {
+            "status": TransactionStatus.COMPLETED.value,
+            "transaction_type": {"$in": PURCHASE_TYPES + SALE_TYPES + [DISTRIBUTION_TYPE, TRANSFER_TYPE]},
+            "created_at": {"$lte": as_of}
+        }
+        if user_id:
+            # The investor's own events plus transfers sent to their wallet
+            wallet = await User.get_pymongo_collection().find_one(
+                {"_id": ObjectId(user_id)} if ObjectId.is_valid(user_id) else {"_id": user_id}, {"xrpl_wallet_address": 1}
+            )
+            incoming = [{"transaction_type": TRANSFER_TYPE, "xrpl_to_address": wallet["xrpl_wallet_address"]}] \
+                if wallet and wallet.get("xrpl_wallet_address") else []
+            query["$or"] = [{"user_id": user_id}] + incoming
+
+        users, props, kinds, tokens, amounts, timestamps = [], [], [], [], [], []
+        transfers = []
+        cursor = Transaction.get_pymongo_collection().find(
+            query,
+            {"_id": 0, "user_id": 1, "property_id": 1, "transaction_type": 1, "tokens": 1, "amount": 1, "created_at": 1, "xrpl_to_address": 1},
+            batch_size=self.batch_size
+        )
+        async for row in cursor:
+            if row["transaction_type"] == TRANSFER_TYPE:
+                transfers.append(row)
+            if user_id and row["user_id"] != user_id:
+                continue  # An incoming transfer; only the credit below belongs to this investor
+            users.append(row["user_id"])
+            props.append(row["property_id"])
+            kinds.append(row["transaction_type"])
+            tokens.append(row.get("tokens") or 0)
+            amounts.append(row.get("amount") or 0.0)
+            timestamps.append(row.get("created_at") or as_of)
+
+        recipients = await ledger_service.recipients(transfers)
+        for row in transfers:
+            recipient_id = recipients.get(row.get("xrpl_to_address") or "")
+            if not recipient_id or (user_id and recipient_id != user_id):
+                continue
+            users.append(recipient_id)
+            props.append(row["property_id"])
+            kinds.append(TRANSFER_IN)
+            tokens.append(row.get("tokens") or 0)
+            amounts.append(0.0)
+            timestamps.append(row.get("created_at") or as_of)
+
+        user_codes, user_ids = _factorize(users) if users else (np.zeros(0, dtype=np.int64), np.array([], dtype=str))
+        property_codes, property_ids = _factorize(props) if props else (np.zeros(0, dtype=np.int64), np.array([], dtype=str))
+        kinds_arr = np.asarray(kinds, dtype=object)
+        is_purchase = np.isin(kinds_arr, PURCHASE_TYPES)
+        is_sale = np.isin(kinds_arr, SALE_TYPES)
+        is_distribution = kinds_arr == DISTRIBUTION_TYPE
+        is_transfer_out = kinds_arr == TRANSFER_TYPE
+        is_transfer_in = kinds_arr == TRANSFER_IN
+        amounts_arr = np.asarray(amounts, dtype=np.float64)
+        tokens_arr = np.asarray(tokens, dtype=np.float64)
+        years_before = np.asarray(
+            [(as_of - ts).total_seconds() / 86400.0 / DAYS_PER_YEAR for ts in timestamps], dtype=np.float64
+        )
+
+        flows = {
+            "user": user_codes,
+            "property": property_codes,
+            "is_purchase": is_purchase,
+            "is_sale": is_sale,
+            "is_distribution": is_distribution,
+            # Tokens held move on purchases, sales and transfers, as in the ledger projection
+            "token_delta": np.where(is_purchase | is_transfer_in, tokens_arr, np.where(is_sale | is_transfer_out, -tokens_arr, 0.0)),
+            # Investor's perspective: money out is negative; transfers move no cash
+            "cash": np.where(is_purchase, -amounts_arr, np.where(is_transfer_out | is_transfer_in, 0.0, amounts_arr)),
+            "years_before": np.maximum(years_before, 0.0),
+            "month": np.asarray([ts.year * 12 + ts.month - 1 for ts in timestamps], dtype=np.int64)
+        }
+
+        properties = await self._load_properties(property_ids)
+        return AnalyticsDataset(flows, user_ids, properties, as_of)
+
+    async def _load_properties(self, property_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        count = len(property_ids)
+        columns = {
+            "id": property_ids,
+            "title": np.full(count, "", dtype=object),
+            "city": np.full(count, "unknown", dtype=object),
+            "property_type": np.full(count, "unknown", dtype=object),
+            "total_tokens": np.zeros(count, dtype=np.float64),
+            "token_price": np.zeros(count, dtype=np.float64),
+            "monthly_rent": np.zeros(count, dtype=np.float64),
+            "last_trade_price": np.full(count, np.nan, dtype=np.float64)
+        }
+        if not count:
+            return columns
+
+        position = {pid: i for i, pid in enumerate(property_ids)}
+        object_ids = [ObjectId(pid) for pid in property_ids if ObjectId.is_valid(pid)]
+        cursor = Property.get_pymongo_collection().find(
+            {"_id": {"$in": object_ids}},
+            {"title": 1, "city": 1, "property_type": 1, "total_tokens": 1, "token_price": 1, "monthly_rent": 1}
+        )
+        async for doc in cursor:
+            i = position[str(doc["_id"])]
+            columns["title"][i] = doc.get("title", "")
+            columns["city"][i] = doc.get("city") or "unknown"
+            columns["property_type"][i] = doc.get("property_type") or "unknown"
+            columns["total_tokens"][i] = doc.get("total_tokens") or 0
+            columns["token_price"][i] = doc.get("token_price") or 0.0
+            columns["monthly_rent"][i] = doc.get("monthly_rent") or 0.0
+
+        # Price history: latest secondary-market print per property
+        pipeline = [
+            {"$match": {"property_id": {"$in": list(property_ids)}}},
+            {"$sort": {"property_id": 1, "executed_at": -1}},
+            {"$group": {"_id": "$property_id", "price": {"$first": "$price_per_token"}}}
+        ]
+        for row in await Trade.get_pymongo_collection().aggregate(pipeline).to_list(length=None):
+            columns["last_trade_price"][position[row["_id"]]] = row["price"]
+        return columns
+
+    def _positions(self, data: AnalyticsDataset, mark: str = "token_price") -> Dict[str, np.ndarray]:
+        """Net (user, property) positions with ownership, value and projected income"""
+        flows = data.flows
+        props = data.properties
+        pair_key = flows["user"] * max(data.property_count, 1) + flows["property"]
+        pairs, pair_index = np.unique(pair_key, return_inverse=True)
+        tokens = np.bincount(pair_index, weights=flows["token_delta"], minlength=len(pairs))
+
+        held = tokens > 0
+        pairs, tokens = pairs[held], tokens[held]
+        users = pairs // max(data.property_count, 1)
+        properties = pairs % max(data.property_count, 1)
+
+        price = props["token_price"]
+        if mark == "last_trade":
+            price = np.where(np.isnan(props["last_trade_price"]), props["token_price"], props["last_trade_price"])
+
+        return {
+            "user": users,
+            "property": properties,
+            "tokens": tokens,
+            "ownership": ownership_fractions(tokens, props["total_tokens"][properties]),
+            "value": tokens * price[properties],
+            "monthly_income": income_shares(tokens, props["total_tokens"][properties], 1.0) * props["monthly_rent"][properties]
+        }
+
+    def investor_metrics(self, data: AnalyticsDataset, mark: str = "token_price") -> Dict[str, np.ndarray]:
+        """Per-investor columns: invested, proceeds, distributions, value, income, realized yield, XIRR, HHI"""
+        flows = data.flows
+        n = data.user_count
+        positions = self._positions(data, mark)
+
+        invested = np.bincount(flows["user"], weights=np.where(flows["is_purchase"], -flows["cash"], 0.0), minlength=n)
+        proceeds = np.bincount(flows["user"], weights=np.where(flows["is_sale"], flows["cash"], 0.0), minlength=n)
+        distributions = np.bincount(flows["user"], weights=np.where(flows["is_distribution"], flows["cash"], 0.0), minlength=n)
+        value = np.bincount(positions["user"], weights=positions["value"], minlength=n)
+        monthly_income = np.bincount(positions["user"], weights=positions["monthly_income"], minlength=n)
+        net_invested = invested - proceeds
+        realized_yield = np.divide(distributions, net_invested, out=np.zeros(n), where=net_invested > 0) * 100
+
+        # Terminal value is treated as a sale on the valuation date
+        groups = np.concatenate([flows["user"], np.arange(n)])
+        amounts = np.concatenate([flows["cash"], value])
+        years = np.concatenate([flows["years_before"], np.zeros(n)])
+        irr = xirr(groups, amounts, years, n) * 100 if n else np.zeros(0)
+
+        # Herfindahl index over each investor's position values (1.0 = one property)
+        share = np.divide(positions["value"], value[positions["user"]], out=np.zeros(len(positions["value"])), where=value[positions["user"]] > 0)
+        hhi = np.bincount(positions["user"], weights=share ** 2, minlength=n)
+        property_count = np.bincount(positions["user"], minlength=n)
+
+        return {
+            "invested": invested,
+            "proceeds": proceeds,
+            "distributions": distributions,
+            "current_value": value,
+            "monthly_income": monthly_income,
+            "realized_yield": realized_yield,
+            "xirr": irr,
+            "hhi": hhi,
+            "property_count": property_count
+        }
+
+    def exposure(self, data: AnalyticsDataset, by: str, user_code: Optional[int] = None, mark: str = "token_price") -> List[Dict[str, Any]]:
+        """Value held grouped by a property column (city, property_type), largest first"""
+        positions = self._positions(data, mark)
+        mask = np.ones(len(positions["user"]), dtype=bool) if user_code is None else positions["user"] == user_code
+        labels = data.properties[by][positions["property"][mask]]
+        if not len(labels):
+            return []
+        codes, uniques = _factorize(list(labels))
+        value = np.bincount(codes, weights=positions["value"][mask], minlength=len(uniques))
+        tokens = np.bincount(codes, weights=positions["tokens"][mask], minlength=len(uniques))
+        total = value.sum()
+        order = np.argsort(-value)
+        return [
+            {
+                by: str(uniques[i]),
+                "current_value": float(value[i]),
+                "tokens": int(tokens[i]),
+                "share": float(value[i] / total) if total > 0 else 0.0
+            }
+            for i in order
+        ]
+
+    def cash_flow_schedule(self, data: AnalyticsDataset, user_code: Optional[int] = None, months_ahead: int = 12) -> Dict[str, List[Dict[str, Any]]]:
+        """Monthly historical net cash flows plus projected rental income for the coming months"""
+        flows = data.flows
+        mask = np.ones(len(flows["user"]), dtype=bool) if user_code is None else flows["user"] == user_code
+        history = []
+        if mask.any():
+            months = flows["month"][mask]
+            first = months.min()
+            offsets = months - first
+            span = offsets.max() + 1
+            cash_in = np.bincount(offsets, weights=np.where(flows["cash"][mask] > 0, flows["cash"][mask], 0.0), minlength=span)
+            cash_out = np.bincount(offsets, weights=np.where(flows["cash"][mask] < 0, -flows["cash"][mask], 0.0), minlength=span)
+            for i in np.nonzero(cash_in + cash_out)[0]:
+                month = int(first + i)
+                history.append({
+                    "month": f"{month // 12:04d}-{month % 12 + 1:02d}",
+                    "inflow": float(cash_in[i]),
+                    "outflow": float(cash_out[i]),
+                    "net": float(cash_in[i] - cash_out[i])
+                })
+
+        positions = self._positions(data)
+        position_mask = np.ones(len(positions["user"]), dtype=bool) if user_code is None else positions["user"] == user_code
+        monthly = float(positions["monthly_income"][position_mask].sum())
+        start = data.as_of.year * 12 + data.as_of.month
+        projected = [
+            {"month": f"{m // 12:04d}-{m % 12 + 1:02d}", "projected_income": monthly}
+            for m in range(start, start + months_ahead)
+        ]
+        return {"history": history, "projected": projected}
+
+    async def investor_report(self, user_id: str, mark: str = "token_price", months_ahead: int = 12) -> Dict[str, Any]:
+        """Everything for one investor, computed over their own rows only"""
+        data = await self.load(user_id=user_id)
+        if not data.user_count:
+            return {
+                "user_id": user_id, "invested": 0.0, "proceeds": 0.0, "distributions": 0.0, "current_value": 0.0,
+                "monthly_income": 0.0, "realized_yield": 0.0, "xirr": None, "concentration_hhi": 0.0,
+                "holdings": [], "by_city": [], "by_property_type": [], "cash_flows": {"history": [], "projected": []}
+            }
+
+        metrics = self.investor_metrics(data, mark)
+        positions = self._positions(data, mark)
+        props = data.properties
+        holdings = [
+            {
+                "property_id": str(props["id"][p]),
+                "property_title": props["title"][p],
+                "tokens": int(positions["tokens"][i]),
+                "ownership_fraction": float(positions["ownership"][i]),
+                "current_value": float(positions["value"][i]),
+                "monthly_income": float(positions["monthly_income"][i])
+            }
+            for i, p in enumerate(positions["property"])
+        ]
+        return {
+            "user_id": user_id,
+            "invested": float(metrics["invested"][0]),
+            "proceeds": float(metrics["proceeds"][0]),
+            "distributions": float(metrics["distributions"][0]),
+            "current_value": float(metrics["current_value"][0]),
+            "monthly_income": float(metrics["monthly_income"][0]),
+            "realized_yield": float(metrics["realized_yield"][0]),
+            "xirr": _none_if_nan(metrics["xirr"][0]),
+            "concentration_hhi": float(metrics["hhi"][0]),
+            "holdings": holdings,
+            "by_city": self.exposure(data, "city", 0, mark),
+            "by_property_type": self.exposure(data, "property_type", 0, mark),
+            "cash_flows": self.cash_flow_schedule(data, 0, months_ahead)
+        }
+
+    async def platform_report(self, mark: str = "token_price", top: int = 50) -> Dict[str, Any]:
+        """Platform-wide totals, exposure and return distribution, plus the largest investors"""
+        data = await self.load()
+        metrics = self.investor_metrics(data, mark)
+        irr = metrics["xirr"][~np.isnan(metrics["xirr"])] if data.user_count else np.zeros(0)
+
+        order = np.argsort(-metrics["current_value"])[:top]
+        top_investors = [
+            {
+                "user_id": str(data.user_ids[u]),
+                "current_value": float(metrics["current_value"][u]),
+                "invested": float(metrics["invested"][u]),
+                "distributions": float(metrics["distributions"][u]),
+                "realized_yield": float(metrics["realized_yield"][u]),
+                "xirr": _none_if_nan(metrics["xirr"][u]),
+                "concentration_hhi": float(metrics["hhi"][u]),
+                "property_count": int(metrics["property_count"][u])
+            }
+            for u in order
+        ]
+
+        positions = self._positions(data, mark)
+        holders = np.bincount(positions["property"], minlength=data.property_count)
+        supply_owned = np.bincount(positions["property"], weights=positions["ownership"], minlength=data.property_count)
+
+        return {
+            "as_of": data.as_of,
+            "investor_count": int((metrics["property_count"] > 0).sum()),
+            "total_invested": float(metrics["invested"].sum()),
+            "total_current_value": float(metrics["current_value"].sum()),
+            "total_distributions": float(metrics["distributions"].sum()),
+            "total_monthly_income": float(metrics["monthly_income"].sum()),
+            "xirr_percentiles": {
+                f"p{q}": float(np.percentile(irr, q)) for q in (10, 25, 50, 75, 90)
+            } if len(irr) else {},
+            "by_city": self.exposure(data, "city", mark=mark),
+            "by_property_type": self.exposure(data, "property_type", mark=mark),
+            "properties": [
+                {
+                    "property_id": str(data.properties["id"][p]),
+                    "property_title": data.properties["title"][p],
+                    "holders": int(holders[p]),
+                    "ownership_distributed": float(supply_owned[p])
+                }
+                for p in np.argsort(-holders)
+            ],
+            "top_investors": top_investors,
+            "cash_flows": self.cash_flow_schedule(data)
+        }
+
+
+# Global analytics service instance
+analytics_service = AnalyticsService()
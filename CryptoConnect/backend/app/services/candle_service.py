@@ -0,0 +1,138 @@
+"""
+Trade History and Candle Service
+Records secondary market fills and maintains incremental OHLCV rollups
+"""
+from datetime import datetime
+from typing import List, Optional
+from pymongo import UpdateOne
+from app.models.trade import Trade, Candle, CandleInterval
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def bucket_start(timestamp: datetime, interval: CandleInterval) -> datetime:
+    """Truncate a timestamp to the start of its candle bucket"""
+    if interval == CandleInterval.ONE_MINUTE:
+        return timestamp.replace(second=0, microsecond=0)
+    if interval == CandleInterval.ONE_HOUR:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class CandleService:
+    """Service for the trades time series and its 1m/1h/1d OHLCV buckets"""
+
+    async def record_trade(
+        self,
+        property_id: str,
+        buy_order_id: str,
+        sell_order_id: str,
+        buyer_id: str,
+        seller_id: str,
+        tokens: int,
+        price_per_token: float,
+        executed_at: Optional[datetime] = None
+    ) -> Trade:
+        """Write a fill to the trades collection and roll it into every candle interval"""
+        trade = Trade(
+            property_id=property_id,
+            buy_order_id=buy_order_id,
+            sell_order_id=sell_order_id,
+            buyer_id=buyer_id,
+            seller_id=seller_id,
+            tokens=tokens,
+            price_per_token=price_per_token,
+            total_amount=tokens * price_per_token,
+            executed_at=executed_at or datetime.utcnow()
+        )
+        await trade.insert()
+        await self._apply_to_candles([trade])
+        return trade
+
+    async def _apply_to_candles(self, trades: List[Trade]):
+        """Upsert the OHLCV buckets touched by the given trades in a single bulk write"""
+        operations = []
+        for trade in trades:
+            for interval in CandleInterval:
+                operations.append(UpdateOne(
+                    {
+                        "property_id": trade.property_id,
+                        "interval": interval.value,
+                        "bucket_start": bucket_start(trade.executed_at, interval)
+                    },
+                    {
+                        "$setOnInsert": {"open": trade.price_per_token},
+                        "$max": {"high": trade.price_per_token},
+                        "$min": {"low": trade.price_per_token},
+                        "$set": {"close": trade.price_per_token, "updated_at": datetime.utcnow()},
+                        "$inc": {
+                            "volume": trade.tokens,
+                            "quote_volume": trade.total_amount,
+                            "trade_count": 1
+                        }
+                    },
+                    upsert=True
+                ))
+
+        if operations:
+            await Candle.get_pymongo_collection().bulk_write(operations, ordered=True)
+
+    async def get_candles(
+        self,
+        property_id: str,
+        interval: CandleInterval,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 500
+    ) -> List[Candle]:
+        """Read a range of precomputed candles, oldest first"""
+        query_filters = [Candle.property_id == property_id, Candle.interval == interval]
+        if start:
+            query_filters.append(Candle.bucket_start >= bucket_start(start, interval))
+        if end:
+            query_filters.append(Candle.bucket_start <= end)
+
+        return await Candle.find(*query_filters).sort(+Candle.bucket_start).limit(limit).to_list()
+
+    async def backfill_from_transactions(self, batch_size: int = 1000) -> int:
+        """Rebuild the trades series from existing SECONDARY_MARKET_BUY transactions (one-off migration)"""
+        await Trade.get_pymongo_collection().delete_many({})
+        await Candle.get_pymongo_collection().delete_many({})
+
+        batch = []
+        count = 0
+        async for tx in Transaction.find(
+            Transaction.transaction_type == TransactionType.SECONDARY_MARKET_BUY,
+            Transaction.status == TransactionStatus.COMPLETED
+        ).sort(+Transaction.created_at):
+            metadata = tx.metadata or {}
+            batch.append(Trade(
+                property_id=tx.property_id,
+                buy_order_id=metadata.get("order_id", ""),
+                sell_order_id=metadata.get("counterparty_order_id", ""),
+                buyer_id=tx.user_id,
+                seller_id=metadata.get("counterparty_user_id", ""),
+                tokens=tx.tokens,
+                price_per_token=tx.token_price,
+                total_amount=tx.amount,
+                executed_at=tx.created_at
+            ))
+            if len(batch) >= batch_size:
+                await Trade.insert_many(batch)
+                await self._apply_to_candles(batch)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            await Trade.insert_many(batch)
+            await self._apply_to_candles(batch)
+            count += len(batch)
+
+        logger.info(f"Backfilled {count} secondary market trades into candles")
+        return count
+
+
+# Global candle service instance
+candle_service = CandleService()
@@ -0,0 +1,264 @@
+"""
+Index Advisor
+Runs explain() on every registered query shape and flags collection scans and in-memory sorts
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from bson import ObjectId
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Representative values; explain() only cares about the shape of the predicate
+SAMPLE_ID = "000000000000000000000000"
+OPEN_ORDER_STATUSES = ["active", "partial"]
+LEDGER_EVENT_TYPES = [
+    "token_purchase", "secondary_market_buy", "token_sale", "secondary_market_sell", "token_transfer", "rental_distribution"
+]
+
+
+class QueryShape(BaseModel):
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: List[Tuple[str, int]] = []
+    description: str = ""
+
+
+# One entry per hot query in the routers and services
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape(
+        name="transactions.balance_by_user_property",
+        collection="transactions",
+        filter={
+            "user_id": SAMPLE_ID,
+            "property_id": SAMPLE_ID,
+            "transaction_type": {"$in": LEDGER_EVENT_TYPES},
+            "status": "completed",
+            "_id": {"$gt": ObjectId(SAMPLE_ID)}
+        },
+        description="LedgerService tail read (user, property)"
+    ),
+    QueryShape(
+        name="transactions.ledger_catch_up",
+        collection="transactions",
+        filter={
+            "_id": {"$gt": ObjectId(SAMPLE_ID), "$lt": ObjectId("ffffffffffffffffffffffff")},
+            "status": "completed",
+            "transaction_type": {"$in": LEDGER_EVENT_TYPES}
+        },
+        sort=[("_id", 1)],
+        description="LedgerService.catch_up"
+    ),
+    QueryShape(
+        name="ledger_positions.by_user",
+        collection="ledger_positions",
+        filter={"user_id": SAMPLE_ID},
+        description="LedgerService.get_user_positions"
+    ),
+    QueryShape(
+        name="ledger_positions.by_property",
+        collection="ledger_positions",
+        filter={"property_id": SAMPLE_ID},
+        description="LedgerService.get_property_holders"
+    ),
+    QueryShape(
+        name="transactions.history_by_user",
+        collection="transactions",
+        filter={"user_id": SAMPLE_ID},
+        sort=[("created_at", -1), ("_id", -1)],
+        description="investor.get_user_transactions / export"
+    ),
+    QueryShape(
+        name="transactions.history_page",
+        collection="transactions",
+        filter={
+            "user_id": SAMPLE_ID,
+            "created_at": {"$gte": datetime(2000, 1, 1), "$lt": datetime(2001, 1, 1)},
+            "$or": [
+                {"created_at": {"$lt": datetime(2000, 6, 1)}},
+                {"created_at": datetime(2000, 6, 1), "_id": {"$lt": ObjectId(SAMPLE_ID)}}
+            ]
+        },
+        sort=[("created_at", -1), ("_id", -1)],
+        description="TransactionHistoryService.get_page"
+    ),
+    QueryShape(
+        name="transactions.holders_by_property",
+        collection="transactions",
+        filter={
+            "property_id": SAMPLE_ID,
+            "transaction_type": {"$in": LEDGER_EVENT_TYPES},
+            "status": "completed",
+            "_id": {"$gt": ObjectId(SAMPLE_ID)}
+        },
+        description="LedgerService tail read (property holders)"
+    ),
+    QueryShape(
+        name="market_orders.match_buy",
+        collection="market_orders",
+        filter={
+            "property_id": SAMPLE_ID,
+            "order_type": "sell",
+            "status": {"$in": OPEN_ORDER_STATUSES},
+            "price_per_token": {"$lte": 1.0}
+        },
+        sort=[("price_per_token", 1)],
+        description="market.find_crossing_orders (buy taker)"
+    ),
+    QueryShape(
+        name="market_orders.match_sell",
+        collection="market_orders",
+        filter={
+            "property_id": SAMPLE_ID,
+            "order_type": "buy",
+            "status": {"$in": OPEN_ORDER_STATUSES},
+            "price_per_token": {"$gte": 1.0}
+        },
+        sort=[("price_per_token", -1)],
+        description="market.find_crossing_orders (sell taker)"
+    ),
+    QueryShape(
+        name="market_orders.by_user",
+        collection="market_orders",
+        filter={"user_id": SAMPLE_ID},
+        sort=[("created_at", -1)],
+        description="market.get_my_orders"
+    ),
+    QueryShape(
+        name="market_orders.gtd_expiry",
+        collection="market_orders",
+        filter={"status": {"$in": OPEN_ORDER_STATUSES}, "expires_at": {"$lte": datetime(2000, 1, 1), "$type": "date"}},
+        description="OrderExpiryService.expire_orders"
+    ),
+    QueryShape(
+        name="market_orders_archive.by_user",
+        collection="market_orders_archive",
+        filter={"user_id": SAMPLE_ID},
+        sort=[("created_at", -1)],
+        description="market.get_my_orders (archive)"
+    ),
+    QueryShape(
+        name="properties.catalogue",
+        collection="properties",
+        filter={"status": {"$in": ["approved", "tokenized", "sold_out"]}},
+        sort=[("created_at", -1)],
+        description="properties.get_properties"
+    ),
+    QueryShape(
+        name="properties.by_seller",
+        collection="properties",
+        filter={"seller_id": SAMPLE_ID},
+        sort=[("created_at", -1)],
+        description="seller.get_seller_properties"
+    ),
+    QueryShape(
+        name="token_symbols.by_code",
+        collection="token_symbols",
+        filter={"currency_code": {"$in": ["ABC"]}},
+        description="TokenSymbolService.resolve_many (in-memory miss)"
+    ),
+    QueryShape(
+        name="order_book_levels.side",
+        collection="order_book_levels",
+        filter={"property_id": SAMPLE_ID, "side": "sell", "quantity": {"$gt": 0}},
+        sort=[("price_per_token", 1)],
+        description="OrderBookService.get_depth"
+    ),
+    QueryShape(
+        name="trade_candles.range",
+        collection="trade_candles",
+        filter={"property_id": SAMPLE_ID, "interval": "1h", "bucket_start": {"$gte": datetime(2000, 1, 1)}},
+        sort=[("bucket_start", 1)],
+        description="CandleService.get_candles"
+    ),
+    QueryShape(
+        name="ledger_transactions.by_account",
+        collection="ledger_transactions",
+        filter={"accounts": "rWallet", "ledger_index": {"$lt": 1000}},
+        sort=[("ledger_index", -1)],
+        description="LedgerIngestionService.get_account_transactions"
+    ),
+]
+
+
+def _collect_stages(plan: Any, stages: List[str]):
+    """Walk an explain plan tree (classic or SBE) and collect every stage name"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            _collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_stages(item, stages)
+
+
+def _collect_index_names(plan: Any, names: List[str]):
+    """Walk an explain plan tree and collect the indexes it uses"""
+    if isinstance(plan, dict):
+        if "indexName" in plan:
+            names.append(plan["indexName"])
+        for value in plan.values():
+            _collect_index_names(value, names)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_index_names(item, names)
+
+
+class IndexAdvisor:
+    """Explains registered query shapes against a live database"""
+
+    def __init__(self, shapes: Optional[List[QueryShape]] = None):
+        self.shapes = shapes if shapes is not None else QUERY_SHAPES
+
+    async def explain_shape(self, database, shape: QueryShape) -> Dict[str, Any]:
+        cursor = database[shape.collection].find(shape.filter)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        explain = await cursor.explain()
+
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages: List[str] = []
+        _collect_stages(winning_plan, stages)
+
+        issues = []
+        if "COLLSCAN" in stages:
+            issues.append("COLLSCAN")
+        if "SORT" in stages:
+            issues.append("in-memory SORT")
+
+        index_names: List[str] = []
+        _collect_index_names(winning_plan, index_names)
+
+        return {
+            "name": shape.name,
+            "collection": shape.collection,
+            "description": shape.description,
+            "stages": stages,
+            "indexes": index_names,
+            "issues": issues
+        }
+
+    async def run(self, database) -> List[Dict[str, Any]]:
+        """Explain every shape; returns one report row per shape"""
+        reports = []
+        for shape in self.shapes:
+            try:
+                reports.append(await self.explain_shape(database, shape))
+            except Exception as e:
+                logger.error(f"Explain failed for {shape.name}: {e}")
+                reports.append({
+                    "name": shape.name,
+                    "collection": shape.collection,
+                    "description": shape.description,
+                    "stages": [],
+                    "indexes": [],
+                    "issues": [f"explain failed: {e}"]
+                })
+        return reports
+
+
+# Global index advisor instance
+index_advisor = IndexAdvisor()
@@ -0,0 +1,189 @@
+"""
+Ledger Ingestion Service
+Polls validated ledgers for the issuer and every user wallet and mirrors their
+transactions into Mongo, so wallet history and tx details are local indexed reads
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from pymongo import UpdateOne
+from xrpl.utils import drops_to_xrp, ripple_time_to_datetime
+from app.models.ledger_transaction import LedgerTransaction, LedgerAccountCursor
+from app.models.property import Property
+from app.models.user import User
+from app.services.xrpl_service import xrpl_service
+from app.config import settings
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def decode_hex(value: Optional[str]) -> Optional[str]:
+    """Memo fields are hex-encoded; fall back to the raw value if it isn't valid UTF-8 text"""
+    if not value:
+        return None
+    try:
+        return bytes.fromhex(value).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return value
+
+
+def normalize_amount(amount: Any) -> Optional[Dict[str, Any]]:
+    if amount is None:
+        return None
+    if isinstance(amount, str):
+        return {"currency": "XRP", "value": str(drops_to_xrp(amount))}
+    if isinstance(amount, dict) and "currency" in amount:
+        return {"currency": amount["currency"], "value": str(amount.get("value", "0")), "issuer": amount.get("issuer")}
+    return None
+
+
+def normalize_entry(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Flatten an account_tx entry (API v1 `tx` or v2 `tx_json`) or a tx result into a ledger_transactions document"""
+    tx = entry.get("tx_json") or entry.get("tx") or entry
+    tx_hash = entry.get("hash") or tx.get("hash")
+    ledger_index = entry.get("ledger_index") or tx.get("ledger_index")
+    if not tx_hash or ledger_index is None or not entry.get("validated", True):
+        return None
+
+    meta = entry.get("meta") or {}
+    if isinstance(meta, str):
+        meta = {}
+
+    date = None
+    if entry.get("close_time_iso"):
+        date = datetime.fromisoformat(entry["close_time_iso"].replace("Z", "+00:00"))
+    elif tx.get("date") is not None:
+        date = ripple_time_to_datetime(tx["date"])
+    if date is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+
+    amount = normalize_amount(tx.get("Amount") or tx.get("DeliverMax") or tx.get("LimitAmount"))
+    accounts = {tx.get("Account"), tx.get("Destination")}
+    for value in (tx.get("Amount"), tx.get("LimitAmount")):
+        if isinstance(value, dict):
+            accounts.add(value.get("issuer"))
+
+    return {
+        "hash": tx_hash,
+        "ledger_index": int(ledger_index),
+        "date": date,
+        "transaction_type": tx.get("TransactionType", "Unknown"),
+        "account": tx.get("Account", ""),
+        "destination": tx.get("Destination"),
+        "accounts": sorted(a for a in accounts if a),
+        "amount": amount,
+        "delivered_amount": normalize_amount(meta.get("delivered_amount")),
+        "fee_drops": tx.get("Fee"),
+        "result": meta.get("TransactionResult"),
+        "memos": [
+            {
+                "memo_type": decode_hex(memo.get("Memo", {}).get("MemoType")),
+                "memo_format": decode_hex(memo.get("Memo", {}).get("MemoFormat")),
+                "memo_data": decode_hex(memo.get("Memo", {}).get("MemoData"))
+            }
+            for memo in tx.get("Memos", [])
+        ],
+        "raw": {"tx": tx, "meta": meta}
+    }
+
+
+class LedgerIngestionService:
+    """Background worker mirroring tracked accounts' validated transactions"""
+
+    def __init__(self, page_size: int = 200, concurrency: int = 8):
+        self.page_size = page_size
+        self.concurrency = concurrency
+
+    async def tracked_addresses(self) -> List[str]:
+        """The issuer(s) plus every user wallet"""
+        addresses = set(await User.get_pymongo_collection().distinct("xrpl_wallet_address"))
+        addresses |= set(await Property.get_pymongo_collection().distinct("xrpl_issuer_address"))
+        addresses |= {wallet.address for wallet in xrpl_service.issuer_pool}
+        if settings.issuer_wallet_address:
+            addresses.add(settings.issuer_wallet_address)
+        return sorted(a for a in addresses if a)
+
+    async def store(self, entries: List[Dict[str, Any]]) -> int:
+        """Upsert normalized transactions by hash; the same tx seen from two accounts lands once"""
+        operations = []
+        now = datetime.utcnow()
+        for entry in entries:
+            doc = normalize_entry(entry)
+            if doc:
+                operations.append(UpdateOne(
+                    {"hash": doc["hash"]},
+                    {"$set": doc, "$setOnInsert": {"ingested_at": now}},
+                    upsert=True
+                ))
+        if operations:
+            await LedgerTransaction.get_pymongo_collection().bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def ingest_account(self, address: str) -> int:
+        """Pull everything validated since the account's cursor"""
+        cursor = await LedgerAccountCursor.find_one(LedgerAccountCursor.address == address)
+        if cursor is None:
+            cursor = LedgerAccountCursor(address=address)
+
+        ledger_index_min = cursor.last_ledger_index + 1 if cursor.last_ledger_index else -1
+        highest = cursor.last_ledger_index
+        stored = 0
+        marker = None
+        while True:
+            entries, marker = await xrpl_service.get_account_tx_page(
+                address, ledger_index_min=ledger_index_min, marker=marker, limit=self.page_size
+            )
+            stored += await self.store(entries)
+            for entry in entries:
+                ledger_index = entry.get("ledger_index") or (entry.get("tx") or {}).get("ledger_index")
+                if ledger_index:
+                    highest = max(highest, int(ledger_index))
+            if not marker:
+                break
+
+        cursor.last_ledger_index = highest
+        cursor.last_polled_at = datetime.utcnow()
+        await cursor.save()
+        return stored
+
+    async def run(self) -> int:
+        """One polling pass over every tracked address"""
+        addresses = await self.tracked_addresses()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def ingest(address: str) -> int:
+            async with semaphore:
+                try:
+                    return await self.ingest_account(address)
+                except Exception as e:
+                    logger.error(f"Ledger ingestion failed for {address}: {e}")
+                    return 0
+
+        stored = sum(await asyncio.gather(*(ingest(address) for address in addresses)))
+        if stored:
+            logger.info(f"Ingested {stored} ledger transactions across {len(addresses)} accounts")
+        return stored
+
+    async def get_account_transactions(self, address: str, limit: int = 10, before_ledger: Optional[int] = None) -> List[LedgerTransaction]:
+        """Newest-first history for one account from the local mirror"""
+        query_filters = [LedgerTransaction.accounts == address]
+        if before_ledger:
+            query_filters.append(LedgerTransaction.ledger_index < before_ledger)
+        return await LedgerTransaction.find(*query_filters).sort(-LedgerTransaction.ledger_index).limit(limit).to_list()
+
+    async def get_transaction(self, tx_hash: str) -> Optional[LedgerTransaction]:
+        """Local lookup by hash; a miss (e.g. not yet polled) is fetched once from the node and stored"""
+        tx = await LedgerTransaction.find_one(LedgerTransaction.hash == tx_hash)
+        if tx:
+            return tx
+
+        details = await xrpl_service.get_transaction_details(tx_hash)
+        if not details or not details.get("validated"):
+            return None
+        await self.store([details["transaction"]])
+        return await LedgerTransaction.find_one(LedgerTransaction.hash == tx_hash)
+
+
+# Global ledger ingestion worker instance
+ledger_ingestion_service = LedgerIngestionService()
@@ -0,0 +1,268 @@
+"""
+Ledger Projection Service
+Folds the transactions collection, in insertion order, into per-(user, property)
+positions with a checkpointed high-water mark. Reads combine the projected
+position with the few events written since the checkpoint, so every caller sees
+the same balance without replaying history.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.models.ledger import LedgerPosition, LedgerCheckpoint
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.user import User
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "positions"
+
+BUY_TYPES = [TransactionType.TOKEN_PURCHASE.value, TransactionType.SECONDARY_MARKET_BUY.value]
+SELL_TYPES = [TransactionType.TOKEN_SALE.value, TransactionType.SECONDARY_MARKET_SELL.value]
+TRANSFER_TYPE = TransactionType.TOKEN_TRANSFER.value
+DISTRIBUTION_TYPE = TransactionType.RENTAL_DISTRIBUTION.value
+PROJECTED_TYPES = BUY_TYPES + SELL_TYPES + [TRANSFER_TYPE, DISTRIBUTION_TYPE]
+
+EVENT_PROJECTION = {
+    "user_id": 1,
+    "property_id": 1,
+    "transaction_type": 1,
+    "tokens": 1,
+    "amount": 1,
+    "token_price": 1,
+    "xrpl_to_address": 1
+}
+
+PositionKey = Tuple[str, str]
+
+
+def empty_position(user_id: str, property_id: str) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "property_id": property_id,
+        "tokens": 0,
+        "cost_basis": 0.0,
+        "income_received": 0.0,
+        "last_event_id": None
+    }
+
+
+def _already_applied(position: Dict[str, Any], event_id: ObjectId) -> bool:
+    last = position.get("last_event_id")
+    return last is not None and event_id <= ObjectId(last)
+
+
+def _debit(position: Dict[str, Any], tokens: int) -> float:
+    """Remove tokens at average cost; returns the cost basis released"""
+    held = position["tokens"]
+    released = position["cost_basis"] * min(tokens, held) / held if held > 0 else 0.0
+    position["tokens"] -= tokens
+    position["cost_basis"] -= released
+    return released
+
+
+def fold_events(
+    positions: Dict[PositionKey, Dict[str, Any]],
+    events: List[Dict[str, Any]],
+    recipients: Dict[str, str]
+) -> set:
+    """Apply events (sorted by _id) to positions in place; returns the keys that changed.
+
+    Transfers debit the sender and, when the destination address belongs to a platform
+    user, credit them with the tokens and the cost basis that moved.
+    """
+    touched = set()
+
+    def position_for(user_id: str, property_id: str) -> Dict[str, Any]:
+        key = (user_id, property_id)
+        if key not in positions:
+            positions[key] = empty_position(user_id, property_id)
+        return positions[key]
+
+    for event in events:
+        event_id = event["_id"]
+        tx_type = event["transaction_type"]
+        tokens = event.get("tokens") or 0
+        amount = event.get("amount") or 0.0
+        property_id = event["property_id"]
+        position = position_for(event["user_id"], property_id)
+
+        if not _already_applied(position, event_id):
+            if tx_type in BUY_TYPES:
+                position["tokens"] += tokens
+                position["cost_basis"] += amount
+            elif tx_type in SELL_TYPES:
+                _debit(position, tokens)
+            elif tx_type == TRANSFER_TYPE:
+                event["_released_cost"] = _debit(position, tokens)
+            elif tx_type == DISTRIBUTION_TYPE:
+                position["income_received"] += amount
+            position["last_event_id"] = str(event_id)
+            touched.add((event["user_id"], property_id))
+
+        if tx_type == TRANSFER_TYPE:
+            recipient_id = recipients.get(event.get("xrpl_to_address") or "")
+            if recipient_id:
+                recipient = position_for(recipient_id, property_id)
+                if not _already_applied(recipient, event_id):
+                    recipient["tokens"] += tokens
+                    recipient["cost_basis"] += event.get("_released_cost", tokens * (event.get("token_price") or 0.0))
+                    recipient["last_event_id"] = str(event_id)
+                    touched.add((recipient_id, property_id))
+
+    return touched
+
+
+class LedgerService:
+    """Service for the transactions -> positions projection"""
+
+    def __init__(self, batch_size: int = 1000, settle_seconds: float = 5):
+        self.batch_size = batch_size
+        # Events younger than this are left for the next pass so concurrent writers'
+        # ObjectIds can't land behind the checkpoint
+        self.settle_seconds = settle_seconds
+
+    async def _checkpoint(self) -> LedgerCheckpoint:
+        checkpoint = await LedgerCheckpoint.find_one(LedgerCheckpoint.name == CHECKPOINT_NAME)
+        if checkpoint is None:
+            checkpoint = LedgerCheckpoint(name=CHECKPOINT_NAME)
+            await checkpoint.insert()
+        return checkpoint
+
+    async def recipients(self, events: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Platform users behind transfer destination addresses"""
+        addresses = list({
+            event["xrpl_to_address"] for event in events
+            if event["transaction_type"] == TRANSFER_TYPE and event.get("xrpl_to_address")
+        })
+        if not addresses:
+            return {}
+        cursor = User.get_pymongo_collection().find(
+            {"xrpl_wallet_address": {"$in": addresses}}, {"xrpl_wallet_address": 1}
+        )
+        return {doc["xrpl_wallet_address"]: str(doc["_id"]) async for doc in cursor}
+
+    async def _load_positions(self, keys: set) -> Dict[PositionKey, Dict[str, Any]]:
+        if not keys:
+            return {}
+        users = list({user_id for user_id, _ in keys})
+        properties = list({property_id for _, property_id in keys})
+        cursor = LedgerPosition.get_pymongo_collection().find(
+            {"user_id": {"$in": users}, "property_id": {"$in": properties}}, {"_id": 0, "updated_at": 0}
+        )
+        positions = {}
+        async for doc in cursor:
+            key = (doc["user_id"], doc["property_id"])
+            if key in keys:
+                positions[key] = doc
+        return positions
+
+    async def catch_up(self) -> int:
+        """Apply every settled event past the checkpoint; returns how many were applied"""
+        checkpoint = await self._checkpoint()
+        upper = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=self.settle_seconds))
+        applied = 0
+
+        while True:
+            id_range: Dict[str, Any] = {"$lt": upper}
+            if checkpoint.last_event_id:
+                id_range["$gt"] = ObjectId(checkpoint.last_event_id)
+            events = await Transaction.get_pymongo_collection().find(
+                {
+                    "_id": id_range,
+                    "status": TransactionStatus.COMPLETED.value,
+                    "transaction_type": {"$in": PROJECTED_TYPES}
+                },
+                EVENT_PROJECTION
+            ).sort("_id", 1).limit(self.batch_size).to_list(length=self.batch_size)
+            if not events:
+                break
+
+            recipients = await self.recipients(events)
+            keys = {(event["user_id"], event["property_id"]) for event in events}
+            keys |= {
+                (recipients[event["xrpl_to_address"]], event["property_id"])
+                for event in events if event.get("xrpl_to_address") in recipients
+            }
+            positions = await self._load_positions(keys)
+            touched = fold_events(positions, events, recipients)
+
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {"user_id": user_id, "property_id": property_id},
+                    {"$set": {**positions[(user_id, property_id)], "updated_at": now}},
+                    upsert=True
+                )
+                for user_id, property_id in touched
+            ]
+            if operations:
+                await LedgerPosition.get_pymongo_collection().bulk_write(operations, ordered=False)
+
+            # Positions first, checkpoint second: a crash in between replays the batch,
+            # and per-position last_event_id makes that replay a no-op
+            checkpoint.last_event_id = str(events[-1]["_id"])
+            checkpoint.events_applied += len(events)
+            checkpoint.updated_at = now
+            await checkpoint.save()
+            applied += len(events)
+
+            if len(events) < self.batch_size:
+                break
+
+        if applied:
+            logger.info(f"Ledger projection applied {applied} events")
+        return applied
+
+    async def rebuild(self) -> int:
+        """Drop every projected position and replay the whole log"""
+        await LedgerPosition.get_pymongo_collection().delete_many({})
+        await LedgerCheckpoint.get_pymongo_collection().delete_many({"name": CHECKPOINT_NAME})
+        return await self.catch_up()
+
+    async def _tail(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Completed events newer than the checkpoint matching `query`, oldest first"""
+        checkpoint = await self._checkpoint()
+        if checkpoint.last_event_id:
+            query = {**query, "_id": {"$gt": ObjectId(checkpoint.last_event_id)}}
+        events = await Transaction.get_pymongo_collection().find(
+            {**query, "status": TransactionStatus.COMPLETED.value, "transaction_type": {"$in": PROJECTED_TYPES}},
+            EVENT_PROJECTION
+        ).to_list(length=None)
+        # The tail is small; sort here so the query needs no in-memory SORT stage
+        events.sort(key=lambda event: event["_id"])
+        return events
+
+    async def get_user_positions(self, user_id: str, property_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Current positions of one user keyed by property_id (tokens may be zero)"""
+        query: Dict[str, Any] = {"user_id": user_id}
+        if property_id:
+            query["property_id"] = property_id
+
+        positions: Dict[PositionKey, Dict[str, Any]] = {}
+        async for doc in LedgerPosition.get_pymongo_collection().find(query, {"_id": 0, "updated_at": 0}):
+            positions[(doc["user_id"], doc["property_id"])] = doc
+
+        # Only this user's own events; incoming transfers land on the next catch-up
+        fold_events(positions, await self._tail(query), {})
+        return {key[1]: position for key, position in positions.items() if key[0] == user_id}
+
+    async def get_balance(self, user_id: str, property_id: str) -> int:
+        position = (await self.get_user_positions(user_id, property_id)).get(property_id)
+        return max(0, position["tokens"]) if position else 0
+
+    async def get_property_holders(self, property_id: str) -> Dict[str, int]:
+        """user_id -> tokens for everyone currently holding the property"""
+        positions: Dict[PositionKey, Dict[str, Any]] = {}
+        async for doc in LedgerPosition.get_pymongo_collection().find({"property_id": property_id}, {"_id": 0, "updated_at": 0}):
+            positions[(doc["user_id"], doc["property_id"])] = doc
+
+        tail = await self._tail({"property_id": property_id})
+        fold_events(positions, tail, await self.recipients(tail))
+        return {key[0]: position["tokens"] for key, position in positions.items() if position["tokens"] > 0}
+
+
+# Global ledger projection instance
+ledger_service = LedgerService(batch_size=settings.ledger_batch_size, settle_seconds=settings.ledger_settle_seconds)
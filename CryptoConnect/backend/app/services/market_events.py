@@ -0,0 +1,100 @@
+"""
+Market Event Bus
+In-process publish/subscribe channel for secondary market updates. Subscribers only see
+events published by their own worker process.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Subscription key used by clients that want every property
+ALL_PROPERTIES = "*"
+
+
+class MarketEventBus:
+    """Fans out order book deltas, trades and property updates to subscribers per property"""
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, property_id: Optional[str] = None) -> asyncio.Queue:
+        """Register a subscriber queue for one property (or all properties)"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[property_id or ALL_PROPERTIES].add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, property_id: Optional[str] = None):
+        """Remove a subscriber queue"""
+        key = property_id or ALL_PROPERTIES
+        subscribers = self._subscribers.get(key)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[key]
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, event_type: str, property_id: str, data: Dict[str, Any]):
+        """Publish an event to the property's subscribers and the global subscribers"""
+        queues = self._subscribers.get(property_id, set()) | self._subscribers.get(ALL_PROPERTIES, set())
+        if not queues:
+            return
+
+        event = {
+            "type": event_type,
+            "property_id": property_id,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+        for queue in queues:
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than block the publisher
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+                logger.warning(f"Market feed subscriber lagging on {property_id}, dropped oldest event")
+            queue.put_nowait(event)
+
+    def publish_order(self, order, event_type: str = "order_updated"):
+        """Publish an order book delta for a market order"""
+        self.publish(event_type, order.property_id, {
+            "order_id": str(order.id),
+            "order_type": order.order_type,
+            "price_per_token": order.price_per_token,
+            "tokens": order.tokens,
+            "tokens_filled": order.tokens_filled,
+            "tokens_remaining": order.tokens - order.tokens_filled,
+            "status": order.status
+        })
+
+    def publish_trade(self, property_id: str, buy_order_id: str, sell_order_id: str, tokens: int, price_per_token: float):
+        """Publish an executed secondary market trade"""
+        self.publish("trade", property_id, {
+            "buy_order_id": buy_order_id,
+            "sell_order_id": sell_order_id,
+            "tokens": tokens,
+            "price_per_token": price_per_token,
+            "total_amount": tokens * price_per_token
+        })
+
+    def publish_property(self, property_obj):
+        """Publish a property supply update (tokens sold / price)"""
+        self.publish("property_updated", str(property_obj.id), {
+            "tokens_sold": property_obj.tokens_sold,
+            "total_tokens": property_obj.total_tokens,
+            "tokens_available": property_obj.total_tokens - property_obj.tokens_sold,
+            "token_price": property_obj.token_price
+        })
+
+
+# Global market event bus instance
+market_events = MarketEventBus()
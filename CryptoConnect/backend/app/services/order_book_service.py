@@ -0,0 +1,139 @@
+"""
+Order Book Depth Service
+Maintains aggregated price levels incrementally as orders are created, filled or cancelled
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+from pymongo import UpdateOne, DeleteOne
+from app.models.order_book import OrderBookLevel, DepthLevel
+from app.models.market_order import MarketOrder
+import logging
+
+logger = logging.getLogger(__name__)
+
+BUY_SIDE = "buy"
+SELL_SIDE = "sell"
+RESTING_STATUSES = ["active", "partial"]
+# Decimal places kept on price / tick before bucketing; drops floating-point division noise
+TICK_PRECISION = 9
+
+
+class OrderBookService:
+    """Service for precomputed bid/ask price levels per property"""
+
+    async def apply_delta(self, property_id: str, side: str, price_per_token: float, quantity_delta: int, order_count_delta: int = 0):
+        """Adjust one price level; levels that drop to zero are removed"""
+        await self.apply_deltas([(property_id, side, price_per_token, quantity_delta, order_count_delta)])
+
+    async def apply_deltas(self, deltas: List[tuple]):
+        """Apply (property_id, side, price, quantity_delta, order_count_delta) tuples in one bulk write"""
+        operations = self.delta_operations(deltas)
+        if operations:
+            await OrderBookLevel.get_pymongo_collection().bulk_write(operations, ordered=True)
+
+    def delta_operations(self, deltas: List[tuple]) -> List:
+        """The bulk-write operations for a set of deltas (for callers batching them into a unit of work)"""
+        operations = []
+        for property_id, side, price_per_token, quantity_delta, order_count_delta in deltas:
+            if quantity_delta == 0 and order_count_delta == 0:
+                continue
+            key = {"property_id": property_id, "side": str(getattr(side, "value", side)), "price_per_token": price_per_token}
+            operations.append(UpdateOne(
+                key,
+                {
+                    "$inc": {"quantity": quantity_delta, "order_count": order_count_delta},
+                    "$set": {"updated_at": datetime.utcnow()}
+                },
+                upsert=True
+            ))
+            operations.append(DeleteOne({**key, "quantity": {"$lte": 0}}))
+        return operations
+
+    async def order_added(self, order):
+        """A new order is resting in the book"""
+        await self.apply_delta(order.property_id, order.order_type, order.price_per_token, order.tokens - order.tokens_filled, 1)
+
+    async def order_removed(self, order):
+        """An order left the book (cancelled or expired) with its unfilled remainder"""
+        await self.apply_delta(order.property_id, order.order_type, order.price_per_token, -(order.tokens - order.tokens_filled), -1)
+
+    def fill_deltas(self, order, tokens: int) -> tuple:
+        """Delta for an order that was filled by `tokens` (its fill counters already updated)"""
+        closed = order.tokens_filled >= order.tokens
+        return (order.property_id, order.order_type, order.price_per_token, -tokens, -1 if closed else 0)
+
+    async def get_depth(self, property_id: str, levels: int = 20, tick_size: Optional[float] = None) -> Dict[str, List[DepthLevel]]:
+        """Read top-N bid and ask levels, optionally grouped into tick-size buckets"""
+        return {
+            "bids": await self._read_side(property_id, BUY_SIDE, levels, tick_size),
+            "asks": await self._read_side(property_id, SELL_SIDE, levels, tick_size)
+        }
+
+    async def _read_side(self, property_id: str, side: str, levels: int, tick_size: Optional[float]) -> List[DepthLevel]:
+        # Bids are best-first descending, asks best-first ascending
+        direction = -1 if side == BUY_SIDE else 1
+        collection = OrderBookLevel.get_pymongo_collection()
+
+        if not tick_size:
+            cursor = collection.find(
+                {"property_id": property_id, "side": side, "quantity": {"$gt": 0}},
+                {"_id": 0, "price_per_token": 1, "quantity": 1, "order_count": 1}
+            ).sort("price_per_token", direction).limit(levels)
+            rows = await cursor.to_list(length=levels)
+        else:
+            # Bids round down and asks round up so grouped levels never look better than reality.
+            # The tick count is rounded first so a price on a tick (0.3 / 0.1 = 2.9999999999999996)
+            # stays in its own bucket, and the bucket price is rounded to the tick's decimals.
+            rounding = "$floor" if side == BUY_SIDE else "$ceil"
+            decimals = max(0, -Decimal(str(tick_size)).normalize().as_tuple().exponent)
+            ticks = {"$round": [{"$divide": ["$price_per_token", tick_size]}, TICK_PRECISION]}
+            pipeline = [
+                {"$match": {"property_id": property_id, "side": side, "quantity": {"$gt": 0}}},
+                {"$group": {
+                    "_id": {"$round": [{"$multiply": [{rounding: ticks}, tick_size]}, decimals]},
+                    "quantity": {"$sum": "$quantity"},
+                    "order_count": {"$sum": "$order_count"}
+                }},
+                {"$sort": {"_id": direction}},
+                {"$limit": levels},
+                {"$project": {"_id": 0, "price_per_token": "$_id", "quantity": 1, "order_count": 1}}
+            ]
+            rows = await collection.aggregate(pipeline).to_list(length=levels)
+
+        return [DepthLevel(**row) for row in rows]
+
+    async def rebuild(self, property_id: Optional[str] = None) -> int:
+        """Recompute price levels from resting orders (initial load or repair)"""
+        match = {"status": {"$in": RESTING_STATUSES}}
+        level_filter = {}
+        if property_id:
+            match["property_id"] = property_id
+            level_filter["property_id"] = property_id
+
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {"property_id": "$property_id", "side": "$order_type", "price_per_token": "$price_per_token"},
+                "quantity": {"$sum": {"$subtract": ["$tokens", "$tokens_filled"]}},
+                "order_count": {"$sum": 1}
+            }},
+            {"$match": {"quantity": {"$gt": 0}}}
+        ]
+
+        rows = await MarketOrder.get_pymongo_collection().aggregate(pipeline).to_list(length=None)
+
+        await OrderBookLevel.get_pymongo_collection().delete_many(level_filter)
+        if rows:
+            now = datetime.utcnow()
+            await OrderBookLevel.get_pymongo_collection().insert_many([
+                {**row["_id"], "quantity": row["quantity"], "order_count": row["order_count"], "updated_at": now}
+                for row in rows
+            ])
+
+        logger.info(f"Rebuilt {len(rows)} order book levels")
+        return len(rows)
+
+
+# Global order book service instance
+order_book_service = OrderBookService()
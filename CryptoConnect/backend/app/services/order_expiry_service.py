@@ -0,0 +1,95 @@
+"""
+Order Expiry Service
+Expires GTD orders and moves terminal orders out of the hot market_orders collection
+"""
+from datetime import datetime
+from pymongo import ReplaceOne, ReturnDocument
+from app.config import settings
+from app.models.market_order import MarketOrder, ArchivedMarketOrder, OrderStatus, OPEN_STATUSES
+from app.services.market_events import market_events
+from app.services.order_book_service import order_book_service
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = [OrderStatus.FILLED, OrderStatus.CANCELLED, OrderStatus.EXPIRED]
+
+
+class OrderExpiryService:
+    """Background sweeper for order time-in-force and archival"""
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+
+    async def expire_orders(self) -> int:
+        """Mark resting GTD orders past their expires_at as EXPIRED and pull them from the book"""
+        now = datetime.utcnow()
+        expired = await MarketOrder.find(
+            # The $type clause lets the planner use the partial gtd_expiry index
+            {"status": {"$in": [s.value for s in OPEN_STATUSES]}, "expires_at": {"$lte": now, "$type": "date"}}
+        ).limit(self.batch_size).to_list()
+        if not expired:
+            return 0
+
+        # Each update is guarded on status and returns the order as it was just before the
+        # flip, so an order filled since the read is left alone and partial fills that landed
+        # in between are not taken off the book twice
+        collection = MarketOrder.get_pymongo_collection()
+        before = await asyncio.gather(*(
+            collection.find_one_and_update(
+                {"_id": order.id, "status": {"$in": [s.value for s in OPEN_STATUSES]}},
+                {"$set": {"status": OrderStatus.EXPIRED.value, "updated_at": now}},
+                projection={"tokens_filled": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            for order in expired
+        ))
+        flipped = []
+        for order, doc in zip(expired, before):
+            if doc is None:
+                continue
+            order.tokens_filled = doc.get("tokens_filled", 0)
+            order.status = OrderStatus.EXPIRED
+            order.updated_at = now
+            flipped.append(order)
+
+        await order_book_service.apply_deltas([
+            (order.property_id, order.order_type, order.price_per_token, -(order.tokens - order.tokens_filled), -1)
+            for order in flipped
+        ])
+        for order in flipped:
+            market_events.publish_order(order, "order_expired")
+
+        logger.info(f"Expired {len(flipped)} GTD orders")
+        return len(flipped)
+
+    async def archive_terminal_orders(self) -> int:
+        """Copy filled/cancelled/expired orders to the archive and delete them from market_orders"""
+        terminal = await MarketOrder.get_pymongo_collection().find(
+            {"status": {"$in": [s.value for s in TERMINAL_STATUSES]}}
+        ).limit(self.batch_size).to_list(length=self.batch_size)
+        if not terminal:
+            return 0
+
+        now = datetime.utcnow()
+        # Upserts keep the copy idempotent if a previous sweep died before the delete
+        await ArchivedMarketOrder.get_pymongo_collection().bulk_write([
+            ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": now}, upsert=True)
+            for doc in terminal
+        ], ordered=False)
+        await MarketOrder.get_pymongo_collection().delete_many(
+            {"_id": {"$in": [doc["_id"] for doc in terminal]}, "status": {"$in": [s.value for s in TERMINAL_STATUSES]}}
+        )
+
+        logger.info(f"Archived {len(terminal)} terminal orders")
+        return len(terminal)
+
+    async def sweep(self):
+        """One sweeper pass: expire due orders, then archive terminal ones"""
+        await self.expire_orders()
+        await self.archive_terminal_orders()
+
+
+# Global order expiry service instance
+order_expiry_service = OrderExpiryService(batch_size=settings.order_archive_batch_size)
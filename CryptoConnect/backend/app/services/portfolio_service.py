@@ -0,0 +1,276 @@
+"""
+Portfolio Snapshot Service
+Keeps per-user portfolio totals current incrementally and writes daily history for charting
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.models.portfolio import PortfolioSnapshot, PortfolioHistory, PortfolioPosition
+from app.models.property import Property
+from app.models.transaction import Transaction
+from app.services.ledger_service import ledger_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Purchases and sales re-read the position and retry if it moved underneath them
+MAX_UPDATE_ATTEMPTS = 3
+
+
+def position_figures(property_obj: Property) -> Dict[str, Any]:
+    """Property figures a position is valued at"""
+    return {
+        "property_id": str(property_obj.id),
+        "property_title": property_obj.title,
+        "token_price": property_obj.token_price or 0.0,
+        "total_tokens": property_obj.total_tokens or 0,
+        "monthly_rent": property_obj.monthly_rent or 0.0
+    }
+
+
+def unit_income(figures: Dict[str, Any]) -> float:
+    """Projected monthly income per token"""
+    if not figures.get("total_tokens"):
+        return 0.0
+    return (figures.get("monthly_rent") or 0.0) / figures["total_tokens"]
+
+
+class PortfolioService:
+    """Service for precomputed portfolio valuations
+
+    Incremental updates assume a snapshot already exists; the first event for a user
+    (or any update that can't be applied cleanly) rebuilds it from transactions instead.
+    """
+
+    def __init__(self, history_batch_size: int = 500):
+        self.history_batch_size = history_batch_size
+
+    def _collection(self):
+        return PortfolioSnapshot.get_pymongo_collection()
+
+    async def record_purchase(self, user_id: str, property_obj: Property, tokens: int, amount: float):
+        """Tokens bought (primary investment or secondary market fill); call after the transaction is saved"""
+        try:
+            figures = position_figures(property_obj)
+            key = f"positions.{figures['property_id']}"
+            for _ in range(MAX_UPDATE_ATTEMPTS):
+                doc = await self._collection().find_one({"user_id": user_id}, {key: 1})
+                if doc is None:
+                    await self.rebuild_user(user_id)
+                    return
+                position = (doc.get("positions") or {}).get(figures["property_id"])
+
+                # Tokens already held are revalued at the new figures along with the new ones,
+                # since the price may have moved without a property_changed call
+                if position:
+                    held = position.get("tokens", 0)
+                    guard = {f"{key}.tokens": held, f"{key}.token_price": position.get("token_price", 0.0)}
+                    value_delta = held * (figures["token_price"] - position.get("token_price", 0.0))
+                    income_delta = held * (unit_income(figures) - unit_income(position))
+                else:
+                    guard = {key: {"$exists": False}}
+                    value_delta = income_delta = 0.0
+
+                result = await self._collection().update_one(
+                    {"user_id": user_id, **guard},
+                    {
+                        "$set": {
+                            **{f"{key}.{field}": value for field, value in figures.items()},
+                            "updated_at": datetime.utcnow()
+                        },
+                        "$inc": {
+                            f"{key}.tokens": tokens,
+                            f"{key}.cost_basis": amount,
+                            "total_investment": amount,
+                            "current_value": value_delta + tokens * figures["token_price"],
+                            "monthly_income": income_delta + tokens * unit_income(figures)
+                        }
+                    }
+                )
+                if result.modified_count:
+                    return
+
+            logger.warning(f"Portfolio purchase update contended for user {user_id}; rebuilding snapshot")
+            await self.rebuild_user(user_id)
+        except Exception as e:
+            logger.error(f"Portfolio purchase update failed for user {user_id}: {e}")
+
+    async def record_sale(self, user_id: str, property_id: str, tokens: int):
+        """Tokens sold; cost basis is reduced at average cost"""
+        try:
+            key = f"positions.{property_id}"
+            for _ in range(MAX_UPDATE_ATTEMPTS):
+                doc = await self._collection().find_one({"user_id": user_id}, {key: 1})
+                if doc is None:
+                    await self.rebuild_user(user_id)
+                    return
+                position = (doc.get("positions") or {}).get(property_id)
+                if not position or position.get("tokens", 0) <= 0:
+                    return
+
+                held = position["tokens"]
+                sold = min(tokens, held)
+                cost_released = position.get("cost_basis", 0.0) * sold / held
+
+                # Guard on the token count we read so a concurrent fill can't be double-counted
+                result = await self._collection().update_one(
+                    {"user_id": user_id, f"{key}.tokens": held},
+                    {
+                        "$set": {"updated_at": datetime.utcnow()},
+                        "$inc": {
+                            f"{key}.tokens": -sold,
+                            f"{key}.cost_basis": -cost_released,
+                            "total_investment": -cost_released,
+                            "current_value": -sold * position.get("token_price", 0.0),
+                            "monthly_income": -sold * unit_income(position)
+                        }
+                    }
+                )
+                if result.modified_count:
+                    if sold == held:
+                        await self._collection().update_one(
+                            {"user_id": user_id, f"{key}.tokens": {"$lte": 0}},
+                            {"$unset": {key: ""}}
+                        )
+                    return
+
+            logger.warning(f"Portfolio sale update contended for user {user_id}; rebuilding snapshot")
+            await self.rebuild_user(user_id)
+        except Exception as e:
+            logger.error(f"Portfolio sale update failed for user {user_id}: {e}")
+
+    async def record_distribution(self, user_id: str, amount: float):
+        """Rental income paid out"""
+        try:
+            result = await self._collection().update_one(
+                {"user_id": user_id},
+                {"$inc": {"income_received": amount}, "$set": {"updated_at": datetime.utcnow()}}
+            )
+            if not result.matched_count:
+                await self.rebuild_user(user_id)
+        except Exception as e:
+            logger.error(f"Portfolio distribution update failed for user {user_id}: {e}")
+
+    async def property_changed(self, property_obj: Property):
+        """Revalue every position in a property after its price, supply or rent changed"""
+        try:
+            figures = position_figures(property_obj)
+            key = f"positions.{figures['property_id']}"
+            operations = []
+            async for doc in self._collection().find({key: {"$exists": True}}, {key: 1}):
+                position = doc["positions"][figures["property_id"]]
+                held = position.get("tokens", 0)
+                operations.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {
+                        "$set": {
+                            **{f"{key}.{field}": value for field, value in figures.items()},
+                            "updated_at": datetime.utcnow()
+                        },
+                        "$inc": {
+                            "current_value": held * (figures["token_price"] - position.get("token_price", 0.0)),
+                            "monthly_income": held * (unit_income(figures) - unit_income(position))
+                        }
+                    }
+                ))
+            if operations:
+                await self._collection().bulk_write(operations, ordered=False)
+                logger.info(f"Revalued {len(operations)} portfolios holding {property_obj.title}")
+        except Exception as e:
+            logger.error(f"Portfolio revaluation failed for property {property_obj.id}: {e}")
+
+    async def rebuild_user(self, user_id: str) -> PortfolioSnapshot:
+        """Recompute a user's snapshot from their ledger positions"""
+        holdings = await ledger_service.get_user_positions(user_id)
+        income_received = sum(position["income_received"] for position in holdings.values())
+
+        held_ids = [pid for pid, holding in holdings.items() if holding["tokens"] > 0]
+        properties = {}
+        valid_ids = [ObjectId(pid) for pid in held_ids if ObjectId.is_valid(pid)]
+        if valid_ids:
+            async for property_obj in Property.find({"_id": {"$in": valid_ids}}):
+                properties[str(property_obj.id)] = property_obj
+
+        positions = {}
+        for pid in held_ids:
+            property_obj = properties.get(pid)
+            if not property_obj:
+                logger.warning(f"Skipping holding in missing property {pid} for user {user_id}")
+                continue
+            positions[pid] = PortfolioPosition(
+                **position_figures(property_obj),
+                tokens=int(holdings[pid]["tokens"]),
+                cost_basis=holdings[pid]["cost_basis"]
+            )
+
+        snapshot = await PortfolioSnapshot.find_one(PortfolioSnapshot.user_id == user_id)
+        if not snapshot:
+            snapshot = PortfolioSnapshot(user_id=user_id)
+        snapshot.positions = positions
+        snapshot.total_investment = sum(p.cost_basis for p in positions.values())
+        snapshot.current_value = sum(p.current_value for p in positions.values())
+        snapshot.monthly_income = sum(p.monthly_income for p in positions.values())
+        snapshot.income_received = income_received
+        snapshot.updated_at = datetime.utcnow()
+        await snapshot.save()
+        return snapshot
+
+    async def rebuild_all(self) -> int:
+        """Rebuild every investor's snapshot (initial load or repair)"""
+        user_ids = await Transaction.get_pymongo_collection().distinct("user_id")
+        for user_id in user_ids:
+            await self.rebuild_user(user_id)
+        logger.info(f"Rebuilt {len(user_ids)} portfolio snapshots")
+        return len(user_ids)
+
+    async def get_snapshot(self, user_id: str) -> PortfolioSnapshot:
+        """Single document read; users without a snapshot yet are built on first access"""
+        snapshot = await PortfolioSnapshot.find_one(PortfolioSnapshot.user_id == user_id)
+        if snapshot is None:
+            snapshot = await self.rebuild_user(user_id)
+        return snapshot
+
+    async def record_daily_history(self) -> int:
+        """Copy every snapshot's totals into today's history row (re-runs overwrite the same day)"""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        now = datetime.utcnow()
+        count = 0
+        operations = []
+        cursor = self._collection().find(
+            {},
+            {"user_id": 1, "positions": 1, "total_investment": 1, "current_value": 1, "monthly_income": 1, "income_received": 1}
+        )
+        async for doc in cursor:
+            operations.append(UpdateOne(
+                {"user_id": doc["user_id"], "date": today},
+                {"$set": {
+                    "total_investment": doc.get("total_investment", 0.0),
+                    "current_value": doc.get("current_value", 0.0),
+                    "monthly_income": doc.get("monthly_income", 0.0),
+                    "income_received": doc.get("income_received", 0.0),
+                    "properties_count": len(doc.get("positions") or {}),
+                    "recorded_at": now
+                }},
+                upsert=True
+            ))
+            if len(operations) >= self.history_batch_size:
+                await PortfolioHistory.get_pymongo_collection().bulk_write(operations, ordered=False)
+                count += len(operations)
+                operations = []
+
+        if operations:
+            await PortfolioHistory.get_pymongo_collection().bulk_write(operations, ordered=False)
+            count += len(operations)
+        return count
+
+    async def get_history(self, user_id: str, days: int = 90) -> List[PortfolioHistory]:
+        since = datetime.utcnow() - timedelta(days=days)
+        return await PortfolioHistory.find(
+            PortfolioHistory.user_id == user_id,
+            PortfolioHistory.date >= since
+        ).sort(+PortfolioHistory.date).to_list()
+
+
+# Global portfolio service instance
+portfolio_service = PortfolioService()
@@ -0,0 +1,104 @@
+"""
+Property Listing Service
+Lean list reads: projected raw documents from Motor turned straight into response rows,
+skipping Beanie/Pydantic model construction for the catalogue, seller and admin lists
+"""
+from typing import Any, Dict, List, Optional
+from app.models.property import Property, PropertyStatus, PropertyType
+from app.database import read_collection
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields of PropertyResponse, plus the seller contact fields the admin list shows
+LISTING_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "address": 1,
+    "city": 1,
+    "country": 1,
+    "property_type": 1,
+    "total_value": 1,
+    "size_sqm": 1,
+    "total_tokens": 1,
+    "token_price": 1,
+    "tokens_sold": 1,
+    "bedrooms": 1,
+    "bathrooms": 1,
+    "parking_spaces": 1,
+    "year_built": 1,
+    "monthly_rent": 1,
+    "annual_yield": 1,
+    "seller_name": 1,
+    "seller_id": 1,
+    "seller_email": 1,
+    "status": 1,
+    "images": 1,
+    "created_at": 1
+}
+
+# Statuses investors can browse
+CATALOGUE_STATUSES = [PropertyStatus.APPROVED.value, PropertyStatus.TOKENIZED.value, PropertyStatus.SOLD_OUT.value]
+
+
+def serialize_listing_row(doc: Dict[str, Any], include_seller: bool = False) -> Dict[str, Any]:
+    """Raw property document to the PropertyResponse shape (defaults match the model's)"""
+    row = {
+        "id": str(doc["_id"]),
+        "title": doc.get("title", ""),
+        "description": doc.get("description", ""),
+        "address": doc.get("address", ""),
+        "city": doc.get("city", ""),
+        "country": doc.get("country", ""),
+        "property_type": doc.get("property_type", PropertyType.APARTMENT.value),
+        "total_value": doc.get("total_value", 0),
+        "size_sqm": doc.get("size_sqm", 0),
+        "total_tokens": doc.get("total_tokens", 0),
+        "token_price": doc.get("token_price", 0.0),
+        "tokens_sold": doc.get("tokens_sold", 0),
+        "bedrooms": doc.get("bedrooms"),
+        "bathrooms": doc.get("bathrooms"),
+        "parking_spaces": doc.get("parking_spaces"),
+        "year_built": doc.get("year_built"),
+        "monthly_rent": doc.get("monthly_rent"),
+        "annual_yield": doc.get("annual_yield"),
+        "seller_name": doc.get("seller_name", "Unknown Seller"),
+        "status": doc.get("status", PropertyStatus.PENDING_REVIEW.value),
+        "images": doc.get("images") or [],
+        "created_at": doc.get("created_at")
+    }
+    if include_seller:
+        row["seller_id"] = doc.get("seller_id")
+        row["seller_email"] = doc.get("seller_email")
+    return row
+
+
+class PropertyListingService:
+    """Service for list endpoints that only need response rows, not documents"""
+
+    async def list_rows(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        include_seller: bool = False,
+        read_preference: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Rows for every property matching `query`, in natural order like the model reads they replace.
+
+        read_preference routes the read (see database.read_collection); None reads from
+        the primary so sellers and admins see their own writes immediately.
+        """
+        collection = read_collection(Property, read_preference) if read_preference else Property.get_pymongo_collection()
+        docs = await collection.find(query or {}, LISTING_PROJECTION).to_list(length=None)
+        return [serialize_listing_row(doc, include_seller) for doc in docs]
+
+    async def catalogue(self) -> List[Dict[str, Any]]:
+        """Properties open to investors; may be served by a secondary"""
+        return await self.list_rows(
+            {"status": {"$in": CATALOGUE_STATUSES}},
+            read_preference=settings.mongodb_secondary_read_preference
+        )
+
+
+# Global property listing service instance
+property_listing_service = PropertyListingService()
@@ -0,0 +1,226 @@
+"""
+Reconciliation Service
+Compares projected DB holdings with issuer trust-line balances in bulk: one paged
+account_lines scan per issuer instead of one ledger call per user
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from app.models.ledger import LedgerPosition
+from app.models.property import Property
+from app.models.reconciliation import (
+    ReconciliationRun, ReconciliationDiscrepancy, ReconciliationStatus, DiscrepancyKind
+)
+from app.models.user import User
+from app.services.ledger_service import ledger_service
+from app.services.xrpl_service import xrpl_service
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+BALANCE_TOLERANCE = 1e-6
+
+# (issuer_address, token_symbol, holder_address)
+HoldingKey = Tuple[str, str, str]
+
+
+class ReconciliationService:
+    """Service for scheduled DB vs ledger holding reconciliation"""
+
+    def __init__(self, page_size: int = 400, report_batch_size: int = 1000):
+        self.page_size = page_size
+        self.report_batch_size = report_batch_size
+        self._lock = asyncio.Lock()
+
+    async def _tracked_tokens(self) -> Dict[Tuple[str, str], str]:
+        """(issuer, token_symbol) -> property_id for every tokenized property"""
+        cursor = Property.get_pymongo_collection().find(
+            {"token_symbol": {"$ne": None}, "xrpl_issuer_address": {"$ne": None}},
+            {"token_symbol": 1, "xrpl_issuer_address": 1}
+        )
+        return {
+            (doc["xrpl_issuer_address"], doc["token_symbol"]): str(doc["_id"])
+            async for doc in cursor
+        }
+
+    async def _wallets(self, user_ids: List[str]) -> Dict[str, Optional[str]]:
+        """user_id -> XRPL address in one query"""
+        object_ids = [ObjectId(uid) for uid in user_ids if ObjectId.is_valid(uid)]
+        if not object_ids:
+            return {}
+        cursor = User.get_pymongo_collection().find({"_id": {"$in": object_ids}}, {"xrpl_wallet_address": 1})
+        return {str(doc["_id"]): doc.get("xrpl_wallet_address") async for doc in cursor}
+
+    async def _users_by_address(self, addresses: List[str]) -> Dict[str, str]:
+        if not addresses:
+            return {}
+        cursor = User.get_pymongo_collection().find(
+            {"xrpl_wallet_address": {"$in": addresses}}, {"xrpl_wallet_address": 1}
+        )
+        return {doc["xrpl_wallet_address"]: str(doc["_id"]) async for doc in cursor}
+
+    async def _db_holdings(self, tracked: Dict[Tuple[str, str], str]) -> Tuple[Dict[HoldingKey, Dict[str, Any]], List[Dict[str, Any]]]:
+        """Aggregate projected positions into ledger-shaped keys; also returns holdings with no wallet"""
+        token_by_property = {property_id: key for key, property_id in tracked.items()}
+        positions = await LedgerPosition.get_pymongo_collection().find(
+            {"property_id": {"$in": list(token_by_property)}, "tokens": {"$ne": 0}},
+            {"_id": 0, "user_id": 1, "property_id": 1, "tokens": 1}
+        ).to_list(length=None)
+
+        wallets = await self._wallets(list({p["user_id"] for p in positions}))
+        holdings: Dict[HoldingKey, Dict[str, Any]] = {}
+        no_wallet = []
+        for position in positions:
+            issuer, symbol = token_by_property[position["property_id"]]
+            address = wallets.get(position["user_id"])
+            if not address:
+                no_wallet.append({**position, "issuer_address": issuer, "token_symbol": symbol})
+                continue
+            holding = holdings.setdefault((issuer, symbol, address), {
+                "tokens": 0, "user_id": position["user_id"], "property_id": position["property_id"]
+            })
+            holding["tokens"] += position["tokens"]
+        return holdings, no_wallet
+
+    async def _ledger_holdings(self, issuer: str, symbols: set, run: ReconciliationRun) -> Dict[HoldingKey, float]:
+        """Stream the issuer's trust lines once (always a fresh scan, never the cached holder index)"""
+        balances: Dict[HoldingKey, float] = {}
+        async for lines in xrpl_service.iter_trust_lines(issuer, page_size=self.page_size):
+            run.ledger_pages += 1
+            run.trust_lines_scanned += len(lines)
+            for line in lines:
+                if line.get("currency") not in symbols:
+                    continue
+                # From the issuer's side a negative balance is what the holder owns
+                balance = -float(line["balance"])
+                if balance != 0:
+                    balances[(issuer, line["currency"], line["account"])] = balance
+        return balances
+
+    async def run(self) -> Optional[ReconciliationRun]:
+        """Run one reconciliation pass; returns None if one is already running"""
+        if self._lock.locked():
+            logger.info("Reconciliation already running, skipping")
+            return None
+
+        async with self._lock:
+            started = datetime.utcnow()
+            run = ReconciliationRun(started_at=started)
+            await run.insert()
+            try:
+                # Make sure the projection reflects every settled transaction first
+                await ledger_service.catch_up()
+
+                tracked = await self._tracked_tokens()
+                symbols_by_issuer: Dict[str, set] = {}
+                for issuer, symbol in tracked:
+                    symbols_by_issuer.setdefault(issuer, set()).add(symbol)
+                run.issuer_addresses = sorted(symbols_by_issuer)
+
+                db_holdings, no_wallet = await self._db_holdings(tracked)
+                run.db_positions_checked = len(db_holdings) + len(no_wallet)
+
+                ledger_holdings: Dict[HoldingKey, float] = {}
+                for issuer, symbols in symbols_by_issuer.items():
+                    ledger_holdings.update(await self._ledger_holdings(issuer, symbols, run))
+
+                discrepancies = self._diff(run, tracked, db_holdings, ledger_holdings, no_wallet)
+
+                # Ledger-only holders: tell known users apart from unknown addresses
+                ledger_only = [d for d in discrepancies if d.kind == DiscrepancyKind.UNKNOWN_HOLDER]
+                owners = await self._users_by_address(list({d.holder_address for d in ledger_only}))
+                for discrepancy in ledger_only:
+                    if discrepancy.holder_address in owners:
+                        discrepancy.kind = DiscrepancyKind.MISSING_IN_DB
+                        discrepancy.user_id = owners[discrepancy.holder_address]
+
+                for i in range(0, len(discrepancies), self.report_batch_size):
+                    await ReconciliationDiscrepancy.insert_many(discrepancies[i:i + self.report_batch_size])
+
+                run.discrepancy_count = len(discrepancies)
+                run.total_abs_difference = sum(abs(d.difference) for d in discrepancies)
+                run.matched = len(db_holdings.keys() & ledger_holdings.keys()) - sum(
+                    1 for d in discrepancies if d.kind == DiscrepancyKind.MISMATCH
+                )
+                run.status = ReconciliationStatus.COMPLETED
+            except Exception as e:
+                logger.error(f"Reconciliation failed: {e}")
+                run.status = ReconciliationStatus.FAILED
+                run.error = str(e)
+
+            run.finished_at = datetime.utcnow()
+            run.duration_seconds = (run.finished_at - started).total_seconds()
+            await run.save()
+
+            print(
+                f"🔎 Reconciliation {run.status.value}: {run.trust_lines_scanned} trust lines in {run.ledger_pages} pages, "
+                f"{run.db_positions_checked} DB positions, {run.matched} matched, {run.discrepancy_count} discrepancies "
+                f"({run.duration_seconds:.1f}s)"
+            )
+            return run
+
+    def _diff(
+        self,
+        run: ReconciliationRun,
+        tracked: Dict[Tuple[str, str], str],
+        db_holdings: Dict[HoldingKey, Dict[str, Any]],
+        ledger_holdings: Dict[HoldingKey, float],
+        no_wallet: List[Dict[str, Any]]
+    ) -> List[ReconciliationDiscrepancy]:
+        run_id = str(run.id)
+        discrepancies = []
+
+        for key in db_holdings.keys() | ledger_holdings.keys():
+            issuer, symbol, address = key
+            db = db_holdings.get(key)
+            db_tokens = db["tokens"] if db else 0.0
+            ledger_tokens = ledger_holdings.get(key, 0.0)
+            if abs(ledger_tokens - db_tokens) <= BALANCE_TOLERANCE:
+                continue
+
+            if db and key in ledger_holdings:
+                kind = DiscrepancyKind.MISMATCH
+            elif db:
+                kind = DiscrepancyKind.MISSING_ON_LEDGER
+            else:
+                kind = DiscrepancyKind.UNKNOWN_HOLDER
+
+            discrepancies.append(ReconciliationDiscrepancy(
+                run_id=run_id,
+                kind=kind,
+                issuer_address=issuer,
+                token_symbol=symbol,
+                holder_address=address,
+                property_id=db["property_id"] if db else tracked.get((issuer, symbol)),
+                user_id=db["user_id"] if db else None,
+                db_tokens=db_tokens,
+                ledger_tokens=ledger_tokens,
+                difference=ledger_tokens - db_tokens
+            ))
+
+        for holding in no_wallet:
+            discrepancies.append(ReconciliationDiscrepancy(
+                run_id=run_id,
+                kind=DiscrepancyKind.NO_WALLET,
+                issuer_address=holding["issuer_address"],
+                token_symbol=holding["token_symbol"],
+                property_id=holding["property_id"],
+                user_id=holding["user_id"],
+                db_tokens=holding["tokens"],
+                difference=-holding["tokens"]
+            ))
+        return discrepancies
+
+    async def latest_runs(self, limit: int = 20) -> List[ReconciliationRun]:
+        return await ReconciliationRun.find().sort(-ReconciliationRun.started_at).limit(limit).to_list()
+
+    async def get_discrepancies(self, run_id: str, kind: Optional[DiscrepancyKind] = None, limit: int = 500) -> List[ReconciliationDiscrepancy]:
+        query_filters = [ReconciliationDiscrepancy.run_id == run_id]
+        if kind:
+            query_filters.append(ReconciliationDiscrepancy.kind == kind)
+        return await ReconciliationDiscrepancy.find(*query_filters).limit(limit).to_list()
+
+
+# Global reconciliation service instance
+reconciliation_service = ReconciliationService()
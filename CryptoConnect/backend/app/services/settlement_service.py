@@ -0,0 +1,279 @@
+"""
+Settlement Service
+Ledger settlement mode for the secondary market: fills matched in our book are queued
+and, once per ledger, every signing account's pending legs are signed with consecutive
+sequence numbers and submitted together. Confirmation comes from the ledger ingestion
+mirror rather than per-trade submit_and_wait round trips.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from beanie.operators import In
+from bson import ObjectId
+from xrpl.models.transactions import Payment
+from xrpl.utils import xrp_to_drops
+from app.models.ledger_transaction import LedgerTransaction
+from app.models.property import Property
+from app.models.settlement import Settlement, SettlementLeg, SettlementLegKind, SettlementStatus
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.ledger_ingestion_service import ledger_ingestion_service
+from app.services.trust_line_service import trust_line_service
+from app.services.xrpl_service import xrpl_service
+from app.config import settings
+from app.unit_of_work import UnitOfWork
+from xrpl.wallet import Wallet
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SettlementService:
+    """Service for batched on-ledger settlement of secondary market fills"""
+
+    def __init__(self, batch_size: int = 200, ledger_window: int = 4, max_attempts: int = 3, xrp_per_aed: float = 0.0):
+        self.batch_size = batch_size
+        self.ledger_window = ledger_window
+        self.max_attempts = max_attempts
+        self.xrp_per_aed = xrp_per_aed
+        self._lock = asyncio.Lock()
+
+    def enqueue(self, buyer_order, seller_order, tokens: int, price_per_token: float,
+                buyer_tx: Transaction, seller_tx: Transaction, uow: UnitOfWork) -> Settlement:
+        """Queue a fill for settlement as part of the trade's unit of work"""
+        settlement = Settlement(
+            property_id=buyer_order.property_id,
+            buyer_id=buyer_order.user_id,
+            seller_id=seller_order.user_id,
+            buy_order_id=str(buyer_order.id),
+            sell_order_id=str(seller_order.id),
+            buyer_transaction_id=str(buyer_tx.id),
+            seller_transaction_id=str(seller_tx.id),
+            tokens=tokens,
+            price_per_token=price_per_token
+        )
+        uow.insert(settlement)
+        return settlement
+
+    async def run(self) -> Dict[str, int]:
+        """One settlement round: confirm what was submitted, then submit the next batch"""
+        if self._lock.locked():
+            return {}
+        async with self._lock:
+            confirmed = await self.confirm()
+            submitted = await self.submit_pending()
+            return {**confirmed, "submitted": submitted}
+
+    def _build_legs(self, settlement: Settlement, buyer: Dict[str, Any], seller: Dict[str, Any], property_doc: Dict[str, Any]) -> List[SettlementLeg]:
+        legs = [SettlementLeg(
+            kind=SettlementLegKind.TOKEN,
+            from_address=seller["xrpl_wallet_address"],
+            to_address=buyer["xrpl_wallet_address"],
+            currency=property_doc["token_symbol"],
+            issuer=property_doc["xrpl_issuer_address"],
+            value=str(settlement.tokens)
+        )]
+        if self.xrp_per_aed > 0:
+            legs.append(SettlementLeg(
+                kind=SettlementLegKind.XRP,
+                from_address=buyer["xrpl_wallet_address"],
+                to_address=seller["xrpl_wallet_address"],
+                currency="XRP",
+                value=xrp_to_drops(round(settlement.tokens * settlement.price_per_token * self.xrp_per_aed, 6))
+            ))
+        return legs
+
+    @staticmethod
+    def _payment(leg: SettlementLeg) -> Payment:
+        amount: Any = leg.value if leg.kind == SettlementLegKind.XRP else {
+            "currency": leg.currency, "issuer": leg.issuer, "value": leg.value
+        }
+        return Payment(account=leg.from_address, destination=leg.to_address, amount=amount)
+
+    async def submit_pending(self) -> int:
+        settlements = await Settlement.find(
+            Settlement.status == SettlementStatus.PENDING
+        ).sort(+Settlement.created_at).limit(self.batch_size).to_list()
+        if not settlements:
+            return 0
+
+        user_ids = {s.buyer_id for s in settlements} | {s.seller_id for s in settlements}
+        users = {
+            str(doc["_id"]): doc async for doc in User.get_pymongo_collection().find(
+                {"_id": {"$in": [ObjectId(uid) for uid in user_ids if ObjectId.is_valid(uid)]}},
+                {"xrpl_wallet_address": 1, "xrpl_wallet_seed": 1}
+            )
+        }
+        properties = {
+            str(doc["_id"]): doc async for doc in Property.get_pymongo_collection().find(
+                {"_id": {"$in": [ObjectId(s.property_id) for s in settlements]}},
+                {"token_symbol": 1, "xrpl_issuer_address": 1}
+            )
+        }
+
+        candidates: List[Tuple[Settlement, Dict[str, Any], Dict[str, Any], Dict[str, Any]]] = []
+        for settlement in settlements:
+            buyer, seller = users.get(settlement.buyer_id), users.get(settlement.seller_id)
+            property_doc = properties.get(settlement.property_id)
+            if not (buyer and seller and buyer.get("xrpl_wallet_seed") and seller.get("xrpl_wallet_seed")
+                    and property_doc and property_doc.get("token_symbol")):
+                settlement.status = SettlementStatus.FAILED
+                settlement.error = "Missing wallet or token details"
+                await settlement.save()
+                continue
+
+            # The buyer needs a trust line before the token leg can land. A missing one is
+            # set up in the background and the settlement waits for a later round, so no
+            # TrustSet round trip sits on the settlement path.
+            try:
+                line_ready = await trust_line_service.ready(
+                    buyer["xrpl_wallet_address"], buyer["xrpl_wallet_seed"],
+                    property_doc["token_symbol"], property_doc["xrpl_issuer_address"]
+                )
+            except Exception as e:
+                await self._retry_or_fail(settlement, f"Trust line: {e}")
+                continue
+            if line_ready:
+                candidates.append((settlement, buyer, seller, property_doc))
+
+        # Group every leg by the account that signs it, keeping trade order within an account.
+        # Accounts with a TrustSet in flight sit this round out: submit_batch would reuse the
+        # Sequence number the TrustSet holds.
+        busy = trust_line_service.busy_accounts()
+        by_account: Dict[str, List[Tuple[Settlement, SettlementLeg]]] = {}
+        seeds: Dict[str, str] = {}
+        ready: List[Settlement] = []
+        for settlement, buyer, seller, property_doc in candidates:
+            # A retried settlement keeps its legs so anything that already landed isn't paid twice
+            if not settlement.legs:
+                settlement.legs = self._build_legs(settlement, buyer, seller, property_doc)
+            # Legs still carrying a tx_hash may be in flight; confirm() clears them once expired
+            unsent = [leg for leg in settlement.legs if not leg.result and not leg.tx_hash]
+            if any(leg.from_address in busy for leg in unsent):
+                continue
+            seeds[buyer["xrpl_wallet_address"]] = buyer["xrpl_wallet_seed"]
+            seeds[seller["xrpl_wallet_address"]] = seller["xrpl_wallet_seed"]
+            for leg in unsent:
+                by_account.setdefault(leg.from_address, []).append((settlement, leg))
+            ready.append(settlement)
+
+        async def submit_account(address: str, entries: List[Tuple[Settlement, SettlementLeg]]):
+            try:
+                results = await xrpl_service.submit_batch(
+                    Wallet.from_seed(seeds[address]), [self._payment(leg) for _, leg in entries], self.ledger_window
+                )
+            except Exception as e:
+                logger.error(f"Settlement submit failed for {address}: {e}")
+                for settlement, _ in entries:
+                    settlement.error = str(e)
+                return
+            for (settlement, leg), result in zip(entries, results):
+                if result is None:
+                    settlement.error = settlement.error or "Not signed this round"
+                    continue
+                leg.tx_hash = result["tx_hash"]
+                leg.sequence = result["sequence"]
+                leg.last_ledger_sequence = result["last_ledger_sequence"]
+                leg.engine_result = result["engine_result"]
+                if result.get("error"):
+                    logger.error(f"Settlement submit failed for {address} at sequence {leg.sequence}: {result['error']}")
+                    settlement.error = result["error"]
+
+        # Different accounts have independent sequences, so their batches go out in parallel
+        await asyncio.gather(*(submit_account(address, entries) for address, entries in by_account.items()))
+
+        now = datetime.utcnow()
+        submitted = 0
+        for settlement in ready:
+            # Once any leg has gone out the settlement is SUBMITTED, even if another leg wasn't
+            # sent: confirm() waits for the sent legs to land or expire before anything is
+            # signed again, so an in-flight leg is never paid twice
+            if any(leg.tx_hash and not leg.result for leg in settlement.legs):
+                settlement.status = SettlementStatus.SUBMITTED
+                settlement.submitted_at = now
+                settlement.attempts += 1
+                submitted += 1
+                await settlement.save()
+            else:
+                await self._retry_or_fail(settlement, settlement.error or "Submit failed")
+
+        print(f"📤 Settlement batch: {submitted}/{len(settlements)} fills submitted from {len(by_account)} accounts")
+        return submitted
+
+    async def _retry_or_fail(self, settlement: Settlement, error: str):
+        settlement.attempts += 1
+        settlement.error = error
+        settlement.status = SettlementStatus.FAILED if settlement.attempts >= self.max_attempts else SettlementStatus.PENDING
+        await settlement.save()
+
+    async def confirm(self) -> Dict[str, int]:
+        """Resolve submitted settlements against the ingested ledger mirror"""
+        submitted = await Settlement.find(Settlement.status == SettlementStatus.SUBMITTED).to_list()
+        if not submitted:
+            return {"settled": 0, "failed": 0, "expired": 0}
+
+        # Pull the signing accounts' new transactions into the mirror now instead of
+        # waiting for the next ingestion poll
+        accounts = {leg.from_address for settlement in submitted for leg in settlement.legs}
+        await asyncio.gather(
+            *(ledger_ingestion_service.ingest_account(address) for address in accounts), return_exceptions=True
+        )
+        hashes = [leg.tx_hash for settlement in submitted for leg in settlement.legs if leg.tx_hash]
+        landed = {
+            tx.hash: tx for tx in await LedgerTransaction.find(In(LedgerTransaction.hash, hashes)).to_list()
+        }
+        validated_ledger = await xrpl_service.get_validated_ledger_index()
+
+        counts = {"settled": 0, "failed": 0, "expired": 0}
+        now = datetime.utcnow()
+        for settlement in submitted:
+            for leg in settlement.legs:
+                if leg.tx_hash in landed:
+                    leg.result = landed[leg.tx_hash].result
+
+            if all(leg.result == "tesSUCCESS" for leg in settlement.legs):
+                settlement.status = SettlementStatus.SETTLED
+                settlement.settled_at = now
+                settlement.error = None
+                counts["settled"] += 1
+                await self._link_transactions(settlement)
+            elif any(leg.result and leg.result != "tesSUCCESS" for leg in settlement.legs):
+                settlement.status = SettlementStatus.FAILED
+                settlement.error = ", ".join(f"{leg.kind.value}: {leg.result}" for leg in settlement.legs if leg.result)
+                counts["failed"] += 1
+            elif all(leg.result or (leg.last_ledger_sequence or 0) < validated_ledger for leg in settlement.legs):
+                # Past LastLedgerSequence the missing legs can never apply, so they are safe to
+                # sign again; legs that already landed are kept and not resubmitted
+                for leg in settlement.legs:
+                    if not leg.result:
+                        leg.tx_hash = leg.sequence = leg.last_ledger_sequence = leg.engine_result = None
+                settlement.status = SettlementStatus.PENDING if settlement.attempts < self.max_attempts else SettlementStatus.FAILED
+                settlement.error = "Expired before validation"
+                counts["expired"] += 1
+            else:
+                continue
+            await settlement.save()
+
+        if any(counts.values()):
+            print(f"✅ Settlements: {counts['settled']} settled, {counts['failed']} failed, {counts['expired']} expired")
+        return counts
+
+    async def _link_transactions(self, settlement: Settlement):
+        token_leg = next(leg for leg in settlement.legs if leg.kind == SettlementLegKind.TOKEN)
+        ids = [ObjectId(tid) for tid in (settlement.buyer_transaction_id, settlement.seller_transaction_id) if tid]
+        if ids:
+            await Transaction.get_pymongo_collection().update_many(
+                {"_id": {"$in": ids}},
+                {"$set": {"xrpl_tx_hash": token_leg.tx_hash}}
+            )
+
+    async def list_settlements(self, status: Optional[SettlementStatus] = None, limit: int = 100) -> List[Settlement]:
+        query = Settlement.find(Settlement.status == status) if status else Settlement.find()
+        return await query.sort(-Settlement.created_at).limit(limit).to_list()
+
+
+# Global settlement service instance
+settlement_service = SettlementService(
+    batch_size=settings.settlement_batch_size,
+    xrp_per_aed=settings.settlement_xrp_per_aed
+)
@@ -0,0 +1,164 @@
+"""
+Token Symbol Service
+Allocates collision-free XRPL currency codes. Symbols are reserved with an insert
+into a unique-indexed collection, and a symbol -> property map is kept in memory so
+resolving a ledger currency to its property is a dict lookup instead of a query.
+"""
+from typing import Dict, List, Optional
+from beanie.operators import In
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from app.models.property import Property
+from app.models.token_symbol import TokenSymbol
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_PREFIX = "CC"
+SYMBOL_HASH_CHARS = 10  # 40 bits of the hash per attempt; the unique index settles the rest
+MAX_ATTEMPTS = 16
+
+_HEX_CODE = re.compile(r"^[0-9A-F]{40}$")
+
+
+def to_currency_code(display_symbol: str) -> str:
+    """ASCII symbol -> 160-bit non-standard currency code (hex, zero padded)"""
+    raw = display_symbol.encode("ascii")
+    if not 3 < len(raw) <= 20:
+        raise ValueError("Non-standard currency symbols must be 4-20 ASCII characters")
+    return raw.hex().upper().ljust(40, "0")
+
+
+def from_currency_code(currency_code: str) -> str:
+    """Ledger currency code -> readable symbol (3-char standard codes pass through)"""
+    if not _HEX_CODE.match(currency_code.upper()):
+        return currency_code
+    try:
+        return bytes.fromhex(currency_code).rstrip(b"\x00").decode("ascii")
+    except (ValueError, UnicodeDecodeError):
+        return currency_code
+
+
+def is_valid_currency_code(currency_code: str) -> bool:
+    if len(currency_code) == 3:
+        return currency_code.upper() != "XRP"
+    # A leading 0x00 byte is reserved for the standard-code format
+    return bool(_HEX_CODE.match(currency_code)) and not currency_code.startswith("00")
+
+
+def candidate_symbol(property_id: str, attempt: int) -> str:
+    digest = hashlib.sha256(f"PROP{property_id}:{attempt}".encode()).hexdigest()
+    return f"{SYMBOL_PREFIX}{digest[:SYMBOL_HASH_CHARS].upper()}"
+
+
+class TokenSymbolService:
+    """Service for reserving and resolving property token symbols"""
+
+    def __init__(self):
+        self._property_by_code: Dict[str, str] = {}
+        self._code_by_property: Dict[str, str] = {}
+
+    def _remember(self, reservation: TokenSymbol):
+        self._property_by_code[reservation.currency_code] = reservation.property_id
+        self._code_by_property[reservation.property_id] = reservation.currency_code
+
+    async def load(self) -> int:
+        """Warm the in-memory map, importing legacy symbols that predate the allocator"""
+        await self.import_legacy()
+        reservations = await TokenSymbol.find_all().to_list()
+        for reservation in reservations:
+            self._remember(reservation)
+        print(f"🪙 Loaded {len(reservations)} token symbol reservations")
+        return len(reservations)
+
+    async def import_legacy(self) -> int:
+        """Reserve the symbols of properties tokenized before the allocator existed.
+
+        Colliding legacy codes can only be reserved once; the first property keeps it
+        and the rest are logged so they can be re-issued.
+        """
+        reserved = set(await TokenSymbol.get_pymongo_collection().distinct("property_id"))
+        cursor = Property.get_pymongo_collection().find(
+            {"token_symbol": {"$ne": None}}, {"token_symbol": 1}
+        ).sort("_id", 1)
+        legacy = [
+            TokenSymbol(
+                currency_code=doc["token_symbol"],
+                display_symbol=from_currency_code(doc["token_symbol"]),
+                property_id=str(doc["_id"]),
+                legacy=True
+            )
+            async for doc in cursor if str(doc["_id"]) not in reserved
+        ]
+        if not legacy:
+            return 0
+
+        try:
+            await TokenSymbol.get_pymongo_collection().insert_many(
+                [reservation.model_dump(exclude={"id", "revision_id"}) for reservation in legacy], ordered=False
+            )
+            return len(legacy)
+        except BulkWriteError as e:
+            collisions = [error["op"]["property_id"] for error in e.details.get("writeErrors", [])]
+            logger.warning(f"Legacy token symbols collide for properties {collisions}; they need new symbols")
+            return len(legacy) - len(collisions)
+
+    async def reserve(self, property_id: str) -> TokenSymbol:
+        """Atomically reserve a fresh currency code for the property (idempotent per property)"""
+        existing = await TokenSymbol.find_one(TokenSymbol.property_id == property_id)
+        if existing and not existing.legacy:
+            self._remember(existing)
+            return existing
+        if existing:
+            # A legacy 3-char code is replaced by a collision-free one
+            await existing.delete()
+            self._property_by_code.pop(existing.currency_code, None)
+
+        for attempt in range(MAX_ATTEMPTS):
+            display_symbol = candidate_symbol(property_id, attempt)
+            reservation = TokenSymbol(
+                currency_code=to_currency_code(display_symbol),
+                display_symbol=display_symbol,
+                property_id=property_id
+            )
+            try:
+                await reservation.insert()
+            except DuplicateKeyError:
+                # Either another property owns this code (try the next one) or a concurrent
+                # call reserved one for this property first (use theirs)
+                winner = await TokenSymbol.find_one(TokenSymbol.property_id == property_id)
+                if winner:
+                    self._remember(winner)
+                    return winner
+                continue
+            self._remember(reservation)
+            return reservation
+
+        raise Exception(f"Could not reserve a token symbol for property {property_id}")
+
+    async def resolve(self, currency_code: str) -> Optional[str]:
+        """property_id for a ledger currency code; memory first, the collection on a miss"""
+        property_id = self._property_by_code.get(currency_code)
+        if property_id:
+            return property_id
+        # Reserved by another worker since we loaded
+        reservation = await TokenSymbol.find_one(TokenSymbol.currency_code == currency_code)
+        if reservation:
+            self._remember(reservation)
+            return reservation.property_id
+        return None
+
+    async def resolve_many(self, currency_codes: List[str]) -> Dict[str, str]:
+        """currency_code -> property_id for every known code, with at most one query for misses"""
+        result = {code: self._property_by_code[code] for code in currency_codes if code in self._property_by_code}
+        misses = list(set(currency_codes) - result.keys())
+        if misses:
+            for reservation in await TokenSymbol.find(In(TokenSymbol.currency_code, misses)).to_list():
+                self._remember(reservation)
+                result[reservation.currency_code] = reservation.property_id
+        return result
+
+
+# Global token symbol allocator instance
+token_symbol_service = TokenSymbolService()
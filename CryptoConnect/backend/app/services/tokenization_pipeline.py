@@ -0,0 +1,184 @@
+"""
+Tokenization Pipeline
+Batch onboarding: a job of property IDs is tokenized by a bounded worker pool behind
+one shared XRPL health check, and every property update lands in a single bulk_write of
+guarded updates
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from beanie.operators import In
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from app.models.property import Property, PropertyStatus
+from app.models.tokenization_job import (
+    TokenizationJob, TokenizationJobStatus, TokenizationOutcome, TokenizationResult
+)
+from app.services.tokenization_service import tokenization_service
+from app.services.trust_line_service import trust_line_service
+from app.services.xrpl_service import xrpl_service
+from app.config import settings
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenizationPipeline:
+    """Service for queued, concurrent batch tokenization"""
+
+    def __init__(self, concurrency: int = 16, stale_after_seconds: int = 1800):
+        self.concurrency = concurrency
+        self.stale_after_seconds = stale_after_seconds
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, property_ids: List[str], requested_by: Optional[str] = None, require_approved: bool = True) -> TokenizationJob:
+        """Queue a batch and start it in the background; the job id is the tracking handle"""
+        job = TokenizationJob(
+            property_ids=list(dict.fromkeys(property_ids)),
+            requested_by=requested_by,
+            require_approved=require_approved
+        )
+        await job.insert()
+        task = asyncio.create_task(self.process(str(job.id)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def drain(self):
+        """Wait for jobs started in this process (shutdown); anything unfinished is resumed from Mongo later"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def get_job(self, job_id: str) -> Optional[TokenizationJob]:
+        if not ObjectId.is_valid(job_id):
+            return None
+        return await TokenizationJob.get(job_id)
+
+    async def _claim(self, job_id: str) -> Optional[TokenizationJob]:
+        """queued -> running, atomically, so a job is never processed twice"""
+        doc = await TokenizationJob.get_pymongo_collection().find_one_and_update(
+            {"_id": ObjectId(job_id), "status": TokenizationJobStatus.QUEUED.value},
+            {"$set": {"status": TokenizationJobStatus.RUNNING.value, "started_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        return TokenizationJob.model_validate(doc) if doc else None
+
+    async def process(self, job_id: str):
+        job = await self._claim(job_id)
+        if job is None:
+            return
+
+        try:
+            await self._run(job)
+        except Exception as e:
+            logger.error(f"Tokenization job {job_id} failed: {e}")
+            job.status = TokenizationJobStatus.FAILED
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        await job.save()
+
+    async def _run(self, job: TokenizationJob):
+        object_ids = [ObjectId(pid) for pid in job.property_ids if ObjectId.is_valid(pid)]
+        properties = {
+            str(p.id): p for p in await Property.find(In(Property.id, object_ids)).to_list()
+        }
+
+        results: Dict[str, TokenizationResult] = {}
+        eligible: List[Property] = []
+        for property_id in job.property_ids:
+            property_obj = properties.get(property_id)
+            if property_obj is None:
+                results[property_id] = TokenizationResult(property_id=property_id, outcome=TokenizationOutcome.FAILED, error="Property not found")
+            elif property_obj.xrpl_token_created:
+                results[property_id] = TokenizationResult(property_id=property_id, outcome=TokenizationOutcome.SKIPPED, token_symbol=property_obj.token_symbol, error="Already tokenized")
+            elif job.require_approved and property_obj.status != PropertyStatus.APPROVED:
+                results[property_id] = TokenizationResult(property_id=property_id, outcome=TokenizationOutcome.SKIPPED, error=f"Property is {property_obj.status.value}, not approved")
+            else:
+                eligible.append(property_obj)
+
+        tokenized: List[Property] = []
+        if eligible:
+            print(f"🏭 Tokenization job {job.id}: {len(eligible)} properties, concurrency {self.concurrency}")
+            # One health check for the whole batch; if the node is down nothing is touched
+            await xrpl_service.check_connection()
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def prepare(property_obj: Property):
+                async with semaphore:
+                    try:
+                        return property_obj, await tokenization_service.prepare_tokenization(property_obj, check_connection=False), None
+                    except Exception as e:
+                        return property_obj, None, str(e)
+
+            prepared = await asyncio.gather(*(prepare(p) for p in eligible))
+
+            # Millisecond precision, as Mongo stores it, so the stamp can be read back exactly
+            now = datetime.utcnow()
+            now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+            ready = []
+            for property_obj, fields, error in prepared:
+                if fields is None:
+                    property_id = str(property_obj.id)
+                    results[property_id] = TokenizationResult(property_id=property_id, outcome=TokenizationOutcome.FAILED, error=error)
+                else:
+                    ready.append((property_obj, fields))
+
+            # Guarded per property so one that another job tokenized meanwhile is reported as
+            # skipped rather than tokenized (its symbol reservation and issuer are the same,
+            # since both are idempotent per property)
+            collection = Property.get_pymongo_collection()
+            applied = set()
+            if ready:
+                outcome = await collection.bulk_write([
+                    UpdateOne(
+                        {"_id": property_obj.id, "xrpl_token_created": {"$ne": True}},
+                        {"$set": {**fields, "updated_at": now}}
+                    )
+                    for property_obj, fields in ready
+                ], ordered=False)
+                if outcome.matched_count == len(ready):
+                    applied = {property_obj.id for property_obj, _ in ready}
+                else:
+                    # Some guards missed; the properties this write landed on carry its stamp
+                    applied = {
+                        doc["_id"] async for doc in collection.find(
+                            {"_id": {"$in": [property_obj.id for property_obj, _ in ready]}, "updated_at": now},
+                            {"_id": 1}
+                        )
+                    }
+            for property_obj, fields in ready:
+                property_id = str(property_obj.id)
+                if property_obj.id not in applied:
+                    results[property_id] = TokenizationResult(property_id=property_id, outcome=TokenizationOutcome.SKIPPED, token_symbol=fields["token_symbol"], error="Tokenized concurrently by another job")
+                    continue
+                for field, value in fields.items():
+                    setattr(property_obj, field, value)
+                tokenized.append(property_obj)
+                results[property_id] = TokenizationResult(property_id=property_id, outcome=TokenizationOutcome.TOKENIZED, token_symbol=fields["token_symbol"])
+
+        job.results = [results[pid] for pid in job.property_ids]
+        job.tokenized = sum(1 for r in job.results if r.outcome == TokenizationOutcome.TOKENIZED)
+        job.skipped = sum(1 for r in job.results if r.outcome == TokenizationOutcome.SKIPPED)
+        job.failed = sum(1 for r in job.results if r.outcome == TokenizationOutcome.FAILED)
+        job.status = TokenizationJobStatus.COMPLETED
+        print(f"✅ Tokenization job {job.id}: {job.tokenized} tokenized, {job.skipped} skipped, {job.failed} failed")
+
+        if tokenized:
+            trust_line_service.schedule_pre_establish(*tokenized)
+
+    async def resume_pending(self) -> int:
+        """Pick up queued jobs (e.g. after a restart) and requeue ones stuck in running"""
+        stale = datetime.utcnow() - timedelta(seconds=self.stale_after_seconds)
+        await TokenizationJob.get_pymongo_collection().update_many(
+            {"status": TokenizationJobStatus.RUNNING.value, "started_at": {"$lt": stale}},
+            {"$set": {"status": TokenizationJobStatus.QUEUED.value}}
+        )
+        queued = await TokenizationJob.find(TokenizationJob.status == TokenizationJobStatus.QUEUED).to_list()
+        for job in queued:
+            await self.process(str(job.id))
+        return len(queued)
+
+
+# Global tokenization pipeline instance
+tokenization_pipeline = TokenizationPipeline(concurrency=settings.tokenization_concurrency)
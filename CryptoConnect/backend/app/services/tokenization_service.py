@@ -1,79 +1,100 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 from app.models.property import Property
 from app.models.transaction import Transaction, TransactionType, TransactionStatus
 from app.models.user import User
 from app.services.xrpl_service import xrpl_service
+from app.services.wallet_pool_service import wallet_pool_service
+from app.services.trust_line_service import trust_line_service
+from app.services.token_symbol_service import token_symbol_service
+from app.services.market_events import market_events
+from app.services.portfolio_service import portfolio_service
+from app.services.ledger_service import ledger_service
+from app.services.analytics_service import ownership_fractions, income_shares
+from datetime import datetime
+from pymongo import ReturnDocument
 import asyncio
 
 
 class TokenizationService:
     
+    async def prepare_tokenization(self, property_obj: Property, check_connection: bool = True) -> Dict[str, Any]:
+        """Create the token on XRPL and return the property fields to set; nothing is saved"""
+        # Check if xrpl_service is properly initialized
+        if not xrpl_service.issuer_wallet:
+            print("❌ XRPL issuer wallet not configured!")
+            raise Exception("XRPL issuer wallet not configured. Please check your .env file.")
+        
+        # Reserve a collision-free 160-bit currency code
+        reservation = await token_symbol_service.reserve(str(property_obj.id))
+        token_symbol = reservation.currency_code
+        
+        print(f"🪙 Reserved token symbol: {reservation.display_symbol} ({token_symbol})")
+        
+        # Calculate total supply based on formula: N = S * 10,000
+        total_supply = str(property_obj.total_tokens)
+        
+        # Shard issuance across the issuer pool; the choice is stored on the property
+        issuer = xrpl_service.assign_issuer(str(property_obj.id))
+        
+        # Create real token on XRPL
+        try:
+            token_creation_result = await xrpl_service.create_token(
+                token_symbol=token_symbol,
+                total_supply=total_supply,
+                property_id=str(property_obj.id),
+                property_title=property_obj.title,
+                check_connection=check_connection,
+                issuer_address=issuer.address
+            )
+            
+            if token_creation_result:
+                print(f"✅ Token created successfully: {token_symbol}")
+                issuer_address = token_creation_result["issuer_address"]
+                tx_hash = token_creation_result["tx_hash"]
+                explorer_url = token_creation_result["explorer_url"]
+            else:
+                raise Exception("Token creation failed")
+                
+        except Exception as e:
+            print(f"❌ Real XRPL token creation failed: {str(e)}")
+            print("🔄 Falling back to mock token...")
+            # Fallback to mock: no setup transaction, but the property keeps its assigned pool
+            # issuer so trust lines and transfers later sign with the wallet that issues it
+            issuer_address = issuer.address
+            tx_hash = f"MOCK_TX_{token_symbol}_{total_supply}"
+            explorer_url = f"https://testnet.xrpl.org/accounts/{issuer_address}"
+        
+        return {
+            "token_symbol": token_symbol,
+            "token_display_symbol": reservation.display_symbol,
+            "xrpl_token_created": True,
+            "xrpl_issuer_address": issuer_address,
+            "xrpl_creation_tx_hash": tx_hash,
+            "xrpl_explorer_url": explorer_url,
+            "status": "tokenized"
+        }
+    
     async def tokenize_property(self, property_obj: Property) -> bool:
         """Tokenize a property by creating tokens on XRPL"""
         try:
             print(f"🔧 Starting tokenization for property: {property_obj.title}")
             
-            # Check if xrpl_service is properly initialized
-            if not xrpl_service.issuer_wallet:
-                print("❌ XRPL issuer wallet not configured!")
-                raise Exception("XRPL issuer wallet not configured. Please check your .env file.")
-            
-            print(f"✅ Issuer wallet configured: {xrpl_service.issuer_wallet.address}")
-            
-            # Generate token symbol (3 characters for standard format)
-            import hashlib
-            hash_object = hashlib.md5(f"PROP{str(property_obj.id)}".encode())
-            token_symbol = hash_object.hexdigest()[:3].upper()
-            
-            print(f"🪙 Generated token symbol: {token_symbol}")
-            
-            # Calculate total supply based on formula: N = S * 10,000
-            total_supply = str(property_obj.total_tokens)
-            print(f"💰 Total supply: {total_supply} tokens")
-            
-            # For now, create mock tokenization (XRPL service has async issues)
-            print(f"🚀 Creating mock token (XRPL integration temporarily simplified)...")
-            
-            # Create real token on XRPL
-            try:
-                token_creation_result = await xrpl_service.create_token(
-                    token_symbol=token_symbol,
-                    total_supply=total_supply,
-                    property_id=str(property_obj.id),
-                    property_title=property_obj.title
-                )
-                
-                if token_creation_result:
-                    print(f"✅ Token created successfully: {token_symbol}")
-                    issuer_address = token_creation_result["issuer_address"]
-                    tx_hash = token_creation_result["tx_hash"]
-                    explorer_url = token_creation_result["explorer_url"]
-                else:
-                    raise Exception("Token creation failed")
-                    
-            except Exception as e:
-                print(f"❌ Real XRPL token creation failed: {str(e)}")
-                print("🔄 Falling back to mock token...")
-                # Fallback to mock
-                issuer_address = "rN7n7otQDd6FczFgLdSqtcsAUxDkw6fzRH"
-                tx_hash = f"MOCK_TX_{token_symbol}_{total_supply}"
-                explorer_url = f"https://testnet.xrpl.org/accounts/{issuer_address}"
+            fields = await self.prepare_tokenization(property_obj)
             
             # Update property with tokenization details
-            property_obj.token_symbol = token_symbol
-            property_obj.xrpl_token_created = True
-            property_obj.xrpl_issuer_address = issuer_address
-            property_obj.xrpl_creation_tx_hash = tx_hash
-            property_obj.xrpl_explorer_url = explorer_url
-            property_obj.status = "tokenized"
+            for field, value in fields.items():
+                setattr(property_obj, field, value)
             
             await property_obj.save()
             
             print(f"✅ Property {property_obj.title} tokenized successfully!")
-            print(f"🔗 Token Symbol: {token_symbol}")
+            print(f"🔗 Token Symbol: {property_obj.token_symbol}")
             print(f"🔗 Explorer URL: {property_obj.xrpl_explorer_url}")
-            print(f"🔗 Issuer Address: {issuer_address}")
-            print(f"💰 Total Supply: {total_supply} tokens")
+            print(f"🔗 Issuer Address: {property_obj.xrpl_issuer_address}")
+            print(f"💰 Total Supply: {property_obj.total_tokens} tokens")
+            
+            # Open trust lines for likely buyers now so their first purchase skips the TrustSet
+            trust_line_service.schedule_pre_establish(property_obj)
             
             return True
             
@@ -86,26 +107,22 @@ class TokenizationService:
     
     async def process_investment(self, user: User, property_obj: Property, tokens_to_purchase: int, investment_amount: float, investment_amount_xrp: float) -> Optional[Transaction]:
         """Process an investment by transferring tokens to user"""
+        reserved = False
+        token_transfer_tx = None
         try:
             # Validate investment
             if tokens_to_purchase <= 0:
                 raise ValueError("Invalid token amount")
             
-            if property_obj.tokens_sold + tokens_to_purchase > property_obj.total_tokens:
-                raise ValueError("Not enough tokens available")
-            
             if not property_obj.xrpl_token_created:
                 raise ValueError("Property not tokenized yet")
             
-            # Ensure user has XRPL wallet
+            # Ensure user has XRPL wallet (claimed from the pre-funded pool when possible)
             if not user.xrpl_wallet_address or not user.xrpl_wallet_seed:
-                print(f"🔧 User {user.username} doesn't have XRPL wallet. Creating one...")
+                print(f"🔧 User {user.username} doesn't have XRPL wallet. Claiming one...")
                 try:
-                    wallet_data = await xrpl_service.create_wallet()
-                    user.xrpl_wallet_address = wallet_data["address"]
-                    user.xrpl_wallet_seed = wallet_data["seed"]
-                    await user.save()
-                    print(f"✅ Created XRPL wallet for user: {wallet_data['address']}")
+                    await wallet_pool_service.ensure_wallet(user)
+                    print(f"✅ Assigned XRPL wallet to user: {user.xrpl_wallet_address}")
                 except Exception as e:
                     print(f"❌ Failed to create wallet for user: {str(e)}")
                     raise ValueError(f"Failed to create user wallet: {str(e)}")
@@ -117,15 +134,32 @@ class TokenizationService:
 
             print("🚀 Starting investment processing...")
             
-            # STEP 1: Create trust line FIRST (before any payments)
-            print(f"🔗 Step 1: Creating trust line for token {property_obj.token_symbol}")
+            # Reserve the supply before anything touches the ledger, so a purchase that loses
+            # the race for the last tokens never sends any
+            reservation = await Property.get_pymongo_collection().find_one_and_update(
+                {"_id": property_obj.id, "tokens_sold": {"$lte": property_obj.total_tokens - tokens_to_purchase}},
+                {"$inc": {"tokens_sold": tokens_to_purchase}, "$set": {"updated_at": datetime.utcnow()}},
+                projection={"tokens_sold": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if not reservation:
+                raise ValueError("Not enough tokens available")
+            reserved = True
+            property_obj.tokens_sold = reservation["tokens_sold"]
+            
+            # STEP 1: Make sure the trust line exists (usually pre-established at tokenization)
+            print(f"🔗 Step 1: Ensuring trust line for token {property_obj.token_symbol}")
             trust_line_tx = None
             try:
-                trust_line_tx = await xrpl_service.create_trust_line(
-                    user_wallet_seed=user.xrpl_wallet_seed,
-                    token_symbol=property_obj.token_symbol
+                trust_line_tx = await trust_line_service.ensure(
+                    wallet_address=user.xrpl_wallet_address,
+                    wallet_seed=user.xrpl_wallet_seed,
+                    currency=property_obj.token_symbol,
+                    issuer_address=property_obj.xrpl_issuer_address
                 )
-                if trust_line_tx:
+                if trust_line_tx == "EXISTS":
+                    print("✅ Trust line already in place")
+                elif trust_line_tx:
                     print(f"✅ Trust line created: {trust_line_tx}")
                 else:
                     print("⚠️ Trust line creation issue, continuing...")
@@ -136,18 +170,21 @@ class TokenizationService:
 
             # STEP 2: Transfer tokens to user FIRST (ensures user gets tokens)
             print(f"🪙 Step 2: Transferring {tokens_to_purchase} tokens to user")
-            token_transfer_tx = None
             try:
                 token_transfer_tx = await xrpl_service.transfer_tokens(
                     to_address=user.xrpl_wallet_address,
                     token_symbol=property_obj.token_symbol,
-                    amount=str(tokens_to_purchase)
+                    amount=str(tokens_to_purchase),
+                    issuer_address=property_obj.xrpl_issuer_address
                 )
                 if not token_transfer_tx:
                     raise Exception("Token transfer returned None")
                 print(f"✅ Tokens transferred successfully: {token_transfer_tx}")
             except Exception as e:
                 print(f"❌ Token transfer failed: {str(e)}")
+                if "tecPATH_DRY" in str(e) or "tecNO_LINE" in str(e):
+                    # Our trust line record was stale; the next attempt will submit a fresh TrustSet
+                    await trust_line_service.forget(user.xrpl_wallet_address, property_obj.token_symbol, property_obj.xrpl_issuer_address)
                 raise Exception(f"Token transfer failed: {str(e)}")
 
             # STEP 3: Send XRP payment to seller (after tokens are secured)
@@ -168,12 +205,8 @@ class TokenizationService:
                 print(f"⚠️ XRP payment error: {e}")
                 print("🔄 Continuing since tokens were transferred successfully")
 
-            # STEP 4: Update property and create transaction record
-            print("📝 Step 4: Creating transaction record and updating property")
-            
-            # Update property token count
-            property_obj.tokens_sold += tokens_to_purchase
-            await property_obj.save()
+            # STEP 4: Create transaction record (tokens_sold was taken by the reservation)
+            print("📝 Step 4: Creating transaction record")
             
             # Create transaction record with the token transfer as primary hash
             transaction = Transaction(
@@ -197,7 +230,14 @@ class TokenizationService:
                 }
             )
             
-            await transaction.save()
+            await transaction.insert()
+            
+            # The investment is committed; a failed snapshot update must not report it as failed
+            try:
+                await portfolio_service.record_purchase(str(user.id), property_obj, tokens_to_purchase, investment_amount)
+            except Exception as e:
+                print(f"⚠️ Portfolio update failed after investment {transaction.id}: {e}")
+            market_events.publish_property(property_obj)
             
             print("✅ Investment completed successfully!")
             print(f"   🪙 Tokens transferred: {tokens_to_purchase} {property_obj.token_symbol}")
@@ -206,13 +246,16 @@ class TokenizationService:
             
             return transaction
             
-        except Exception as e:
-            await property_obj.save()
-            
-            return transaction
-            
         except Exception as e:
             print(f"Investment processing failed: {str(e)}")
+            # Tokens that never left the issuer go back on sale; once they have moved the
+            # reservation stands, as the user holds them
+            if reserved and not token_transfer_tx:
+                await Property.get_pymongo_collection().update_one(
+                    {"_id": property_obj.id},
+                    {"$inc": {"tokens_sold": -tokens_to_purchase}, "$set": {"updated_at": datetime.utcnow()}}
+                )
+                property_obj.tokens_sold -= tokens_to_purchase
             # Create failed transaction record
             transaction = Transaction(
                 transaction_type=TransactionType.TOKEN_PURCHASE,
@@ -229,54 +272,45 @@ class TokenizationService:
     
     async def calculate_ownership_fraction(self, tokens_owned: int, total_tokens: int) -> float:
         """Calculate ownership fraction: F = k / N"""
-        if total_tokens == 0:
-            return 0.0
-        return tokens_owned / total_tokens
+        return float(ownership_fractions([tokens_owned], [total_tokens])[0])
     
     async def calculate_rental_income_share(self, tokens_owned: int, total_tokens: int, total_rental_income: float) -> float:
         """Calculate rental income share: I = (k / N) * R"""
-        ownership_fraction = await self.calculate_ownership_fraction(tokens_owned, total_tokens)
-        return ownership_fraction * total_rental_income
+        return float(income_shares([tokens_owned], [total_tokens], total_rental_income)[0])
     
     async def distribute_rental_income(self, property_obj: Property, total_rental_income: float) -> bool:
         """Distribute rental income to all token holders"""
         try:
-            # Get all transactions for this property to find token holders
-            transactions = await Transaction.find(
-                Transaction.property_id == str(property_obj.id),
-                Transaction.transaction_type == TransactionType.TOKEN_PURCHASE,
-                Transaction.status == TransactionStatus.COMPLETED
-            ).to_list()
+            # Current holders from the ledger projection (includes secondary market trades and transfers)
+            user_holdings = await ledger_service.get_property_holders(str(property_obj.id))
             
-            # Calculate holdings per user
-            user_holdings = {}
-            for tx in transactions:
-                if tx.user_id not in user_holdings:
-                    user_holdings[tx.user_id] = 0
-                user_holdings[tx.user_id] += tx.tokens
+            # Distribute income: every holder's share in one vectorized pass, one bulk insert
+            holder_ids = list(user_holdings.keys())
+            tokens_owned = [user_holdings[user_id] for user_id in holder_ids]
+            shares = income_shares(tokens_owned, [property_obj.total_tokens] * len(holder_ids), total_rental_income)
+            fractions = ownership_fractions(tokens_owned, [property_obj.total_tokens] * len(holder_ids))
             
-            # Distribute income
-            for user_id, tokens_owned in user_holdings.items():
-                income_share = await self.calculate_rental_income_share(
-                    tokens_owned, property_obj.total_tokens, total_rental_income
-                )
-                
-                # Create income distribution transaction
-                distribution_tx = Transaction(
+            distribution_txs = [
+                Transaction(
                     transaction_type=TransactionType.RENTAL_DISTRIBUTION,
                     status=TransactionStatus.COMPLETED,
                     user_id=user_id,
                     property_id=str(property_obj.id),
-                    amount=income_share,
-                    tokens=tokens_owned,
+                    amount=float(shares[i]),
+                    tokens=tokens_owned[i],
                     token_price=0,  # Not applicable for distributions
                     metadata={
                         "total_rental_income": total_rental_income,
-                        "ownership_percentage": (tokens_owned / property_obj.total_tokens) * 100
+                        "ownership_percentage": float(fractions[i]) * 100
                     }
                 )
-                
-                await distribution_tx.save()
+                for i, user_id in enumerate(holder_ids)
+            ]
+            if distribution_txs:
+                await Transaction.insert_many(distribution_txs)
+            
+            for i, user_id in enumerate(holder_ids):
+                await portfolio_service.record_distribution(user_id, float(shares[i]))
             
             return True
             
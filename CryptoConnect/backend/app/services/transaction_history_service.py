@@ -0,0 +1,181 @@
+"""
+Transaction History Service
+Keyset-paginated history reads and constant-memory exports straight from a Mongo cursor
+"""
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.models.transaction import Transaction
+import base64
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = [
+    "id",
+    "transaction_type",
+    "status",
+    "property_id",
+    "amount",
+    "tokens",
+    "token_price",
+    "xrpl_tx_hash",
+    "created_at",
+    "completed_at"
+]
+
+HISTORY_PROJECTION = {
+    "transaction_type": 1,
+    "status": 1,
+    "user_id": 1,
+    "property_id": 1,
+    "amount": 1,
+    "tokens": 1,
+    "token_price": 1,
+    "xrpl_tx_hash": 1,
+    "created_at": 1,
+    "completed_at": 1
+}
+
+# Newest first; _id breaks ties between rows written in the same millisecond
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(created_at: datetime, doc_id: ObjectId) -> str:
+    """Opaque cursor pointing at the last row of a page"""
+    raw = json.dumps({"t": created_at.isoformat(), "id": str(doc_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(data["t"]), ObjectId(data["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def serialize_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Raw transaction document to the API/export shape"""
+    created_at = doc.get("created_at")
+    completed_at = doc.get("completed_at")
+    return {
+        "id": str(doc["_id"]),
+        "transaction_type": doc.get("transaction_type"),
+        "status": doc.get("status"),
+        "user_id": doc.get("user_id"),
+        "property_id": doc.get("property_id"),
+        "amount": doc.get("amount"),
+        "tokens": doc.get("tokens"),
+        "token_price": doc.get("token_price"),
+        "xrpl_tx_hash": doc.get("xrpl_tx_hash"),
+        "created_at": created_at.isoformat() if created_at else None,
+        "completed_at": completed_at.isoformat() if completed_at else None
+    }
+
+
+class TransactionHistoryService:
+    """Service for reading a user's transaction history without materialising all of it"""
+
+    def __init__(self, export_batch_size: int = 1000):
+        self.export_batch_size = export_batch_size
+
+    def build_filter(
+        self,
+        user_id: str,
+        transaction_types: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        query: Dict[str, Any] = {"user_id": user_id}
+        if transaction_types:
+            query["transaction_type"] = {"$in": transaction_types}
+
+        created_at: Dict[str, Any] = {}
+        if start:
+            created_at["$gte"] = start
+        if end:
+            created_at["$lt"] = end
+        if created_at:
+            query["created_at"] = created_at
+
+        if cursor:
+            last_created_at, last_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": last_created_at}},
+                {"created_at": last_created_at, "_id": {"$lt": last_id}}
+            ]
+        return query
+
+    async def get_page(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        transaction_types: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """One page of history, newest first, plus the cursor for the next page (None at the end)"""
+        query = self.build_filter(user_id, transaction_types, start, end, cursor)
+        collection = Transaction.get_pymongo_collection()
+
+        # Fetch one extra row to know whether another page exists
+        docs = await collection.find(query, HISTORY_PROJECTION).sort(HISTORY_SORT).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+
+        next_cursor = None
+        if has_more and docs:
+            last = docs[-1]
+            next_cursor = encode_cursor(last["created_at"], last["_id"])
+
+        return {
+            "items": [serialize_row(doc) for doc in docs],
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }
+
+    async def iter_rows(
+        self,
+        user_id: str,
+        transaction_types: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Every matching row, newest first, read in cursor batches"""
+        query = self.build_filter(user_id, transaction_types, start, end)
+        cursor = Transaction.get_pymongo_collection().find(
+            query, HISTORY_PROJECTION, batch_size=self.export_batch_size
+        ).sort(HISTORY_SORT)
+        async for doc in cursor:
+            yield serialize_row(doc)
+
+    async def export_ndjson(self, rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+        async for row in rows:
+            yield json.dumps(row) + "\n"
+
+    async def export_csv(self, rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        async for row in rows:
+            writer.writerow(row)
+            # Flush roughly every 64KB so memory stays flat regardless of history size
+            if buffer.tell() >= 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+# Global transaction history service instance
+transaction_history_service = TransactionHistoryService()
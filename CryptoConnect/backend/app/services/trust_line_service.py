@@ -0,0 +1,226 @@
+"""
+Trust Line Service
+Remembers which (wallet, currency, issuer) trust lines exist so investments skip
+redundant TrustSet submissions, and pre-establishes lines for likely buyers in
+parallel as soon as a property is tokenized
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from app.models.property import Property
+from app.models.trust_line import TrustLine, TrustLineStatus
+from app.models.user import User, UserRole
+from app.services.xrpl_service import xrpl_service
+from app.config import settings
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (wallet_address, currency, issuer_address)
+LineKey = Tuple[str, str, str]
+
+
+class TrustLineService:
+    """Service for tracking and creating user -> issuer trust lines"""
+
+    def __init__(self, concurrency: int = 8, prewarm_limit: int = 500):
+        self.concurrency = concurrency
+        self.prewarm_limit = prewarm_limit
+        self._established: Set[LineKey] = set()
+        self._inflight: Dict[LineKey, asyncio.Task] = {}
+        self._failures: Dict[LineKey, str] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._prewarm_lock = asyncio.Lock()
+
+    def _issuer(self, issuer_address: Optional[str] = None) -> str:
+        """The pool issuer a TrustSet for this address will actually point at"""
+        return xrpl_service.get_issuer_wallet(issuer_address).address
+
+    async def is_established(self, key: LineKey) -> bool:
+        if key in self._established:
+            return True
+        wallet_address, currency, issuer_address = key
+        line = await TrustLine.find_one(
+            TrustLine.wallet_address == wallet_address,
+            TrustLine.currency == currency,
+            TrustLine.issuer_address == issuer_address,
+            TrustLine.status == TrustLineStatus.ESTABLISHED
+        )
+        if line:
+            self._established.add(key)
+        return line is not None
+
+    async def _established_among(self, addresses: List[str], currency: str, issuer_address: str) -> Set[str]:
+        """Which of `addresses` already hold a line for the currency, in one query"""
+        known = {address for address in addresses if (address, currency, issuer_address) in self._established}
+        remaining = [address for address in addresses if address not in known]
+        if remaining:
+            cursor = TrustLine.get_pymongo_collection().find(
+                {
+                    "wallet_address": {"$in": remaining},
+                    "currency": currency,
+                    "issuer_address": issuer_address,
+                    "status": TrustLineStatus.ESTABLISHED.value
+                },
+                {"wallet_address": 1}
+            )
+            async for doc in cursor:
+                known.add(doc["wallet_address"])
+                self._established.add((doc["wallet_address"], currency, issuer_address))
+        return known
+
+    async def _record(self, key: LineKey, status: TrustLineStatus, tx_hash: Optional[str] = None, error: Optional[str] = None):
+        wallet_address, currency, issuer_address = key
+        now = datetime.utcnow()
+        await TrustLine.get_pymongo_collection().update_one(
+            {"wallet_address": wallet_address, "currency": currency, "issuer_address": issuer_address},
+            {
+                "$set": {"status": status.value, "tx_hash": tx_hash, "error": error, "updated_at": now},
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
+
+    async def _submit(self, key: LineKey, wallet_seed: str) -> str:
+        try:
+            tx_hash = await xrpl_service.create_trust_line(
+                user_wallet_seed=wallet_seed, token_symbol=key[1], issuer_address=key[2]
+            )
+        except Exception as e:
+            self._failures[key] = str(e)
+            await self._record(key, TrustLineStatus.FAILED, error=str(e))
+            raise
+        self._failures.pop(key, None)
+        await self._record(key, TrustLineStatus.ESTABLISHED, tx_hash=None if tx_hash == "EXISTS" else tx_hash)
+        self._established.add(key)
+        return tx_hash
+
+    def _start(self, key: LineKey, wallet_seed: str) -> asyncio.Task:
+        """The line's in-flight TrustSet, starting one if there is none"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._submit(key, wallet_seed))
+            self._inflight[key] = task
+
+            def done(finished: asyncio.Task):
+                self._inflight.pop(key, None)
+                if not finished.cancelled():
+                    finished.exception()  # Kept in _failures; don't warn about background tasks
+            task.add_done_callback(done)
+        return task
+
+    async def ensure(self, wallet_address: str, wallet_seed: str, currency: str, issuer_address: Optional[str] = None) -> str:
+        """Make sure the wallet trusts the issuer for `currency`.
+
+        Returns the TrustSet hash, or "EXISTS" when the line was already known. Concurrent
+        calls for the same line share one submission.
+        """
+        key = (wallet_address, currency, self._issuer(issuer_address))
+        if await self.is_established(key):
+            return "EXISTS"
+
+        return await asyncio.shield(self._start(key, wallet_seed))
+
+    async def ready(self, wallet_address: str, wallet_seed: str, currency: str, issuer_address: Optional[str] = None) -> bool:
+        """Non-blocking ensure: True when the line exists, otherwise start its TrustSet in the
+        background and return False. A TrustSet that failed since the last call is raised
+        once, so callers can count it as an attempt."""
+        key = (wallet_address, currency, self._issuer(issuer_address))
+        if await self.is_established(key):
+            return True
+        error = self._failures.pop(key, None) if key not in self._inflight else None
+        if error:
+            raise Exception(error)
+        self._start(key, wallet_seed)
+        return False
+
+    def busy_accounts(self) -> Set[str]:
+        """Wallets with a TrustSet in flight; their next Sequence number is already taken"""
+        return {key[0] for key in self._inflight}
+
+    async def forget(self, wallet_address: str, currency: str, issuer_address: Optional[str] = None):
+        """Drop a line we believed existed (e.g. a payment came back tecPATH_DRY)"""
+        key = (wallet_address, currency, self._issuer(issuer_address))
+        self._established.discard(key)
+        await TrustLine.get_pymongo_collection().delete_one(
+            {"wallet_address": key[0], "currency": key[1], "issuer_address": key[2]}
+        )
+
+    async def pre_establish(self, property_obj: Property, user_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """Create the property's trust line for likely buyers in parallel.
+
+        Defaults to the most recent KYC-verified investors with wallets (up to
+        prewarm_limit); pass user_ids to target specific users instead.
+        """
+        if not property_obj.token_symbol:
+            return {"candidates": 0, "created": 0, "skipped": 0, "failed": 0}
+
+        currency = property_obj.token_symbol
+        issuer_address = self._issuer(property_obj.xrpl_issuer_address)
+        query = {"xrpl_wallet_address": {"$ne": None}, "xrpl_wallet_seed": {"$ne": None}}
+        if user_ids:
+            query["_id"] = {"$in": [ObjectId(uid) for uid in user_ids if ObjectId.is_valid(uid)]}
+        else:
+            query.update({"role": UserRole.INVESTOR.value, "is_kyc_verified": True, "is_active": True})
+        candidates = await User.get_pymongo_collection().find(
+            query, {"xrpl_wallet_address": 1, "xrpl_wallet_seed": 1}
+        ).sort("created_at", -1).limit(self.prewarm_limit).to_list(length=None)
+
+        existing = await self._established_among(
+            [doc["xrpl_wallet_address"] for doc in candidates], currency, issuer_address
+        )
+        pending = [doc for doc in candidates if doc["xrpl_wallet_address"] not in existing]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def establish(doc) -> bool:
+            async with semaphore:
+                try:
+                    await self.ensure(doc["xrpl_wallet_address"], doc["xrpl_wallet_seed"], currency, issuer_address)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Trust line pre-establishment failed for {doc['xrpl_wallet_address']}: {e}")
+                    return False
+
+        # Each TrustSet is signed by a different account, so parallel submits don't race on sequence numbers
+        results = await asyncio.gather(*(establish(doc) for doc in pending))
+        created = sum(1 for ok in results if ok)
+        print(
+            f"🔗 Trust lines for {currency}: {created} created, {len(existing)} already in place, "
+            f"{len(pending) - created} failed"
+        )
+        return {
+            "candidates": len(candidates),
+            "created": created,
+            "skipped": len(existing),
+            "failed": len(pending) - created
+        }
+
+    async def _pre_establish_logged(self, properties: List[Property]):
+        # One property at a time: a user's TrustSets for different currencies share an
+        # account sequence, so running properties side by side would collide
+        async with self._prewarm_lock:
+            for property_obj in properties:
+                try:
+                    await self.pre_establish(property_obj)
+                except Exception as e:
+                    logger.error(f"Trust line pre-establishment failed for property {property_obj.id}: {e}")
+
+    async def drain(self):
+        """Wait for in-flight TrustSets and scheduled pre-establishment (shutdown)"""
+        pending = list(self._background) + list(self._inflight.values())
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def schedule_pre_establish(self, *properties: Property):
+        """Fire-and-forget pre_establish, keeping a reference so the task isn't collected"""
+        task = asyncio.create_task(self._pre_establish_logged(list(properties)))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+# Global trust line manager instance
+trust_line_service = TrustLineService(
+    concurrency=settings.trust_line_concurrency,
+    prewarm_limit=settings.trust_line_prewarm_limit
+)
@@ -0,0 +1,173 @@
+"""
+Wallet Pool Service
+Keeps a pool of pre-generated, pre-funded XRPL wallets so registration and first
+investments claim one with a single atomic update instead of waiting on the faucet
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pymongo import ReturnDocument
+from app.models.user import User
+from app.models.wallet_pool import PooledWallet, PooledWalletStatus
+from app.services.xrpl_service import xrpl_service
+from app.config import settings
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WalletPoolService:
+    """Service for the pre-funded wallet pool and user wallet provisioning"""
+
+    def __init__(self, target_size: int = 20, low_watermark: int = 5, concurrency: int = 4):
+        self.target_size = target_size
+        self.low_watermark = low_watermark
+        self.concurrency = concurrency
+        self._refill_lock = asyncio.Lock()
+
+    async def available_count(self) -> int:
+        return await PooledWallet.find(PooledWallet.status == PooledWalletStatus.AVAILABLE).count()
+
+    async def _generate(self, count: int) -> List[PooledWallet]:
+        """Create and fund `count` wallets in parallel; failures are logged and dropped"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        funded = settings.xrpl_network == "testnet"
+
+        async def generate_one() -> Optional[PooledWallet]:
+            async with semaphore:
+                try:
+                    wallet = await xrpl_service.create_wallet()
+                except Exception as e:
+                    logger.error(f"Wallet pool generation failed: {e}")
+                    return None
+            return PooledWallet(
+                address=wallet["address"],
+                seed=wallet["seed"],
+                public_key=wallet["public_key"],
+                funded=funded
+            )
+
+        wallets = await asyncio.gather(*(generate_one() for _ in range(count)))
+        return [wallet for wallet in wallets if wallet]
+
+    async def refill(self, force: bool = False) -> int:
+        """Top the pool back up to target_size once it drops below the low watermark"""
+        if self._refill_lock.locked():
+            return 0
+
+        async with self._refill_lock:
+            available = await self.available_count()
+            if available >= self.low_watermark and not force:
+                return 0
+            deficit = self.target_size - available
+            if deficit <= 0:
+                return 0
+
+            wallets = await self._generate(deficit)
+            if wallets:
+                await PooledWallet.insert_many(wallets)
+            print(f"👛 Wallet pool refilled with {len(wallets)}/{deficit} wallets ({available + len(wallets)} available)")
+            return len(wallets)
+
+    async def claim(self, user_id: str) -> Optional[PooledWallet]:
+        """Atomically take the oldest available wallet; None when the pool is empty"""
+        doc = await PooledWallet.get_pymongo_collection().find_one_and_update(
+            {"status": PooledWalletStatus.AVAILABLE.value},
+            {"$set": {
+                "status": PooledWalletStatus.CLAIMED.value,
+                "claimed_by": user_id,
+                "claimed_at": datetime.utcnow()
+            }},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        return PooledWallet.model_validate(doc) if doc else None
+
+    async def _release(self, wallet: PooledWallet):
+        await PooledWallet.get_pymongo_collection().update_one(
+            {"_id": wallet.id},
+            {"$set": {"status": PooledWalletStatus.AVAILABLE.value, "claimed_by": None, "claimed_at": None}}
+        )
+
+    async def ensure_wallet(self, user: User, create_if_empty: bool = True) -> bool:
+        """Give `user` a wallet if they have none; returns whether they have one afterwards.
+
+        The pool is tried first. With create_if_empty a wallet is created inline (and
+        recorded as claimed) when the pool is dry; otherwise the user is left for the next
+        claim (e.g. first investment).
+        """
+        if user.xrpl_wallet_address and user.xrpl_wallet_seed:
+            return True
+
+        pooled = await self.claim(str(user.id))
+        if not pooled and create_if_empty:
+            print(f"⚠️ Wallet pool empty, creating a wallet inline for user {user.username}")
+            wallet = await xrpl_service.create_wallet()
+            pooled = PooledWallet(
+                address=wallet["address"],
+                seed=wallet["seed"],
+                public_key=wallet["public_key"],
+                funded=settings.xrpl_network == "testnet",
+                status=PooledWalletStatus.CLAIMED,
+                claimed_by=str(user.id),
+                claimed_at=datetime.utcnow()
+            )
+            await pooled.insert()
+        elif not pooled:
+            logger.warning(f"Wallet pool empty, user {user.username} left without a wallet for now")
+            return False
+
+        # Only assign if nobody else provisioned this user in the meantime
+        result = await User.get_pymongo_collection().update_one(
+            {"_id": user.id, "$or": [{"xrpl_wallet_address": None}, {"xrpl_wallet_seed": None}]},
+            {"$set": {"xrpl_wallet_address": pooled.address, "xrpl_wallet_seed": pooled.seed, "updated_at": datetime.utcnow()}}
+        )
+        if result.modified_count == 0:
+            # Lost the race: hand the wallet back to the pool
+            await self._release(pooled)
+            fresh = await User.get(user.id)
+            if fresh:
+                user.xrpl_wallet_address = fresh.xrpl_wallet_address
+                user.xrpl_wallet_seed = fresh.xrpl_wallet_seed
+            return bool(user.xrpl_wallet_address and user.xrpl_wallet_seed)
+
+        user.xrpl_wallet_address = pooled.address
+        user.xrpl_wallet_seed = pooled.seed
+        return True
+
+    async def backfill(self, concurrency: Optional[int] = None) -> Dict[str, int]:
+        """Provision every existing user without a wallet, concurrently"""
+        users = await User.find({"$or": [{"xrpl_wallet_address": None}, {"xrpl_wallet_seed": None}]}).to_list()
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def provision(user: User) -> bool:
+            async with semaphore:
+                try:
+                    return await self.ensure_wallet(user)
+                except Exception as e:
+                    logger.error(f"Wallet backfill failed for {user.username}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(provision(user) for user in users))
+        assigned = sum(1 for ok in results if ok)
+        return {"users": len(users), "assigned": assigned, "failed": len(users) - assigned}
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = await PooledWallet.get_pymongo_collection().aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        by_status = {doc["_id"]: doc["count"] for doc in counts}
+        return {
+            "available": by_status.get(PooledWalletStatus.AVAILABLE.value, 0),
+            "claimed": by_status.get(PooledWalletStatus.CLAIMED.value, 0),
+            "target_size": self.target_size,
+            "low_watermark": self.low_watermark
+        }
+
+
+# Global wallet pool instance
+wallet_pool_service = WalletPoolService(
+    target_size=settings.wallet_pool_target_size,
+    low_watermark=settings.wallet_pool_low_watermark,
+    concurrency=settings.wallet_pool_concurrency
+)
@@ -1,9 +1,10 @@
 """
 XRP Wallet Management Service
-Handles user wallet assignment and real XRP integration
+Handles wallet balances and real XRP integration (provisioning lives in wallet_pool_service)
 """
 import os
 import random
+from functools import cached_property
 from typing import Optional, Dict, List
 from xrpl.clients import JsonRpcClient
 from xrpl.models import AccountInfo, AccountLines
@@ -20,78 +21,11 @@ class WalletService:
     
     def __init__(self):
         self.testnet_url = "https://s.altnet.rippletest.net:51234"
-        self.client = JsonRpcClient(self.testnet_url)
-        
-        # Your 4 predefined XRP wallets - will be assigned to existing users
-        self.user_wallets = [
-            {
-                "address": "rGghB5Kp9YEQhZbxg7Pxm3FGd6gZsytQS8",
-                "secret": "sEd7t6iGCmeYpBMW4yQxzK8FnJNpsrh"
-            },
-            {
-                "address": "rnDmRyddBqCDkKBWSnKkzy5ZqtRoVjyDFg", 
-                "secret": "sEdSq6vVpKeoxDWARwpxs2KuEe1XPWU"
-            },
-            {
-                "address": "rLB8NiA8MdTS68BXzfu3wwgsZp5uEnyU85",
-                "secret": "sEd76oZCyQ4bwMV2SbLNUhULyHLBY29"
-            },
-            {
-                "address": "rJ86bTZkm59iAwV68ZJTq9GdSjBwM5DAw1",
-                "secret": "sEdVgnP4k7xVASCmBhkTdgcrH4nYjHw"
-            }
-        ]
-    
-    async def assign_wallets_to_existing_users(self):
-        """
-        Assign your 4 XRP wallets to existing users in database
-        """
-        try:
-            from app.models.user import User
-            
-            # Get all users from database
-            users = await User.find().to_list()
-            
-            if not users:
-                logger.warning("No users found in database")
-                return False
-            
-            # Assign wallets to first 4 users (or all users if less than 4)
-            users_to_assign = users[:4]
-            
-            for i, user in enumerate(users_to_assign):
-                if i < len(self.user_wallets):
-                    wallet = self.user_wallets[i]
-                    
-                    # Update user with wallet info
-                    user.xrpl_wallet_address = wallet["address"]
-                    user.xrpl_wallet_seed = wallet["secret"]
-                    await user.save()
-                    
-                    logger.info(f"Assigned wallet {wallet['address']} to user {user.username}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error assigning wallets to existing users: {e}")
-            return False
     
-    def get_wallet_for_user_index(self, user_index: int) -> Optional[Dict[str, str]]:
-        """
-        Get wallet for a specific user index (0-3)
-        """
-        try:
-            if 0 <= user_index < len(self.user_wallets):
-                wallet = self.user_wallets[user_index]
-                return {
-                    "address": wallet["address"],
-                    "secret": wallet["secret"]
-                }
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error getting wallet for user index: {e}")
-            return None
+    @cached_property
+    def client(self) -> JsonRpcClient:
+        """Created on first balance lookup rather than at import"""
+        return JsonRpcClient(self.testnet_url)
     
     def get_wallet_balance(self, wallet_address: str) -> Dict[str, any]:
         """Get XRP balance and token holdings for a wallet"""
@@ -2,34 +2,92 @@ import xrpl
 from xrpl.clients import JsonRpcClient
 from xrpl.wallet import Wallet
 from xrpl.models.transactions import TrustSet, Payment, AccountSet, Memo
-from xrpl.models.requests import AccountLines, AccountInfo, AccountObjects, Tx
+from xrpl.models.requests import AccountLines, AccountInfo, AccountTx, Tx
 from xrpl.utils import xrp_to_drops, drops_to_xrp
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 import asyncio
+import time
 import hashlib
 import binascii
-import concurrent.futures
+from functools import cached_property
 from app.config import settings
+from app.services.token_symbol_service import is_valid_currency_code
 
 
 class XRPLService:
     def __init__(self):
-        # Initialize XRPL client
-        if settings.xrpl_network == "testnet":
-            self.client = JsonRpcClient("https://s.altnet.rippletest.net:51234/")
-        else:
-            self.client = JsonRpcClient("https://xrplcluster.com/")
+        # The client and issuer wallets are built on first use, so importing the service
+        # (every worker, script and router does) costs no key derivation
         
-        # Initialize issuer wallet if provided
-        self.issuer_wallet = None
-        if settings.issuer_wallet_seed:
-            self.issuer_wallet = Wallet.from_seed(settings.issuer_wallet_seed)
+        # Issuer trust lines grouped by currency: issuer -> (built_at, index)
+        self._holder_index_cache: Dict[str, Tuple[float, Dict[str, Dict[str, Any]]]] = {}
+        self._holder_index_locks: Dict[str, asyncio.Lock] = {}
+        self._issuer_queues: Dict[str, asyncio.Lock] = {}
+    
+    @cached_property
+    def client(self) -> JsonRpcClient:
+        """JSON-RPC client for the configured network"""
+        if settings.xrpl_network == "testnet":
+            return JsonRpcClient("https://s.altnet.rippletest.net:51234/")
+        return JsonRpcClient("https://xrplcluster.com/")
+    
+    @cached_property
+    def issuer_pool(self) -> List[Wallet]:
+        """Issuer pool: the primary issuer plus any extra ISSUER_WALLET_SEEDS. Each issuer
+        submits through its own queue, so issuers run in parallel while one account's
+        Sequence numbers never race. The queues are per process, which is why serve.py
+        runs a single worker by default."""
+        seeds = [settings.issuer_wallet_seed] if settings.issuer_wallet_seed else []
+        seeds += [seed.strip() for seed in (settings.issuer_wallet_seeds or "").split(",") if seed.strip()]
+        return [Wallet.from_seed(seed) for seed in dict.fromkeys(seeds)]
+    
+    @cached_property
+    def _issuers_by_address(self) -> Dict[str, Wallet]:
+        return {wallet.address: wallet for wallet in self.issuer_pool}
+    
+    @property
+    def issuer_wallet(self) -> Optional[Wallet]:
+        """Primary issuer (first in the pool), kept for single-issuer callers"""
+        return self.issuer_pool[0] if self.issuer_pool else None
+    
+    def assign_issuer(self, property_id: str) -> Wallet:
+        """Deterministic issuer for a property (rendezvous hashing, so growing the pool only
+        moves the properties the new issuer wins). Callers persist the choice on
+        Property.xrpl_issuer_address and use that from then on."""
+        if not self.issuer_pool:
+            raise Exception("Issuer wallet not configured")
+        return max(
+            self.issuer_pool,
+            key=lambda wallet: hashlib.sha256(f"{property_id}:{wallet.address}".encode()).digest()
+        )
+    
+    def get_issuer_wallet(self, issuer_address: Optional[str] = None) -> Wallet:
+        """Pool wallet for an issuer address (the primary one when no address is given).
+        Raises for addresses outside the pool."""
+        if not self.issuer_wallet:
+            raise Exception("Issuer wallet not configured")
+        if issuer_address is None:
+            return self.issuer_wallet
+        wallet = self._issuers_by_address.get(issuer_address)
+        if wallet is None:
+            # Signing with another issuer would move a currency that issuer never issued
+            raise Exception(f"Issuer {issuer_address} is not in the issuer pool")
+        return wallet
+    
+    async def _submit_as_issuer(self, issuer: Wallet, transaction):
+        """Submit and wait through the issuer's queue (one in-flight transaction per issuer)"""
+        queue = self._issuer_queues.setdefault(issuer.address, asyncio.Lock())
+        async with queue:
+            def submit():
+                return xrpl.transaction.submit_and_wait(transaction, self.client, issuer)
+            return await self._run_sync_xrpl_operation(submit)
     
     async def _run_sync_xrpl_operation(self, operation_func, *args, **kwargs):
-        """Run synchronous XRPL operations in thread pool to avoid blocking async context"""
-        loop = asyncio.get_event_loop()
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            return await loop.run_in_executor(executor, operation_func, *args, **kwargs)
+        """Run synchronous XRPL operations in thread pool to avoid blocking async context.
+
+        Uses the loop's shared executor: a per-call executor's shutdown(wait=True) would block
+        the event loop until the call returned, even after the awaiting task timed out."""
+        return await asyncio.to_thread(operation_func, *args, **kwargs)
     
     async def create_wallet(self) -> Dict[str, str]:
         """Create a new XRPL wallet"""
@@ -66,8 +124,26 @@ class XRPLService:
         except Exception:
             return False
     
-    async def create_token(self, token_symbol: str, total_supply: str, property_id: str, property_title: str) -> Optional[Dict[str, str]]:
-        """Create a new token and establish it on the XRPL"""
+    async def check_connection(self):
+        """ServerInfo round-trip; raises if the node is unreachable"""
+        print("🌐 Testing XRPL connection...")
+        try:
+            from xrpl.models.requests import ServerInfo
+            
+            def test_connection():
+                return self.client.request(ServerInfo())
+            
+            server_info = await self._run_sync_xrpl_operation(test_connection)
+            if not server_info.is_successful():
+                raise Exception("Failed to connect to XRPL server")
+            print("✅ XRPL connection successful")
+        except Exception as e:
+            error_msg = f"XRPL connection failed: {str(e)}"
+            print(f"❌ {error_msg}")
+            raise Exception(error_msg)
+    
+    async def create_token(self, token_symbol: str, total_supply: str, property_id: str, property_title: str, check_connection: bool = True, issuer_address: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Create a new token and establish it on the XRPL (batch callers check the connection once up front)"""
         try:
             print(f"🔧 Creating token: {token_symbol} with supply: {total_supply}")
             
@@ -76,31 +152,16 @@ class XRPLService:
                 print(f"❌ {error_msg}")
                 raise Exception(error_msg)
             
-            print(f"✅ Using issuer wallet: {self.issuer_wallet.address}")
+            issuer = self.get_issuer_wallet(issuer_address)
+            print(f"✅ Using issuer wallet: {issuer.address}")
             
-            # Ensure token symbol is properly formatted (3 chars for standard format)
-            if len(token_symbol) != 3:
-                # Create a 3-character token from property ID hash
-                hash_object = hashlib.md5(f"PROP{property_id}".encode())
-                token_symbol = hash_object.hexdigest()[:3].upper()
-                print(f"🔄 Adjusted token symbol to: {token_symbol}")
+            # Symbols come from the allocator: 3-char standard or 40-hex (160-bit) codes
+            if not is_valid_currency_code(token_symbol):
+                raise Exception(f"Invalid currency code: {token_symbol}")
             
             # Check client connection
-            print("🌐 Testing XRPL connection...")
-            try:
-                from xrpl.models.requests import ServerInfo
-                
-                def test_connection():
-                    return self.client.request(ServerInfo())
-                
-                server_info = await self._run_sync_xrpl_operation(test_connection)
-                if not server_info.is_successful():
-                    raise Exception("Failed to connect to XRPL server")
-                print("✅ XRPL connection successful")
-            except Exception as e:
-                error_msg = f"XRPL connection failed: {str(e)}"
-                print(f"❌ {error_msg}")
-                raise Exception(error_msg)
+            if check_connection:
+                await self.check_connection()
             
             print("🚀 Creating token on XRPL...")
             
@@ -113,10 +174,10 @@ class XRPLService:
             result = {
                 "tx_hash": f"SETUP_{token_symbol}_{property_id}",  # Placeholder since no actual transaction yet
                 "token_symbol": token_symbol,
-                "issuer_address": self.issuer_wallet.address,
+                "issuer_address": issuer.address,
                 "total_supply": total_supply,
                 "ledger_index": "pending",
-                "explorer_url": f"https://testnet.xrpl.org/accounts/{self.issuer_wallet.address}"
+                "explorer_url": f"https://testnet.xrpl.org/accounts/{issuer.address}"
             }
             print(f"✅ Token configured successfully!")
             print(f"   Token Symbol: {result['token_symbol']}")
@@ -131,11 +192,10 @@ class XRPLService:
             traceback.print_exc()
             raise Exception(error_msg)
     
-    async def create_trust_line(self, user_wallet_seed: str, token_symbol: str, limit: str = "1000000000") -> Optional[str]:
+    async def create_trust_line(self, user_wallet_seed: str, token_symbol: str, limit: str = "1000000000", issuer_address: Optional[str] = None) -> Optional[str]:
         """Create a trust line from user to issuer for a token"""
         try:
-            if not self.issuer_wallet:
-                raise Exception("Issuer wallet not configured")
+            issuer = self.get_issuer_wallet(issuer_address)
             
             user_wallet = Wallet.from_seed(user_wallet_seed)
             print(f"Creating trust line for {user_wallet.address} for token {token_symbol}")
@@ -145,7 +205,7 @@ class XRPLService:
                 account=user_wallet.address,
                 limit_amount={
                     "currency": token_symbol,
-                    "issuer": self.issuer_wallet.address,
+                    "issuer": issuer.address,
                     "value": limit
                 }
             )
@@ -172,28 +232,24 @@ class XRPLService:
             print(f"Failed to create trust line: {str(e)}")
             raise
     
-    async def transfer_tokens(self, to_address: str, token_symbol: str, amount: str) -> Optional[str]:
+    async def transfer_tokens(self, to_address: str, token_symbol: str, amount: str, issuer_address: Optional[str] = None) -> Optional[str]:
         """Transfer tokens from issuer to user"""
         try:
-            if not self.issuer_wallet:
-                raise Exception("Issuer wallet not configured")
+            issuer = self.get_issuer_wallet(issuer_address)
             
             # Create payment transaction
             payment = Payment(
-                account=self.issuer_wallet.address,
+                account=issuer.address,
                 destination=to_address,
                 amount={
                     "currency": token_symbol,
-                    "issuer": self.issuer_wallet.address,
+                    "issuer": issuer.address,
                     "value": amount
                 }
             )
             
-            # Submit and wait for validation using thread pool
-            def submit_payment():
-                return xrpl.transaction.submit_and_wait(payment, self.client, self.issuer_wallet)
-            
-            response = await self._run_sync_xrpl_operation(submit_payment)
+            # Submit through the issuer's queue and wait for validation
+            response = await self._submit_as_issuer(issuer, payment)
             
             if response.result["meta"]["TransactionResult"] == "tesSUCCESS":
                 return response.result["hash"]
@@ -229,6 +285,86 @@ class XRPLService:
         except Exception as e:
             raise Exception(f"Failed to get token balance: {str(e)}")
 
+    async def get_validated_ledger_index(self) -> int:
+        def get_index():
+            return xrpl.ledger.get_latest_validated_ledger_sequence(self.client)
+        return await self._run_sync_xrpl_operation(get_index)
+    
+    async def submit_batch(self, wallet: Wallet, transactions: List[Any], ledger_window: int = 4) -> List[Optional[Dict[str, Any]]]:
+        """Sign transactions from one account with consecutive Sequence numbers and submit
+        them all without waiting for validation. Each carries a LastLedgerSequence, so a
+        transaction that hasn't landed within `ledger_window` ledgers is definitively dead.
+        
+        Returns one entry per transaction: hash, sequence, last_ledger_sequence and the
+        provisional engine_result, or None for transactions never signed. When a submit
+        raises, that transaction may still have reached the network, so its entry is kept
+        (with an "error") and the rest of the batch is left unsigned rather than leaving a
+        Sequence gap. Only raises if nothing was signed."""
+        def sign_and_submit():
+            sequence = xrpl.account.get_next_valid_seq_number(wallet.address, self.client)
+            last_ledger = xrpl.ledger.get_latest_validated_ledger_sequence(self.client) + ledger_window
+            fee = xrpl.ledger.get_fee(self.client)
+            results: List[Optional[Dict[str, Any]]] = [None] * len(transactions)
+            for offset, transaction in enumerate(transactions):
+                prepared = transaction.__class__.from_dict({
+                    **transaction.to_dict(),
+                    "sequence": sequence + offset,
+                    "fee": fee,
+                    "last_ledger_sequence": last_ledger
+                })
+                signed = xrpl.transaction.sign(prepared, wallet)
+                result = {
+                    "tx_hash": signed.get_hash(),
+                    "sequence": sequence + offset,
+                    "last_ledger_sequence": last_ledger,
+                    "engine_result": None
+                }
+                results[offset] = result
+                try:
+                    response = xrpl.transaction.submit(signed, self.client)
+                except Exception as e:
+                    result["error"] = str(e)
+                    break
+                result["engine_result"] = response.result.get("engine_result")
+            return results
+        return await self._run_sync_xrpl_operation(sign_and_submit)
+    
+    async def get_account_tx_page(self, account: str, ledger_index_min: int = -1, marker: Any = None, limit: int = 200) -> Tuple[List[Dict[str, Any]], Any]:
+        """Fetch one page of an account's validated transactions, oldest first; returns (entries, next marker or None)"""
+        request = AccountTx(
+            account=account,
+            ledger_index_min=ledger_index_min,
+            ledger_index_max=-1,
+            forward=True,
+            limit=limit,
+            marker=marker
+        )
+        
+        def get_page():
+            return self.client.request(request)
+        
+        response = await self._run_sync_xrpl_operation(get_page)
+        if not response.is_successful():
+            raise Exception(f"Failed to get transactions for {account}: {response.result}")
+        return response.result.get("transactions", []), response.result.get("marker")
+
+    async def get_account_lines_page(self, account: str, marker: Any = None, limit: int = 400) -> Tuple[List[Dict[str, Any]], Any]:
+        """Fetch one page of an account's trust lines; returns (lines, marker for the next page or None)"""
+        request = AccountLines(
+            account=account,
+            ledger_index="validated",
+            limit=limit,
+            marker=marker
+        )
+        
+        def get_page():
+            return self.client.request(request)
+        
+        response = await self._run_sync_xrpl_operation(get_page)
+        if not response.is_successful():
+            raise Exception(f"Failed to get account lines for {account}: {response.result}")
+        return response.result.get("lines", []), response.result.get("marker")
+
     async def send_xrp(self, from_wallet_seed: str, to_address: str, amount_xrp: float, memo: str = None) -> Optional[Dict[str, str]]:
         """Send XRP from one wallet to another"""
         try:
@@ -378,52 +514,62 @@ class XRPLService:
             if not issuer_info:
                 return None
             
-            # Get account objects to find token-related objects
-            account_objects_request = AccountObjects(
-                account=issuer_address,
-                ledger_index="validated"
-            )
-            
-            response = self.client.request(account_objects_request)
+            index = await self.get_holder_index(issuer_address)
+            entry = index.get(token_symbol)
             
-            if response.is_successful():
-                objects = response.result.get("account_objects", [])
-                
-                # Look for RippleState objects (trust lines) related to our token
-                token_info = {
-                    "token_symbol": token_symbol,
-                    "issuer_address": issuer_address,
-                    "exists": False,
-                    "total_supply": "0",
-                    "holders": []
-                }
-                
-                # Check if we can find any trust lines for this token
-                lines_request = AccountLines(
-                    account=issuer_address,
-                    ledger_index="validated"
-                )
-                
-                lines_response = self.client.request(lines_request)
-                if lines_response.is_successful():
-                    lines = lines_response.result.get("lines", [])
-                    for line in lines:
-                        if line.get("currency") == token_symbol:
-                            token_info["exists"] = True
-                            if float(line["balance"]) < 0:  # Negative balance means tokens were issued
-                                token_info["total_supply"] = str(abs(float(line["balance"])))
-                            token_info["holders"].append({
-                                "address": line["account"],
-                                "balance": abs(float(line["balance"]))
-                            })
-                
-                return token_info
-            else:
-                return None
+            return {
+                "token_symbol": token_symbol,
+                "issuer_address": issuer_address,
+                "exists": entry is not None,
+                "total_supply": str(entry["total_supply"]) if entry else "0",
+                "trust_line_count": entry["trust_line_count"] if entry else 0,
+                "holders": entry["holders"] if entry else []
+            }
                 
         except Exception as e:
+            print(f"❌ Error verifying token {token_symbol}: {str(e)}")
             return None
 
+    async def iter_trust_lines(self, account: str, page_size: int = 400) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every trust line of an account, one page at a time, following `marker` to the end"""
+        marker = None
+        while True:
+            lines, marker = await self.get_account_lines_page(account, marker=marker, limit=page_size)
+            yield lines
+            if not marker:
+                break
+
+    async def get_holder_index(self, issuer_address: str, max_age_seconds: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Per-currency holders of an issuer, built in one paged scan and cached for a short TTL"""
+        max_age = settings.trust_line_index_ttl_seconds if max_age_seconds is None else max_age_seconds
+        cached = self._holder_index_cache.get(issuer_address)
+        if cached and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+        
+        lock = self._holder_index_locks.setdefault(issuer_address, asyncio.Lock())
+        async with lock:
+            # Another request may have rebuilt it while we waited
+            cached = self._holder_index_cache.get(issuer_address)
+            if cached and time.monotonic() - cached[0] < max_age:
+                return cached[1]
+            
+            index: Dict[str, Dict[str, Any]] = {}
+            async for lines in self.iter_trust_lines(issuer_address):
+                for line in lines:
+                    entry = index.setdefault(line["currency"], {"total_supply": 0.0, "trust_line_count": 0, "holders": []})
+                    entry["trust_line_count"] += 1
+                    # From the issuer's side a negative balance is what the holder owns
+                    balance = -float(line["balance"])
+                    if balance > 0:
+                        entry["total_supply"] += balance
+                        entry["holders"].append({"address": line["account"], "balance": balance})
+            
+            for entry in index.values():
+                entry["holders"].sort(key=lambda holder: holder["balance"], reverse=True)
+            
+            self._holder_index_cache[issuer_address] = (time.monotonic(), index)
+            return index
+
     async def get_account_info(self, address: str) -> Optional[Dict[str, Any]]:
         """Get account information"""
         try:
@@ -451,8 +597,6 @@ class XRPLService:
         """Get account transaction history"""
         try:
             def _get_transactions():
-                from xrpl.models.requests import AccountTx
-                
                 tx_request = AccountTx(
                     account=address,
                     ledger_index_min=-1,
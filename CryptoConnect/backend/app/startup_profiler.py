@@ -0,0 +1,68 @@
+"""
+Startup Profiler
+Times the imports and init steps between loading app.main and the app being ready, so
+time-to-ready can be kept under STARTUP_BUDGET_SECONDS. Import times are inclusive: the
+first module to import a shared dependency (xrpl, beanie, ...) is charged for it.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import importlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """Records how long each startup step took, measured from when app.main began loading"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.ready_at: Optional[float] = None
+        self.steps: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def measure(self, name: str, kind: str = "init") -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append({"name": name, "kind": kind, "seconds": round(time.perf_counter() - start, 4)})
+
+    def import_module(self, name: str):
+        """importlib.import_module, timed"""
+        with self.measure(name, kind="import"):
+            return importlib.import_module(name)
+
+    @property
+    def time_to_ready(self) -> Optional[float]:
+        if self.ready_at is None:
+            return None
+        return round(self.ready_at - self.started_at, 4)
+
+    def report(self, budget_seconds: float) -> Dict[str, Any]:
+        elapsed = self.time_to_ready
+        return {
+            "ready": elapsed is not None,
+            "time_to_ready_seconds": elapsed,
+            "budget_seconds": budget_seconds,
+            "within_budget": elapsed is not None and elapsed <= budget_seconds,
+            "import_seconds": round(sum(step["seconds"] for step in self.steps if step["kind"] == "import"), 4),
+            "init_seconds": round(sum(step["seconds"] for step in self.steps if step["kind"] == "init"), 4),
+            "steps": sorted(self.steps, key=lambda step: step["seconds"], reverse=True)
+        }
+
+    def mark_ready(self, budget_seconds: float) -> Dict[str, Any]:
+        """Stop the clock and log the report, warning with the slowest steps when over budget"""
+        self.ready_at = time.perf_counter()
+        report = self.report(budget_seconds)
+        elapsed = report["time_to_ready_seconds"]
+        logger.info(f"Ready in {elapsed:.2f}s (imports {report['import_seconds']:.2f}s, init {report['init_seconds']:.2f}s, budget {budget_seconds:.2f}s)")
+        if not report["within_budget"]:
+            slowest = ", ".join(f"{step['name']} {step['seconds']:.2f}s" for step in report["steps"][:5])
+            logger.warning(f"Startup took {elapsed:.2f}s, over the {budget_seconds:.2f}s budget; slowest steps: {slowest}")
+        return report
+
+
+# Global startup profiler instance
+startup_profiler = StartupProfiler()
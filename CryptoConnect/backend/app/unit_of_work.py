@@ -0,0 +1,123 @@
+"""
+Unit of Work
+Collects the writes of one business operation (a market fill, an investment) and
+applies them as a single multi-document Mongo transaction, one bulk write per
+collection, retrying on transient errors
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, Type
+from beanie import Document, PydanticObjectId
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_COMMIT_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.05
+
+
+class UnitOfWorkConflict(Exception):
+    """A required update matched no document, so nothing in the unit of work was applied"""
+
+
+class UnitOfWork:
+    """Queue inserts and updates, then `await commit()` to apply them all or none"""
+
+    # Standalone servers (typical local dev) don't support transactions; detected once
+    _supports_transactions: Optional[bool] = None
+
+    def __init__(self, max_attempts: int = MAX_COMMIT_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._inserts: Dict[Type[Document], List[Document]] = {}
+        self._operations: Dict[Type[Document], List[Any]] = {}
+        self._required: List[Tuple[Type[Document], Dict[str, Any], Dict[str, Any]]] = []
+
+    def insert(self, *documents: Document):
+        """Queue new documents; ids are assigned now so callers can reference them before commit"""
+        for document in documents:
+            if document.id is None:
+                document.id = PydanticObjectId()
+            self._inserts.setdefault(type(document), []).append(document)
+
+    def update(self, model: Type[Document], filter: Dict[str, Any], update: Dict[str, Any], required: bool = False):
+        """Queue an update. A required update's filter is a guard (e.g. remaining capacity):
+        if it matches nothing, commit raises UnitOfWorkConflict and applies nothing."""
+        if required:
+            self._required.append((model, filter, update))
+        else:
+            self.add(model, [UpdateOne(filter, update)])
+
+    def add(self, model: Type[Document], operations: List[Any]):
+        """Queue raw bulk-write operations against a model's collection"""
+        if operations:
+            self._operations.setdefault(model, []).extend(operations)
+
+    async def _flush(self, session=None):
+        # Guards first, so a conflict is found before anything else is written (this also
+        # covers the non-transactional fallback)
+        if session is None and len(self._required) > 1:
+            # Without a transaction an applied guard can't be rolled back, so check them all
+            # before applying any
+            for model, filter, _ in self._required:
+                if await model.get_pymongo_collection().find_one(filter, {"_id": 1}) is None:
+                    raise UnitOfWorkConflict(f"{model.__name__} update matched no document for {filter}")
+        for model, filter, update in self._required:
+            result = await model.get_pymongo_collection().update_one(filter, update, session=session)
+            if result.matched_count == 0:
+                raise UnitOfWorkConflict(f"{model.__name__} update matched no document for {filter}")
+        for model, documents in self._inserts.items():
+            await model.insert_many(documents, session=session)
+        for model, operations in self._operations.items():
+            await model.get_pymongo_collection().bulk_write(operations, ordered=True, session=session)
+
+    async def _transactions_supported(self, client) -> bool:
+        if UnitOfWork._supports_transactions is None:
+            try:
+                hello = await client.admin.command("hello")
+                UnitOfWork._supports_transactions = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+            except Exception:
+                UnitOfWork._supports_transactions = False
+            if not UnitOfWork._supports_transactions:
+                logger.warning("MongoDB is not a replica set; unit-of-work writes will not be transactional")
+        return UnitOfWork._supports_transactions
+
+    async def commit(self):
+        models = [model for model, _, _ in self._required] + list(self._inserts) + list(self._operations)
+        if not models:
+            return
+        client = models[0].get_pymongo_collection().database.client
+        if not await self._transactions_supported(client):
+            await self._flush()
+            return
+
+        for attempt in range(1, self.max_attempts + 1):
+            session = await client.start_session()
+            try:
+                session.start_transaction()
+                try:
+                    await self._flush(session)
+                except Exception:
+                    await session.abort_transaction()
+                    raise
+                await self._commit_transaction(session)
+                return
+            except PyMongoError as e:
+                # Queued writes are replayed from scratch, so a transient abort is safe to retry
+                if not e.has_error_label("TransientTransactionError") or attempt == self.max_attempts:
+                    raise
+                logger.warning(f"Transient transaction error (attempt {attempt}/{self.max_attempts}): {e}")
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * attempt)
+            finally:
+                await session.end_session()
+
+    async def _commit_transaction(self, session):
+        # An unknown commit result may already have been applied; retry the commit, never the writes
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await session.commit_transaction()
+                return
+            except PyMongoError as e:
+                if not e.has_error_label("UnknownTransactionCommitResult") or attempt == self.max_attempts:
+                    raise
+                logger.warning(f"Unknown transaction commit result, retrying commit: {e}")
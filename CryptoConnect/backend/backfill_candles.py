@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Candle Backfill Script for CryptoConnect
+Rebuilds the trades time series and OHLCV candles from existing secondary market transactions.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+from app.database import connect_to_mongo, close_mongo_connection
+from app.services.candle_service import candle_service
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        print("🕯️ Rebuilding trade candles from transactions...")
+        count = await candle_service.backfill_from_transactions()
+        print(f"✅ Backfilled {count} trades")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Wallet Backfill Script for CryptoConnect
+Tops up the pre-funded wallet pool and provisions a wallet for every existing user without one.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+from app.database import connect_to_mongo, close_mongo_connection
+from app.services.wallet_pool_service import wallet_pool_service
+
+
+async def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    await connect_to_mongo()
+    try:
+        print("👛 Filling wallet pool...")
+        await wallet_pool_service.refill(force=True)
+        print("🔗 Assigning wallets to users without one...")
+        result = await wallet_pool_service.backfill(concurrency)
+        print(f"✅ Assigned {result['assigned']}/{result['users']} wallets ({result['failed']} failed)")
+        await wallet_pool_service.refill()
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
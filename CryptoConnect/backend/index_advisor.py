@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Index Advisor for CryptoConnect
+Creates the model indexes, runs explain() on every registered query shape and
+flags COLLSCANs and in-memory sorts. Exits non-zero when a shape is flagged so
+CI catches index drift.
+
+Usage: python index_advisor.py [--no-fail]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+from app.database import connect_to_mongo, close_mongo_connection, db
+from app.services.index_advisor import index_advisor
+
+
+async def main() -> int:
+    # connect_to_mongo runs init_beanie, which creates every declared index
+    await connect_to_mongo()
+    try:
+        reports = await index_advisor.run(db.database)
+    finally:
+        await close_mongo_connection()
+
+    flagged = 0
+    for report in reports:
+        if report["issues"]:
+            flagged += 1
+            print(f"❌ {report['name']}: {', '.join(report['issues'])}")
+        else:
+            print(f"✅ {report['name']}: {', '.join(report['indexes']) or 'no index'}")
+        print(f"   {report['description']} | stages: {' > '.join(report['stages'])}")
+
+    print(f"\n📊 {len(reports)} query shapes checked, {flagged} flagged")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    if "--no-fail" in sys.argv:
+        exit_code = 0
+    sys.exit(exit_code)
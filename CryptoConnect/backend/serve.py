@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+CryptoConnect Production Server
+Runs the API on WEB_WORKERS uvicorn processes (default 1) with uvloop and httptools and
+no auto-reload. Use run.py for development.
+
+Several pieces of state are still per process, so more than one worker is only safe once they
+are shared: the market event bus (a WebSocket/SSE client only sees trades executed on its own
+worker), the per-issuer submit queues (issuer Sequence numbers race across workers) and the
+trust line service's in-flight TrustSets (settlement's busy-account check misses other workers).
+
+Each worker imports the app and runs its lifespan, so every process opens its own Mongo
+pool and XRPL client before accepting traffic. Periodic background jobs run in exactly one
+worker, chosen through a host-local lock file.
+
+On SIGTERM a worker stops accepting connections and gives in-flight requests
+SHUTDOWN_GRACE_SECONDS to finish. The lifespan shutdown then flushes the background queues
+(ledger projection, settlement, pending tokenization and trust lines) before the worker exits.
+
+Probes: GET /health/live (process up) and GET /health/ready (Mongo and XRPL reachable).
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+from app.config import settings
+
+
+def worker_count() -> int:
+    return settings.web_workers or os.cpu_count() or 1
+
+
+def event_loop() -> str:
+    try:
+        import uvloop  # noqa: F401
+        return "uvloop"
+    except ImportError:  # e.g. Windows
+        return "asyncio"
+
+
+def http_protocol() -> str:
+    try:
+        import httptools  # noqa: F401
+        return "httptools"
+    except ImportError:
+        return "h11"
+
+
+if __name__ == "__main__":
+    workers = worker_count()
+    if workers > 1:
+        print(
+            f"⚠️ {workers} workers: market feed, issuer queues and trust line state are per process; "
+            "clients may miss trades and issuer submissions can race on Sequence numbers"
+        )
+    if workers > 1 and not settings.background_lock_file:
+        # Inherited by the worker processes through their environment
+        os.environ["BACKGROUND_LOCK_FILE"] = os.path.join(
+            tempfile.gettempdir(), f"cryptoconnect-background-{settings.api_port}.lock"
+        )
+
+    loop, http = event_loop(), http_protocol()
+    print(f"🚀 Starting CryptoConnect API on {settings.api_host}:{settings.api_port} with {workers} workers ({loop}/{http})")
+    uvicorn.run(
+        "app.main:app",
+        host=settings.api_host,
+        port=settings.api_port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        reload=False,
+        timeout_graceful_shutdown=settings.shutdown_grace_seconds,
+        proxy_headers=True,
+        log_level="info"
+    )
@@ -0,0 +1,166 @@
+"""
+Shared fixtures: an in-memory MongoDB (mongomock_motor) with every Beanie model registered
+"""
+import asyncio
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import mongomock.aggregate
+import mongomock.collection
+from beanie import init_beanie
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult
+import app.database as database
+from app.models.market_order import MarketOrder
+from app.models.property import Property
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.order_book_service import order_book_service
+
+
+def _bulk_write(self, requests, ordered=True, **kwargs):
+    """mongomock's bulk_write doesn't accept pymongo request objects; apply them one by one"""
+    counts = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nUpserted": 0, "nRemoved": 0, "upserted": []}
+    for op in requests:
+        if isinstance(op, (UpdateOne, UpdateMany, ReplaceOne)):
+            if isinstance(op, UpdateOne):
+                result = self.update_one(op._filter, op._doc, upsert=op._upsert)
+            elif isinstance(op, UpdateMany):
+                result = self.update_many(op._filter, op._doc, upsert=op._upsert)
+            else:
+                result = self.replace_one(op._filter, op._doc, upsert=op._upsert)
+            counts["nMatched"] += result.matched_count
+            counts["nModified"] += result.modified_count
+            counts["nUpserted"] += 1 if result.upserted_id is not None else 0
+        elif isinstance(op, DeleteOne):
+            counts["nRemoved"] += self.delete_one(op._filter).deleted_count
+        elif isinstance(op, InsertOne):
+            self.insert_one(op._doc)
+            counts["nInserted"] += 1
+        else:
+            raise NotImplementedError(type(op).__name__)
+    return BulkWriteResult(counts, True)
+
+
+mongomock.collection.Collection.bulk_write = _bulk_write
+
+
+_handle_arithmetic_operator = mongomock.aggregate._Parser._handle_arithmetic_operator
+
+
+def _handle_round(self, operator, values):
+    """mongomock has no $round (MongoDB 4.2+)"""
+    if operator == "$round":
+        number, places = (self.parse(value) for value in values)
+        return None if number is None else round(number, places)
+    return _handle_arithmetic_operator(self, operator, values)
+
+
+mongomock.aggregate.arithmetic_operators.add("$round")
+mongomock.aggregate._Parser._handle_arithmetic_operator = _handle_round
+
+
+async def init_test_db():
+    client = mongomock_motor.AsyncMongoMockClient()
+    database.db.client = client
+    database.db.database = client["cryptoconnect_test"]
+    await init_beanie(
+        database=database.db.database,
+        document_models=[
+            User, Property, Transaction,
+            database.MarketOrder, database.ArchivedMarketOrder, database.Trade, database.Candle,
+            database.OrderBookLevel, database.PortfolioSnapshot, database.PortfolioHistory,
+            database.LedgerPosition, database.LedgerCheckpoint,
+            database.ReconciliationRun, database.ReconciliationDiscrepancy,
+            database.LedgerTransaction, database.LedgerAccountCursor,
+            database.PooledWallet, database.TrustLine, database.TokenizationJob,
+            database.TokenSymbol, database.Settlement
+        ]
+    )
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine function against a fresh database, on one event loop"""
+    from app.services.trust_line_service import trust_line_service
+    trust_line_service._established.clear()
+    trust_line_service._inflight.clear()
+    trust_line_service._failures.clear()
+
+    def _run(scenario):
+        async def main():
+            await init_test_db()
+            return await scenario()
+        return asyncio.run(main())
+    return _run
+
+
+async def make_user(name: str, **fields) -> User:
+    user = User(email=f"{name}@example.com", username=name, hashed_password="x", is_kyc_verified=True, **fields)
+    await user.save()
+    return user
+
+
+async def make_property(seller: User, **fields) -> Property:
+    prop = Property(
+        title="Marina Villa", description="d", address="a", city="Dubai", country="UAE",
+        property_type="villa", total_value=100000, size_sqm=100, seller_id=str(seller.id),
+        seller_name=seller.username, seller_email=seller.email, monthly_rent=1000
+    )
+    prop.calculate_tokens_and_price()
+    for name, value in fields.items():
+        setattr(prop, name, value)
+    await prop.save()
+    return prop
+
+
+async def make_holding(user: User, prop: Property, tokens: int, price: float = 10.0) -> Transaction:
+    tx = Transaction(
+        transaction_type="token_purchase", status="completed", user_id=str(user.id),
+        property_id=str(prop.id), amount=tokens * price, tokens=tokens, token_price=price
+    )
+    await tx.save()
+    return tx
+
+
+async def place_order(user, prop, side: str, price: float, **fields) -> MarketOrder:
+    order = MarketOrder(
+        user_id=str(user.id), property_id=str(prop.id), order_type=side, tokens=10,
+        price_per_token=price, total_amount=10 * price, **fields
+    )
+    await order.insert()
+    await order_book_service.apply_deltas([(order.property_id, side, price, order.tokens, 1)])
+    return order
+
+
+def fill_after_read(monkeypatch, orders):
+    """Make MarketOrder.find hand back its rows, then partly fill orders[0] and fully fill orders[1]"""
+    real_find = MarketOrder.find
+
+    def racing_find(*args, **kwargs):
+        query = real_find(*args, **kwargs)
+        to_list = query.to_list
+
+        async def stale_to_list(*a, **k):
+            rows = await to_list(*a, **k)
+            collection = MarketOrder.get_pymongo_collection()
+            await collection.update_one({"_id": orders[0].id}, {"$set": {"tokens_filled": 4, "status": "partial"}})
+            await collection.update_one({"_id": orders[1].id}, {"$set": {"tokens_filled": 10, "status": "filled"}})
+            side = orders[0].order_type
+            await order_book_service.apply_deltas([
+                (orders[0].property_id, side, orders[0].price_per_token, -4, 0),
+                (orders[1].property_id, side, orders[1].price_per_token, -10, -1)
+            ])
+            return rows
+        query.to_list = stale_to_list
+        return query
+    monkeypatch.setattr(MarketOrder, "find", racing_find)
+
+
+async def book_levels():
+    return [(level.price_per_token, level.quantity, level.order_count) for level in await database.OrderBookLevel.find().to_list()]
@@ -0,0 +1,52 @@
+"""
+Every fill is rolled into its 1m, 1h and 1d candles by upsert
+"""
+from datetime import datetime
+from app.models.trade import CandleInterval, Trade
+from app.services.candle_service import candle_service
+
+
+async def trade(price: float, tokens: int, executed_at: datetime, property_id: str = "p1"):
+    await candle_service.record_trade(
+        property_id=property_id, buy_order_id="b", sell_order_id="s", buyer_id="u1", seller_id="u2",
+        tokens=tokens, price_per_token=price, executed_at=executed_at
+    )
+
+
+def ohlcv(candle):
+    return (candle.bucket_start, candle.open, candle.high, candle.low, candle.close, candle.volume, candle.trade_count)
+
+
+def test_fills_roll_into_each_interval(run):
+    async def scenario():
+        await trade(10.0, 5, datetime(2026, 3, 1, 9, 30, 5))
+        await trade(12.0, 1, datetime(2026, 3, 1, 9, 30, 40))
+        await trade(9.0, 2, datetime(2026, 3, 1, 9, 30, 59))
+        await trade(11.0, 3, datetime(2026, 3, 1, 9, 31, 10))
+        await trade(50.0, 1, datetime(2026, 3, 1, 9, 30, 20), property_id="p2")
+
+        minutes = await candle_service.get_candles("p1", CandleInterval.ONE_MINUTE)
+        assert [ohlcv(c) for c in minutes] == [
+            (datetime(2026, 3, 1, 9, 30), 10.0, 12.0, 9.0, 9.0, 8, 3),
+            (datetime(2026, 3, 1, 9, 31), 11.0, 11.0, 11.0, 11.0, 3, 1)
+        ]
+        assert minutes[0].quote_volume == 10.0 * 5 + 12.0 + 9.0 * 2
+
+        for interval, start in ((CandleInterval.ONE_HOUR, datetime(2026, 3, 1, 9)), (CandleInterval.ONE_DAY, datetime(2026, 3, 1))):
+            candles = await candle_service.get_candles("p1", interval)
+            assert [ohlcv(c) for c in candles] == [(start, 10.0, 12.0, 9.0, 11.0, 11, 4)]
+        assert await Trade.find().count() == 5
+    run(scenario)
+
+
+def test_candle_range_starts_at_the_bucket_holding_start(run):
+    async def scenario():
+        for minute in range(5):
+            await trade(10.0 + minute, 1, datetime(2026, 3, 1, 9, minute, 30))
+
+        candles = await candle_service.get_candles(
+            "p1", CandleInterval.ONE_MINUTE,
+            start=datetime(2026, 3, 1, 9, 1, 45), end=datetime(2026, 3, 1, 9, 3)
+        )
+        assert [c.open for c in candles] == [11.0, 12.0, 13.0]
+    run(scenario)
@@ -0,0 +1,99 @@
+"""
+The ledger projection folds transactions into positions once each, however often catch_up runs,
+and reads add the events written since the checkpoint
+"""
+from datetime import datetime, timedelta
+from bson import ObjectId
+import pytest
+from app.models.ledger import LedgerCheckpoint
+from app.models.transaction import Transaction
+from app.services.ledger_service import CHECKPOINT_NAME, fold_events, ledger_service
+from conftest import make_user
+
+# Settled events: older than the projection's settle window
+SETTLED_AT = datetime.utcnow() - timedelta(minutes=10)
+
+
+class Log:
+    """Writes transactions with increasing, already-settled ObjectIds"""
+
+    def __init__(self):
+        self.count = 0
+
+    async def write(self, user_id: str, transaction_type: str, tokens: int = 0, amount: float = 0.0,
+                    status: str = "completed", **fields) -> Transaction:
+        self.count += 1
+        timestamp = int(SETTLED_AT.timestamp())
+        tx = Transaction(
+            id=ObjectId(f"{timestamp:08x}{self.count:016x}"), transaction_type=transaction_type,
+            status=status, user_id=user_id, property_id="p1", amount=amount, tokens=tokens,
+            token_price=10.0, **fields
+        )
+        await tx.insert()
+        return tx
+
+
+def test_fold_applies_trades_transfers_and_income():
+    events = [
+        {"_id": ObjectId(), "user_id": "a", "property_id": "p1", "transaction_type": "token_purchase", "tokens": 10, "amount": 100.0},
+        {"_id": ObjectId(), "user_id": "a", "property_id": "p1", "transaction_type": "secondary_market_sell", "tokens": 4, "amount": 60.0},
+        {"_id": ObjectId(), "user_id": "a", "property_id": "p1", "transaction_type": "rental_distribution", "amount": 7.5},
+        {"_id": ObjectId(), "user_id": "a", "property_id": "p1", "transaction_type": "token_transfer", "tokens": 2, "xrpl_to_address": "rB"}
+    ]
+    positions = {}
+
+    touched = fold_events(positions, events, {"rB": "b"})
+
+    assert touched == {("a", "p1"), ("b", "p1")}
+    a, b = positions[("a", "p1")], positions[("b", "p1")]
+    assert (a["tokens"], a["cost_basis"], a["income_received"]) == (4, pytest.approx(40.0), 7.5)
+    # The recipient takes over the cost basis that moved with the tokens
+    assert (b["tokens"], b["cost_basis"]) == (2, pytest.approx(20.0))
+
+    # Replaying the same events is a no-op
+    assert fold_events(positions, events, {"rB": "b"}) == set()
+    assert positions[("a", "p1")]["tokens"] == 4
+
+
+def test_catch_up_checkpoints_and_replays_idempotently(run, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(ledger_service, "batch_size", 2)
+        recipient = await make_user("recipient", xrpl_wallet_address="rRecipient")
+        log = Log()
+        await log.write("a", "token_purchase", 10, 100.0)
+        await log.write("a", "secondary_market_buy", 5, 60.0)
+        await log.write("a", "token_transfer", 3, xrpl_to_address="rRecipient")
+        await log.write("a", "token_sale", 2, 30.0)
+        await log.write("a", "token_purchase", 99, 990.0, status="failed")
+
+        assert await ledger_service.catch_up() == 4
+        checkpoint = await LedgerCheckpoint.find_one(LedgerCheckpoint.name == CHECKPOINT_NAME)
+        assert checkpoint.events_applied == 4
+        assert await ledger_service.get_balance("a", "p1") == 10
+        assert await ledger_service.get_balance(str(recipient.id), "p1") == 3
+
+        # A crash between the position writes and the checkpoint replays the batch harmlessly
+        await checkpoint.set({"last_event_id": None})
+        await ledger_service.catch_up()
+        assert await ledger_service.get_balance("a", "p1") == 10
+        assert await ledger_service.get_property_holders("p1") == {"a": 10, str(recipient.id): 3}
+    run(scenario)
+
+
+def test_reads_include_events_since_the_checkpoint(run):
+    async def scenario():
+        log = Log()
+        await log.write("a", "token_purchase", 10, 100.0)
+        await ledger_service.catch_up()
+
+        await log.write("a", "token_purchase", 5, 50.0)
+        await log.write("b", "secondary_market_buy", 2, 20.0)
+
+        positions = await ledger_service.get_user_positions("a")
+        assert (positions["p1"]["tokens"], positions["p1"]["cost_basis"]) == (15, 150.0)
+        assert await ledger_service.get_property_holders("p1") == {"a": 15, "b": 2}
+
+        # Catching up folds the same events once
+        assert await ledger_service.catch_up() == 2
+        assert await ledger_service.get_balance("a", "p1") == 15
+    run(scenario)
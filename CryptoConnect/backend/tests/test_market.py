@@ -0,0 +1,92 @@
+"""
+Cancels and fills only move the book by what they actually changed, even when another writer
+touches the order between reading it and updating it
+"""
+from app.models.market_order import MarketOrder
+from app.models.transaction import Transaction
+from app.routers import market
+from app.services.order_book_service import order_book_service
+from conftest import book_levels, fill_after_read, make_property, make_user, place_order
+
+
+def test_batch_cancel_skips_orders_filled_after_the_read(run, monkeypatch):
+    async def scenario():
+        user = await make_user("seller")
+        prop = await make_property(user)
+        orders = [await place_order(user, prop, "sell", price) for price in (10.0, 11.0)]
+        # Someone else's liquidity at the same prices shows any over-subtraction
+        other = await make_user("other")
+        for price in (10.0, 11.0):
+            await place_order(other, prop, "sell", price)
+        fill_after_read(monkeypatch, orders)
+
+        ids = [str(orders[0].id), str(orders[1].id), str(orders[0].id)]
+        results = await market.cancel_orders_batch(market.BatchCancelRequest(order_ids=ids), user)
+        monkeypatch.undo()
+
+        assert [(r.order_id, r.cancelled) for r in results] == [(ids[0], True), (ids[1], False), (ids[2], True)]
+        assert results[1].error
+        assert (await MarketOrder.get(orders[0].id)).status.value == "cancelled"
+        assert (await MarketOrder.get(orders[1].id)).status.value == "filled"
+        # Only the 6 tokens still resting on order 0 came off
+        assert await book_levels() == [(10.0, 10, 1), (11.0, 10, 1)]
+    run(scenario)
+
+
+def test_batch_cancel_ignores_other_users_orders(run):
+    async def scenario():
+        owner, other = await make_user("owner"), await make_user("other")
+        prop = await make_property(owner)
+        order = await place_order(owner, prop, "sell", 10.0)
+
+        results = await market.cancel_orders_batch(market.BatchCancelRequest(order_ids=[str(order.id)]), other)
+
+        assert not results[0].cancelled
+        assert (await MarketOrder.get(order.id)).status.value == "active"
+        assert await book_levels() == [(10.0, 10, 1)]
+    run(scenario)
+
+
+def test_cancel_keeps_a_fill_that_landed_after_the_read(run, monkeypatch):
+    async def scenario():
+        user, other = await make_user("seller"), await make_user("other")
+        prop = await make_property(user)
+        order = await place_order(user, prop, "sell", 10.0)
+        await place_order(other, prop, "sell", 10.0)
+        stale = await MarketOrder.get(order.id)
+
+        await MarketOrder.get_pymongo_collection().update_one(
+            {"_id": order.id}, {"$set": {"tokens_filled": 4, "status": "partial"}}
+        )
+        await order_book_service.apply_deltas([(order.property_id, "sell", 10.0, -4, 0)])
+
+        async def stale_get(*args, **kwargs):
+            return stale
+        monkeypatch.setattr(MarketOrder, "get", stale_get)
+        await market.cancel_order(str(order.id), user)
+        monkeypatch.undo()
+
+        cancelled = await MarketOrder.get(order.id)
+        assert (cancelled.status.value, cancelled.tokens_filled) == ("cancelled", 4)
+        assert await book_levels() == [(10.0, 10, 1)]
+    run(scenario)
+
+
+def test_fill_against_an_order_cancelled_after_the_read_is_dropped(run):
+    async def scenario():
+        seller, buyer = await make_user("seller"), await make_user("buyer")
+        prop = await make_property(seller)
+        ask = await place_order(seller, prop, "sell", 10.0)
+        stale_book = [await MarketOrder.get(ask.id)]
+        await market.cancel_order(str(ask.id), seller)
+
+        bid = await place_order(buyer, prop, "buy", 10.0)
+        await market.match_orders(bid, stale_book)
+
+        assert await Transaction.find().count() == 0
+        assert (await MarketOrder.get(ask.id)).status.value == "cancelled"
+        resting = await MarketOrder.get(bid.id)
+        assert (resting.status.value, resting.tokens_filled) == ("active", 0)
+        assert (bid.tokens_filled, stale_book[0].status.value) == (0, "cancelled")
+        assert await book_levels() == [(10.0, 10, 1)]
+    run(scenario)
@@ -0,0 +1,50 @@
+"""
+Depth grouped by tick size: bids round down, asks round up, and prices on a tick keep their level
+"""
+from app.services.order_book_service import order_book_service
+
+
+def levels(side):
+    return [(level.price_per_token, level.quantity, level.order_count) for level in side]
+
+
+def test_tick_buckets_keep_prices_on_a_tick(run):
+    async def scenario():
+        await order_book_service.apply_deltas([
+            ("p1", "buy", 0.3, 5, 1), ("p1", "buy", 0.29, 2, 1), ("p1", "buy", 0.7, 1, 1),
+            ("p1", "sell", 0.3, 4, 1), ("p1", "sell", 0.31, 1, 1), ("p1", "sell", 1.15, 3, 1)
+        ])
+
+        depth = await order_book_service.get_depth("p1", tick_size=0.1)
+
+        # 0.3 / 0.1 and 0.7 / 0.1 fall just short of a whole tick in floating point
+        assert levels(depth["bids"]) == [(0.7, 1, 1), (0.3, 5, 1), (0.2, 2, 1)]
+        assert levels(depth["asks"]) == [(0.3, 4, 1), (0.4, 1, 1), (1.2, 3, 1)]
+    run(scenario)
+
+
+def test_finer_tick_sizes_round_to_their_own_decimals(run):
+    async def scenario():
+        await order_book_service.apply_deltas([
+            ("p1", "sell", 1.15, 3, 1), ("p1", "sell", 1.16, 2, 1), ("p1", "buy", 1.1, 1, 1)
+        ])
+
+        depth = await order_book_service.get_depth("p1", tick_size=0.05)
+
+        assert levels(depth["asks"]) == [(1.15, 3, 1), (1.2, 2, 1)]
+        assert levels(depth["bids"]) == [(1.1, 1, 1)]
+    run(scenario)
+
+
+def test_ungrouped_depth_lists_each_price(run):
+    async def scenario():
+        await order_book_service.apply_deltas([
+            ("p1", "buy", 10.0, 5, 1), ("p1", "buy", 10.0, 3, 1), ("p1", "buy", 9.5, 2, 1),
+            ("p1", "buy", 9.0, 4, 1), ("p1", "buy", 9.0, -4, -1)
+        ])
+
+        depth = await order_book_service.get_depth("p1")
+
+        assert levels(depth["bids"]) == [(10.0, 8, 2), (9.5, 2, 1)]
+        assert depth["asks"] == []
+    run(scenario)
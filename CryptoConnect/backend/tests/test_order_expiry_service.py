@@ -0,0 +1,31 @@
+"""
+The expiry sweep only expires, counts and pulls from the book orders it actually flipped
+"""
+from datetime import datetime, timedelta
+from app.models.market_order import MarketOrder
+from app.services.order_expiry_service import order_expiry_service
+from conftest import book_levels, fill_after_read, make_property, make_user, place_order
+
+
+def test_expiry_skips_orders_filled_after_the_read(run, monkeypatch):
+    async def scenario():
+        user = await make_user("buyer")
+        prop = await make_property(user)
+        past = datetime.utcnow() - timedelta(seconds=5)
+        orders = [
+            await place_order(user, prop, "buy", price, time_in_force="gtd", expires_at=past)
+            for price in (10.0, 11.0, 12.0)
+        ]
+        other = await make_user("other")
+        for price in (10.0, 11.0):
+            await place_order(other, prop, "buy", price)
+        fill_after_read(monkeypatch, orders)
+
+        expired = await order_expiry_service.expire_orders()
+        monkeypatch.undo()
+
+        assert expired == 2
+        statuses = [(await MarketOrder.get(o.id)).status.value for o in orders]
+        assert statuses == ["expired", "filled", "expired"]
+        assert await book_levels() == [(10.0, 10, 1), (11.0, 10, 1)]
+    run(scenario)
@@ -0,0 +1,58 @@
+"""
+Incremental portfolio snapshot updates agree with a snapshot built from scratch
+"""
+import pytest
+from app.models.portfolio import PortfolioPosition, PortfolioSnapshot
+from app.services.portfolio_service import portfolio_service, position_figures
+from conftest import make_property, make_user
+
+
+async def holding(user, prop, tokens: int) -> PortfolioSnapshot:
+    position = PortfolioPosition(**position_figures(prop), tokens=tokens, cost_basis=tokens * prop.token_price)
+    snapshot = PortfolioSnapshot(
+        user_id=str(user.id),
+        positions={str(prop.id): position},
+        total_investment=position.cost_basis,
+        current_value=position.current_value,
+        monthly_income=position.monthly_income
+    )
+    await snapshot.insert()
+    return snapshot
+
+
+def test_purchase_revalues_tokens_already_held(run):
+    async def scenario():
+        user = await make_user("investor")
+        prop = await make_property(user)
+        await holding(user, prop, 10)
+        old_price = prop.token_price
+
+        # The price moved without a property_changed call
+        prop.token_price = old_price * 1.2
+        await prop.save()
+        await portfolio_service.record_purchase(str(user.id), prop, 5, 5 * prop.token_price)
+
+        snapshot = await PortfolioSnapshot.find_one(PortfolioSnapshot.user_id == str(user.id))
+        position = snapshot.positions[str(prop.id)]
+        assert position.tokens == 15
+        assert snapshot.current_value == pytest.approx(15 * prop.token_price)
+        assert snapshot.current_value == pytest.approx(position.current_value)
+        assert snapshot.monthly_income == pytest.approx(position.monthly_income)
+        assert snapshot.total_investment == pytest.approx(10 * old_price + 5 * prop.token_price)
+    run(scenario)
+
+
+def test_purchase_opens_a_new_position(run):
+    async def scenario():
+        user = await make_user("investor")
+        held, bought = await make_property(user), await make_property(user)
+        await holding(user, held, 10)
+
+        await portfolio_service.record_purchase(str(user.id), bought, 4, 4 * bought.token_price)
+
+        snapshot = await PortfolioSnapshot.find_one(PortfolioSnapshot.user_id == str(user.id))
+        assert snapshot.positions[str(bought.id)].tokens == 4
+        assert snapshot.current_value == pytest.approx(
+            sum(position.current_value for position in snapshot.positions.values())
+        )
+    run(scenario)
@@ -0,0 +1,176 @@
+"""
+Settlement retries: a leg is never signed twice while it may still land, failures count as
+attempts, and accounts with a TrustSet in flight wait their turn
+"""
+import asyncio
+import pytest
+from bson import ObjectId
+from xrpl.wallet import Wallet
+from app.models.ledger_transaction import LedgerTransaction
+from app.models.settlement import Settlement, SettlementLegKind, SettlementStatus
+from app.services import settlement_service as settlement_module
+from app.services.settlement_service import settlement_service
+from app.services.trust_line_service import trust_line_service
+from app.unit_of_work import UnitOfWork
+from conftest import make_holding, make_property, make_user
+
+
+class FakeLedger:
+    """Stands in for xrpl_service: records what each account signed and hands out hashes"""
+
+    def __init__(self):
+        self.validated = 100
+        self.signed = []  # (account, tx_hash)
+        self.down = set()  # Accounts whose sequence fetch fails
+
+    async def submit_batch(self, wallet, transactions, ledger_window):
+        if wallet.address in self.down:
+            raise Exception("node unavailable")
+        results = []
+        for _ in transactions:
+            tx_hash = f"H{len(self.signed)}"
+            self.signed.append((wallet.address, tx_hash))
+            results.append({
+                "tx_hash": tx_hash, "sequence": len(self.signed),
+                "last_ledger_sequence": self.validated + ledger_window, "engine_result": "tesSUCCESS"
+            })
+        return results
+
+    async def get_validated_ledger_index(self):
+        return self.validated
+
+    async def land(self, tx_hash: str, account: str, result: str = "tesSUCCESS"):
+        await LedgerTransaction(
+            hash=tx_hash, ledger_index=self.validated, transaction_type="Payment",
+            account=account, result=result
+        ).insert()
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    fake = FakeLedger()
+    monkeypatch.setattr(settlement_module.xrpl_service, "submit_batch", fake.submit_batch)
+    monkeypatch.setattr(settlement_module.xrpl_service, "get_validated_ledger_index", fake.get_validated_ledger_index)
+
+    async def ingest_account(address):
+        return 0
+    monkeypatch.setattr(settlement_module.ledger_ingestion_service, "ingest_account", ingest_account)
+    monkeypatch.setattr(trust_line_service, "_issuer", lambda issuer_address=None: issuer_address)
+    monkeypatch.setattr(settlement_service, "xrp_per_aed", 0.5)
+    monkeypatch.setattr(settlement_service, "_lock", asyncio.Lock())
+    return fake
+
+
+async def queue_trade():
+    """A matched 5-token fill waiting for settlement; returns (buyer, seller)"""
+    seller, buyer = await make_user("seller"), await make_user("buyer")
+    for user in (seller, buyer):
+        wallet = Wallet.create()
+        user.xrpl_wallet_address, user.xrpl_wallet_seed = wallet.address, wallet.seed
+        await user.save()
+    prop = await make_property(seller, token_symbol="CC0123456789", xrpl_issuer_address="rIssuer")
+
+    class Order:
+        def __init__(self, user):
+            self.id, self.user_id, self.property_id = ObjectId(), str(user.id), str(prop.id)
+
+    buyer_tx, seller_tx = await make_holding(buyer, prop, 5), await make_holding(seller, prop, 5)
+    uow = UnitOfWork()
+    settlement_service.enqueue(Order(buyer), Order(seller), 5, 10.0, buyer_tx, seller_tx, uow)
+    await uow.commit()
+    return buyer, seller
+
+
+async def line_ready(*args, **kwargs):
+    return True
+
+
+async def settlement() -> Settlement:
+    return (await Settlement.find().to_list())[0]
+
+
+def legs(settlement: Settlement):
+    return {leg.kind: leg for leg in settlement.legs}
+
+
+def test_failed_submit_is_retried_then_failed(run, ledger, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(trust_line_service, "ready", line_ready)
+        buyer, seller = await queue_trade()
+        ledger.down = {buyer.xrpl_wallet_address, seller.xrpl_wallet_address}
+
+        for attempt in range(1, settlement_service.max_attempts + 1):
+            assert (await settlement_service.run())["submitted"] == 0
+            current = await settlement()
+            assert current.attempts == attempt
+            assert current.error == "node unavailable"
+        assert current.status == SettlementStatus.FAILED
+        assert ledger.signed == []
+    run(scenario)
+
+
+def test_sent_leg_is_not_resigned_until_it_expires(run, ledger, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(trust_line_service, "ready", line_ready)
+        buyer, seller = await queue_trade()
+        # The seller's token leg goes out; the buyer's XRP leg can't be signed
+        ledger.down = {buyer.xrpl_wallet_address}
+
+        assert (await settlement_service.run())["submitted"] == 1
+        current = await settlement()
+        assert current.status == SettlementStatus.SUBMITTED
+        token_hash = legs(current)[SettlementLegKind.TOKEN].tx_hash
+        assert ledger.signed == [(seller.xrpl_wallet_address, token_hash)]
+        assert legs(current)[SettlementLegKind.XRP].tx_hash is None
+
+        # Still inside the token leg's window: nothing is signed again
+        ledger.down = set()
+        await settlement_service.run()
+        assert len(ledger.signed) == 1
+        assert (await settlement()).status == SettlementStatus.SUBMITTED
+
+        # The token leg lands, the window closes: only the XRP leg is signed
+        await ledger.land(token_hash, seller.xrpl_wallet_address)
+        ledger.validated += settlement_service.ledger_window + 1
+        assert (await settlement_service.run()) == {"settled": 0, "failed": 0, "expired": 1, "submitted": 1}
+        assert [account for account, _ in ledger.signed] == [seller.xrpl_wallet_address, buyer.xrpl_wallet_address]
+        current = await settlement()
+        assert legs(current)[SettlementLegKind.TOKEN].tx_hash == token_hash
+        assert legs(current)[SettlementLegKind.TOKEN].result == "tesSUCCESS"
+
+        await ledger.land(legs(current)[SettlementLegKind.XRP].tx_hash, buyer.xrpl_wallet_address)
+        assert (await settlement_service.run())["settled"] == 1
+        assert (await settlement()).status == SettlementStatus.SETTLED
+    run(scenario)
+
+
+def test_trust_line_failure_counts_as_an_attempt(run, ledger, monkeypatch):
+    async def scenario():
+        buyer, seller = await queue_trade()
+        release = asyncio.Event()
+        failures = ["tecNO_LINE"]
+
+        async def create_trust_line(user_wallet_seed, token_symbol, issuer_address):
+            await release.wait()
+            if failures:
+                raise Exception(failures.pop())
+            return "TRUSTSET"
+        monkeypatch.setattr(settlement_module.xrpl_service, "create_trust_line", create_trust_line)
+
+        # TrustSet in flight: the buyer's Sequence is taken, so nothing is signed
+        assert (await settlement_service.run())["submitted"] == 0
+        assert trust_line_service.busy_accounts() == {buyer.xrpl_wallet_address}
+        assert (await settlement()).attempts == 0
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert (await settlement_service.run())["submitted"] == 0
+        current = await settlement()
+        assert (current.status, current.attempts, current.error) == (SettlementStatus.PENDING, 1, "Trust line: tecNO_LINE")
+
+        # The retried TrustSet succeeds in the background and the next round settles
+        assert (await settlement_service.run())["submitted"] == 0
+        await asyncio.sleep(0.05)
+        assert (await settlement_service.run())["submitted"] == 1
+        assert {account for account, _ in ledger.signed} == {buyer.xrpl_wallet_address, seller.xrpl_wallet_address}
+    run(scenario)
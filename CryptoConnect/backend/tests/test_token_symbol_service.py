@@ -0,0 +1,86 @@
+"""
+Symbol allocation: a taken code moves on to the next candidate, reservations are idempotent per
+property, and legacy symbols are imported once and replaced on re-tokenization
+"""
+from app.models.token_symbol import TokenSymbol
+from app.services.token_symbol_service import (
+    TokenSymbolService, candidate_symbol, from_currency_code, is_valid_currency_code, to_currency_code
+)
+from conftest import make_property, make_user
+
+
+def test_currency_codes_round_trip():
+    code = to_currency_code("CC3F9A1B2C4D")
+    assert len(code) == 40 and is_valid_currency_code(code)
+    assert from_currency_code(code) == "CC3F9A1B2C4D"
+    assert from_currency_code("ABC") == "ABC"
+    assert not is_valid_currency_code("XRP")
+
+
+def test_taken_code_moves_to_the_next_candidate(run):
+    async def scenario():
+        symbols = TokenSymbolService()
+        first = candidate_symbol("p1", 0)
+        await TokenSymbol(currency_code=to_currency_code(first), display_symbol=first, property_id="other").insert()
+
+        reservation = await symbols.reserve("p1")
+
+        assert reservation.display_symbol == candidate_symbol("p1", 1)
+        assert (await symbols.reserve("p1")).id == reservation.id
+        assert await symbols.resolve(reservation.currency_code) == "p1"
+        assert await symbols.resolve_many([reservation.currency_code, to_currency_code(first), "NOPE"]) == {
+            reservation.currency_code: "p1", to_currency_code(first): "other"
+        }
+    run(scenario)
+
+
+def test_reservation_made_by_another_worker_is_reused(run, monkeypatch):
+    async def scenario():
+        symbols = TokenSymbolService()
+        # Another worker reserves this property's first candidate between our lookup and insert
+        theirs = TokenSymbol(
+            currency_code=to_currency_code(candidate_symbol("p1", 0)),
+            display_symbol=candidate_symbol("p1", 0), property_id="p1"
+        )
+        real_find_one = TokenSymbol.find_one
+        calls = []
+
+        def racing_find_one(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                async def missing():
+                    await theirs.insert()
+                    return None
+                return missing()
+            return real_find_one(*args, **kwargs)
+        monkeypatch.setattr(TokenSymbol, "find_one", racing_find_one)
+
+        reservation = await symbols.reserve("p1")
+
+        assert reservation.id == theirs.id
+        assert await TokenSymbol.find(TokenSymbol.property_id == "p1").count() == 1
+    run(scenario)
+
+
+def test_legacy_symbols_are_imported_once_then_replaced(run):
+    async def scenario():
+        seller = await make_user("seller")
+        first = await make_property(seller, token_symbol="ABC")
+        colliding = await make_property(seller, token_symbol="ABC")
+        other = await make_property(seller, token_symbol="XYZ")
+        symbols = TokenSymbolService()
+
+        # The older property keeps a colliding legacy code; the other one needs a new symbol
+        assert await symbols.import_legacy() == 2
+        assert await symbols.import_legacy() == 0
+        assert await symbols.load() == 2
+        assert await symbols.resolve("ABC") == str(first.id)
+        assert await symbols.resolve("XYZ") == str(other.id)
+        assert await TokenSymbol.find_one(TokenSymbol.property_id == str(colliding.id)) is None
+
+        reservation = await symbols.reserve(str(first.id))
+        assert not reservation.legacy
+        assert reservation.display_symbol == candidate_symbol(str(first.id), 0)
+        assert await TokenSymbol.find(TokenSymbol.property_id == str(first.id)).count() == 1
+        assert await symbols.resolve("ABC") is None
+    run(scenario)
@@ -0,0 +1,44 @@
+"""
+A batch job reports properties another job tokenized meanwhile as skipped, not tokenized
+"""
+from app.models.property import Property, PropertyStatus
+from app.models.tokenization_job import TokenizationJob, TokenizationOutcome
+from app.services import tokenization_pipeline as pipeline_module
+from app.services.tokenization_pipeline import tokenization_pipeline
+from conftest import make_property, make_user
+
+
+def test_property_tokenized_by_another_job_is_skipped(run, monkeypatch):
+    async def scenario():
+        seller = await make_user("seller")
+        properties = [await make_property(seller, status=PropertyStatus.APPROVED) for _ in range(3)]
+        raced = properties[1]
+
+        async def check_connection():
+            return True
+
+        async def prepare_tokenization(property_obj, check_connection=True):
+            if property_obj.id == raced.id:
+                # Another job's update lands between preparation and this job's write
+                await Property.get_pymongo_collection().update_one(
+                    {"_id": raced.id}, {"$set": {"xrpl_token_created": True}}
+                )
+            return {"token_symbol": f"SYM{str(property_obj.id)[-4:]}", "xrpl_token_created": True}
+
+        scheduled = []
+        monkeypatch.setattr(pipeline_module.xrpl_service, "check_connection", check_connection)
+        monkeypatch.setattr(pipeline_module.tokenization_service, "prepare_tokenization", prepare_tokenization)
+        monkeypatch.setattr(pipeline_module.trust_line_service, "schedule_pre_establish", lambda *p: scheduled.extend(p))
+
+        job = TokenizationJob(property_ids=[str(p.id) for p in properties])
+        await job.insert()
+        await tokenization_pipeline.process(str(job.id))
+
+        job = await TokenizationJob.get(job.id)
+        assert [result.outcome for result in job.results] == [
+            TokenizationOutcome.TOKENIZED, TokenizationOutcome.SKIPPED, TokenizationOutcome.TOKENIZED
+        ]
+        assert (job.tokenized, job.skipped, job.failed) == (2, 1, 0)
+        assert {p.id for p in scheduled} == {properties[0].id, properties[2].id}
+        assert (await Property.get(raced.id)).token_symbol is None
+    run(scenario)
@@ -0,0 +1,84 @@
+"""
+Primary-market investments reserve supply before touching the ledger, so they never sell more
+tokens than the property has
+"""
+import asyncio
+import pytest
+from app.models.property import Property
+from app.models.transaction import Transaction, TransactionStatus
+from app.services import tokenization_service as tokenization_module
+from app.services.tokenization_service import tokenization_service
+from conftest import make_property, make_user
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    """Stub the XRPL calls; returns the addresses tokens were sent to"""
+    transfers = []
+
+    async def ensure(**kwargs):
+        return "EXISTS"
+
+    async def transfer_tokens(**kwargs):
+        transfers.append(kwargs["to_address"])
+        await asyncio.sleep(0.01)
+        return f"TX{kwargs['to_address']}"
+
+    async def send_xrp(**kwargs):
+        return None
+
+    async def record_purchase(*args):
+        return None
+    monkeypatch.setattr(tokenization_module.trust_line_service, "ensure", ensure)
+    monkeypatch.setattr(tokenization_module.xrpl_service, "transfer_tokens", transfer_tokens)
+    monkeypatch.setattr(tokenization_module.xrpl_service, "send_xrp", send_xrp)
+    monkeypatch.setattr(tokenization_module.portfolio_service, "record_purchase", record_purchase)
+    return transfers
+
+
+async def nearly_sold_out(remaining: int = 10):
+    seller = await make_user("seller", xrpl_wallet_address="rSeller")
+    prop = await make_property(
+        seller, xrpl_token_created=True, token_symbol="CC0123456789", xrpl_issuer_address="rIssuer"
+    )
+    prop.tokens_sold = prop.total_tokens - remaining
+    await prop.save()
+    return prop
+
+
+def test_losing_buyer_never_receives_tokens(run, ledger):
+    async def scenario():
+        prop = await nearly_sold_out()
+        buyers = [
+            await make_user(name, xrpl_wallet_address=f"r{name}", xrpl_wallet_seed="seed")
+            for name in ("alice", "bob")
+        ]
+
+        # Each request works from its own copy of the property, as the router does
+        copies = [await Property.get(prop.id) for _ in buyers]
+        results = await asyncio.gather(*(
+            tokenization_service.process_investment(buyer, copy, 8, 80.0, 1.0)
+            for buyer, copy in zip(buyers, copies)
+        ))
+
+        winners = [buyer for buyer, result in zip(buyers, results) if result is not None]
+        assert len(winners) == 1
+        assert ledger == [winners[0].xrpl_wallet_address]
+        assert (await Property.get(prop.id)).tokens_sold == prop.total_tokens - 2
+        transactions = await Transaction.find().to_list()
+        assert sorted(tx.status for tx in transactions) == [TransactionStatus.COMPLETED, TransactionStatus.FAILED]
+    run(scenario)
+
+
+def test_failed_transfer_releases_the_reservation(run, ledger, monkeypatch):
+    async def scenario():
+        prop = await nearly_sold_out()
+        buyer = await make_user("alice", xrpl_wallet_address="ralice", xrpl_wallet_seed="seed")
+
+        async def transfer_tokens(**kwargs):
+            raise Exception("tefPAST_SEQ")
+        monkeypatch.setattr(tokenization_module.xrpl_service, "transfer_tokens", transfer_tokens)
+
+        assert await tokenization_service.process_investment(buyer, prop, 8, 80.0, 1.0) is None
+        assert (await Property.get(prop.id)).tokens_sold == prop.total_tokens - 10
+    run(scenario)
@@ -0,0 +1,69 @@
+"""
+Keyset pagination walks a user's history newest first without skipping or repeating rows,
+including rows written in the same millisecond
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.models.transaction import Transaction
+from app.services.transaction_history_service import transaction_history_service
+
+
+async def history(user_id: str):
+    """Seven rows for the user (three sharing a timestamp) and one for someone else; returns the
+    user's ids newest first"""
+    base = datetime(2026, 3, 1, 12, 0, 0)
+    minutes = [0, 1, 1, 1, 2, 3, 4]
+    for i, minute in enumerate(minutes):
+        await Transaction(
+            transaction_type="token_purchase" if i % 2 else "secondary_market_buy", status="completed",
+            user_id=user_id, property_id="p1", amount=10.0 * i, tokens=i + 1, token_price=10.0,
+            created_at=base + timedelta(minutes=minute)
+        ).insert()
+    await Transaction(
+        transaction_type="token_purchase", status="completed", user_id="someone-else",
+        property_id="p1", amount=1.0, tokens=1, token_price=1.0, created_at=base
+    ).insert()
+    docs = await Transaction.get_pymongo_collection().find({"user_id": user_id}).to_list(length=None)
+    return [str(doc["_id"]) for doc in sorted(docs, key=lambda d: (d["created_at"], d["_id"]), reverse=True)]
+
+
+def test_pages_cover_history_exactly_once(run):
+    async def scenario():
+        expected = await history("u1")
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = await transaction_history_service.get_page("u1", limit=3, cursor=cursor)
+            pages += 1
+            seen += [item["id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            assert page["has_more"] == (cursor is not None)
+            if not cursor:
+                break
+
+        assert seen == expected
+        assert pages == 3
+    run(scenario)
+
+
+def test_filters_apply_across_pages(run):
+    async def scenario():
+        await history("u1")
+
+        first = await transaction_history_service.get_page("u1", limit=2, transaction_types=["token_purchase"])
+        second = await transaction_history_service.get_page(
+            "u1", limit=2, transaction_types=["token_purchase"], cursor=first["next_cursor"]
+        )
+
+        items = first["items"] + second["items"]
+        assert len(items) == 3
+        assert not second["has_more"]
+        assert {item["transaction_type"] for item in items} == {"token_purchase"}
+    run(scenario)
+
+
+def test_malformed_cursor_is_rejected(run):
+    async def scenario():
+        with pytest.raises(ValueError):
+            await transaction_history_service.get_page("u1", cursor="not-a-cursor")
+    run(scenario)
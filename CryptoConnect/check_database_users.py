@@ -27,7 +27,7 @@ async def check_users():
         if not users:
             print("❌ No users found in database")
             print("\nTo create test users, run:")
-            print("python assign_wallets_to_existing_users.py")
+            print("python backend/backfill_wallets.py")
             return
         
         print(f"📊 Found {len(users)} users in database:\n")
@@ -61,7 +61,7 @@ async def check_users():
         
         if users_without_wallets > 0:
             print(f"\n💡 To assign XRP wallets to users without wallets:")
-            print("python assign_wallets_to_existing_users.py")
+            print("python backend/backfill_wallets.py")
     
     finally:
         await close_mongo_connection()
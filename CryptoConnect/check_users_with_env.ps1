@@ -8,5 +8,5 @@ Write-Host "🔍 Checking Database Users..." -ForegroundColor Green
 python check_database_users.py
 
 Write-Host "`n💡 Next steps:" -ForegroundColor Yellow
-Write-Host "1. To assign wallets to existing users: python assign_wallets_to_existing_users.py" -ForegroundColor White
+Write-Host "1. To assign wallets to existing users: python backend/backfill_wallets.py" -ForegroundColor White
 Write-Host "2. For manual assignment: python manual_wallet_assignment.py" -ForegroundColor White
\ No newline at end of file
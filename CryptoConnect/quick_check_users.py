@@ -30,7 +30,7 @@ async def quick_check():
             print("❌ No users found in database")
             print("\n💡 Create users first by:")
             print("1. Running the frontend and registering users")
-            print("2. Or run: python assign_wallets_to_existing_users.py")
+            print("2. Or run: python backend/backfill_wallets.py")
             return
         
         print(f"📊 Found {len(users)} users:\n")